@@ -4,9 +4,10 @@ A/B Testing Module for Old vs New ML Model
 Runs both models simultaneously and logs results for comparison
 """
 
-import pickle
 import json
 import re
+import ast
+import asyncio
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -14,14 +15,17 @@ from typing import Dict, Any, Optional, Tuple
 import pandas as pd
 import numpy as np
 from database import supabase
-from geopy.distance import geodesic
+from model_registry import get_registry
+from feature_encoder import FeatureEncoder, get_encoder
 
 # Import old model utilities
-from model_utils import scrape_listing as scrape_old, featurise as featurise_old, _parse_number, _geocode_addr
+from model_utils import (
+    scrape_listing_async, featurise as featurise_old, _parse_number, geocode_first, listing_address_candidates
+)
+from geo import distance_to_center_km
 
 # Import new model utilities (only the ones that exist)
 from vilrent_utils import (
-    parse_dl_block,
     add_primary_heating_dummies,
     zyte_fetch_html,
     make_session,
@@ -42,37 +46,28 @@ class DualModelPredictor:
         self.new_model = None
         self.feature_order = None
         self.district_categories = None
+        self.encoder = None
         self._load_models()
 
     def _load_models(self):
-        """Load both models and necessary configs"""
-        try:
-            # Load old model
-            with open("model.pkl", "rb") as f:
-                self.old_model = pickle.load(f)
-            logger.info("✅ Old model loaded successfully")
-        except Exception as e:
-            logger.error(f"❌ Failed to load old model: {e}")
-
-        try:
-            # Load new model
-            with open("model_new.pkl", "rb") as f:
-                self.new_model = pickle.load(f)
-            logger.info("✅ New model loaded successfully")
-        except Exception as e:
-            logger.error(f"❌ Failed to load new model: {e}")
-
-        try:
-            # Load new model configs
-            with open("feature_order.json", "r") as f:
-                self.feature_order = json.load(f)
-
-            with open("district_categories.json", "r") as f:
-                self.district_categories = pd.Index(json.load(f))
-
-            logger.info("✅ New model configs loaded successfully")
-        except Exception as e:
-            logger.error(f"❌ Failed to load new model configs: {e}")
+        """Take both models and configs from the shared model registry"""
+        registry = get_registry()
+
+        self.old_model = registry.old_model
+        if self.old_model is None:
+            logger.error("❌ Old model not available in registry")
+
+        self.new_model = registry.new_model
+        if self.new_model is None:
+            logger.error("❌ New model not available in registry")
+
+        if registry.feature_order and registry.district_categories:
+            self.feature_order = registry.feature_order
+            self.district_categories = pd.Index(registry.district_categories)
+            self.encoder = get_encoder()
+            logger.info("✅ New model configs taken from registry")
+        else:
+            logger.error("❌ New model configs not available in registry")
 
 # ============================================================================
 # FEATURE EXTRACTION FOR NEW MODEL
@@ -154,33 +149,12 @@ def featurise_new(raw_dict: dict, district_categories: pd.Index, feature_order:
 
     # Use the same robust geocoding with fallbacks as the old model
     if pd.isna(lat) or pd.isna(lon):
-        # Try with district first
-        parts_with = [p for p in [city, district, street] if p]
-        base_with = ", ".join(parts_with)
-        addr_with = f"{base_with} {house}" if (base_with and house) else base_with
-
-        lat, lon = _geocode_addr(addr_with)
-        if (lat is None or lon is None) and house:
-            lat, lon = _geocode_addr(base_with)
-
-        # Retry without district if still no results
-        if (lat is None or lon is None):
-            parts_no = [p for p in [city, street] if p]
-            base_no = ", ".join(parts_no)
-            addr_no = f"{base_no} {house}" if (base_no and house) else base_no
-
-            lat, lon = _geocode_addr(addr_no)
-            if (lat is None or lon is None) and house:
-                lat, lon = _geocode_addr(base_no)
+        lat, lon = _geocode_listing(city, district, street, house)
 
     df["latitude"] = lat
     df["longitude"] = lon
 
-    city_center = (54.6872, 25.2797)  # Vilnius center
-    if pd.notnull(lat) and pd.notnull(lon):
-        df["dist_to_center_km"] = geodesic((lat, lon), city_center).km
-    else:
-        df["dist_to_center_km"] = np.nan
+    df["dist_to_center_km"] = distance_to_center_km(lat, lon)
 
     # Enforce exact feature order and types
     df = _coerce_dtypes_and_order(df, district_categories, feature_order)
@@ -217,6 +191,90 @@ def _coerce_dtypes_and_order(X: pd.DataFrame, district_categories: pd.Index, fea
     return X
 
 
+def _geocode_listing(city, district, street, house) -> Tuple[Optional[float], Optional[float]]:
+    """Geocode a listing address, falling back to no house number and no district."""
+    return geocode_first(listing_address_candidates(city, district, street, house))
+
+
+def _raw_first(raw_dict: dict, key: str):
+    """Dict equivalent of _first_value: first element of list values, else the value itself."""
+    v = raw_dict.get(key)
+    if isinstance(v, (list, tuple, set)):
+        v = list(v)[0] if len(v) else None
+    return v
+
+
+def _raw_list(raw_dict: dict, key: str) -> list:
+    """List-like listing field (Šildymas, Ypatybės, ...) as a Python list."""
+    v = raw_dict.get(key)
+    if v is None:
+        return []
+    if isinstance(v, (list, tuple, set)):
+        return list(v)
+    return json.loads(v)
+
+
+def _is_missing(v) -> bool:
+    return v is None or (isinstance(v, float) and np.isnan(v))
+
+
+def featurise_new_dict(raw_dict: dict, encoder: FeatureEncoder) -> Dict[str, Any]:
+    """
+    Pandas-free equivalent of featurise_new.
+    Returns a plain feature dict (district_encoded as its category name) ready
+    for FeatureEncoder.encode; values match featurise_new row for row.
+    """
+    # Building year: first 4-digit number in the stringified value
+    year_match = re.search(r"(\d{4})", str(raw_dict.get("Metai")))
+    year_centered = float(year_match.group(1)) - 2000 if year_match else np.nan
+
+    # Heating dummies from the first word of the first entry
+    heating = raw_dict.get("Šildymas")
+    if _is_missing(heating):
+        primary_heat = "Kita"
+    else:
+        try:
+            heating_items = _raw_list(raw_dict, "Šildymas")
+        except Exception:
+            try:
+                heating_items = list(ast.literal_eval(str(heating)))
+            except Exception:
+                heating_items = []
+        m = re.match(r"^([^ ,]+)", str(heating_items[0])) if heating_items else None
+        primary_heat = m.group(1) if m else "Kita"
+
+    features_list = _raw_list(raw_dict, "Ypatybės")
+    additional = _raw_list(raw_dict, "Papildomos patalpos")
+
+    city = _raw_first(raw_dict, "city") or "Vilnius"
+    district = _raw_first(raw_dict, "district")
+    street = _raw_first(raw_dict, "street")
+    house = _raw_first(raw_dict, "Namo numeris")
+
+    lat = raw_dict.get("latitude")
+    lon = raw_dict.get("longitude")
+    if _is_missing(lat) or _is_missing(lon):
+        lat, lon = _geocode_listing(city, district, street, house)
+
+    dist_to_center_km = distance_to_center_km(lat, lon)
+
+    return {
+        "rooms": _parse_number(_raw_first(raw_dict, "Kambarių sk.")),
+        "floor_current": _parse_number(_raw_first(raw_dict, "Aukštas")),
+        "floor_total": _parse_number(_raw_first(raw_dict, "Aukštų sk.")),
+        "area_m2": _parse_number(_raw_first(raw_dict, "Plotas")),
+        "year_centered": year_centered,
+        "dist_to_center_km": dist_to_center_km,
+        "heat_Centrinis": 1.0 if primary_heat == "Centrinis" else 0.0,
+        "heat_Dujinis": 1.0 if primary_heat == "Dujinis" else 0.0,
+        "heat_Elektra": 1.0 if primary_heat == "Elektra" else 0.0,
+        "has_lift": 1.0 if "Yra liftas" in features_list else 0.0,
+        "has_balcony_terrace": 1.0 if any(x in {"Balkonas", "Terasa"} for x in additional) else 0.0,
+        "has_parking_spot": 1.0 if "Vieta automobiliui" in additional else 0.0,
+        "district_encoded": encoder.district_name(district),
+    }
+
+
 def _first_value(d, col):
     """Return the first value for column (handles list/tuple/str)."""
     v = d.get(col, pd.Series([None])).iloc[0]
@@ -340,7 +398,7 @@ async def run_dual_prediction(
     # ========================================
     try:
         logger.info(f"🔍 Scraping listing: {url}")
-        raw_data = scrape_old(url)  # Use old scraper (it works fine)
+        raw_data = await scrape_listing_async(url)  # Non-blocking Zyte fetch
 
         # Extract actual listing price
         actual_prices = extract_actual_price(raw_data)
@@ -369,7 +427,8 @@ async def run_dual_prediction(
     # ========================================
     try:
         logger.info("🤖 Running OLD model...")
-        features_old = featurise_old(raw_data)
+        # Featurising may geocode via Nominatim, keep it off the event loop
+        features_old = await asyncio.to_thread(featurise_old, raw_data)
         pred_old_pm2 = predictor.old_model.predict(features_old)[0]
         area = features_old["area_m2"].iloc[0]
         total_old = pred_old_pm2 * area if pd.notnull(area) else None
@@ -391,17 +450,17 @@ async def run_dual_prediction(
     # ========================================
     try:
         logger.info("🚀 Running NEW model...")
-        features_new = featurise_new(raw_data, predictor.district_categories, predictor.feature_order)
-        pred_new_pm2 = predictor.new_model.predict(features_new)[0]
-        area = features_new["area_m2"].iloc[0]
+        features_new = await asyncio.to_thread(featurise_new_dict, raw_data, predictor.encoder)
+        X_new = predictor.encoder.encode(features_new)
+        pred_new_pm2 = predictor.encoder.predict(predictor.new_model, X_new)[0]
+        area = features_new["area_m2"]
         total_new = pred_new_pm2 * area if pd.notnull(area) else None
 
         result["new_model"] = {
             "success": True,
             "price_per_m2": round(float(pred_new_pm2), 2),
             "total_price": round(float(total_new), 2) if total_new else None,
-            "features_used": {k: (v if not isinstance(v, pd.Categorical) else str(v))
-                             for k, v in features_new.iloc[0].to_dict().items()}
+            "features_used": predictor.encoder.decode(X_new)
         }
         logger.info(f"✅ New model: €{result['new_model']['price_per_m2']}/m² (€{result['new_model']['total_price']} total)")
     except Exception as e:
@@ -5,31 +5,131 @@ Best Deals Finder - Uses EXACT same prediction logic as production website.
 
 import os
 import json
-import pickle
+import time
+import hashlib
+import argparse
 import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 from supabase import create_client
-from geopy.distance import geodesic
 import re
 
-from model_utils import _geocode_addr
+from model_utils import geocode_first
+from geo import distance_to_center_km
+from model_registry import get_registry
+from feature_encoder import CAT_COL, OTHER_DISTRICT, get_encoder
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", os.getenv("SUPABASE_ANON_KEY"))
-CITY_CENTER = (54.6872, 25.2797)
+
+SNAPSHOT_COLUMNS = (
+    'listing_id, snapshot_date, area_m2, rooms, district, street, floor_current, floor_total, '
+    'year_built, date_posted, raw_features'
+)
+DEAL_COLUMNS = (
+    'listing_id, url, district, street, rooms, area_m2, floor_current, floor_total, year_built, '
+    'actual_price, predicted_price, pred_per_m2, deal_score, latitude, longitude, dist_to_center_km, '
+    'feature_hash, model_version'
+)
+IN_FILTER_CHUNK = 200  # listing ids per `in_` filter (kept well under URL length limits)
+FETCH_WORKERS = int(os.getenv("BEST_DEALS_WORKERS", "8"))  # Concurrent `in_` requests
+PAGE_SIZE = 1000  # Supabase max rows per request
+DEAL_WRITE_CHUNK = int(os.getenv("BEST_DEALS_WRITE_CHUNK", "500"))  # deal_analysis rows per upsert
+DEAL_WRITE_RETRIES = 3  # Retries of a failed chunk
 
 
 def get_supabase():
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-def featurize_from_db(row, district_categories, feature_order):
+def _select_in(supabase, table, columns, listing_ids, order=()):
+    """All rows of `table` whose listing_id is in listing_ids (paged past the row limit)."""
+    rows = []
+    offset = 0
+    while True:
+        query = supabase.from_(table).select(columns).in_('listing_id', listing_ids)
+        for column, desc in order:
+            query = query.order(column, desc=desc)
+        result = query.range(offset, offset + PAGE_SIZE - 1).execute()
+        rows.extend(result.data)
+        if len(result.data) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def select_in_chunks(supabase, table, columns, listing_ids, order=(), chunk_size=IN_FILTER_CHUNK, workers=FETCH_WORKERS):
     """
-    Convert DB row to model features using EXACT same logic as production.
+    Rows of `table` for listing_ids, queried in `in_` chunks of chunk_size,
+    `workers` at a time. Rows come back in chunk order.
+    """
+    ids = list(listing_ids)
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for chunk_rows in pool.map(lambda chunk: _select_in(supabase, table, columns, chunk, order), chunks):
+            rows.extend(chunk_rows)
+    return rows
+
+
+def fetch_latest_snapshots(supabase, listing_ids):
+    """Latest listing_snapshots row per listing, as {listing_id: row}."""
+    latest = {}
+    order = (('listing_id', False), ('snapshot_date', True))
+    for row in select_in_chunks(supabase, 'listing_snapshots', SNAPSHOT_COLUMNS, listing_ids, order):
+        latest.setdefault(row['listing_id'], row)  # Newest first within each listing
+    return latest
+
+
+def fetch_previous_deals(supabase, listing_ids):
+    """Current deal_analysis row per listing, as {listing_id: row}."""
+    order = (('listing_id', False),)
+    return {
+        row['listing_id']: row
+        for row in select_in_chunks(supabase, 'deal_analysis', DEAL_COLUMNS, listing_ids, order)
+    }
+
+
+def feature_hashes(X, model_version):
+    """
+    Content hash of each row of the model-ready matrix X together with the
+    model version: equal hashes mean the same model would predict the same value.
+    """
+    prefix = (model_version or '').encode('utf-8')
+    X = np.ascontiguousarray(X, dtype=np.float64) + 0.0  # -0.0 and 0.0 hash alike
+    return [hashlib.sha256(prefix + row.tobytes()).hexdigest()[:32] for row in X]
+
+
+def geocode_db_address(district, street, house_number):
+    """
+    Geocode a DB listing address with the 5-step fallback chain, resolved
+    speculatively (see model_utils.geocode_first).
+    Returns (lat, lon), (None, None) if nothing matched.
+    """
+    # Build address with house number if available
+    street_with_house = f"{street} {house_number}".strip() if house_number else street
+
+    return geocode_first([
+        # 1. city + district + street + house
+        f"Vilnius, {district}, {street_with_house}" if street_with_house and district else None,
+        # 2. city + district + street (without house)
+        f"Vilnius, {district}, {street}" if street and district and house_number else None,
+        # 3. city + street + house (WITHOUT district)
+        f"Vilnius, {street_with_house}" if street_with_house else None,
+        # 4. city + street (WITHOUT district, without house)
+        f"Vilnius, {street}" if street else None,
+        # 5. district only
+        f"Vilnius, {district}" if district else None,
+    ])
+
+
+def _db_row_inputs(row, district_categories):
+    """
+    Model features of a DB row except dist_to_center_km, which needs the
+    geocoded address. Returns (features, street, house_number).
     """
     raw = row.get('raw_features', {})
     if isinstance(raw, str):
@@ -48,38 +148,8 @@ def featurize_from_db(row, district_categories, feature_order):
     if district not in district_categories:
         district = 'Other'
 
-    # Geocode for distance - SAME fallback order as production (ab_testing.py)
     street = row.get('street') or raw.get('street') or ''
     house_number = raw.get('house_number') or ''
-    lat, lon = None, None
-
-    # Build address with house number if available
-    street_with_house = f"{street} {house_number}".strip() if house_number else street
-
-    # 1. Try: city + district + street + house
-    if street_with_house and district:
-        lat, lon = _geocode_addr(f"Vilnius, {district}, {street_with_house}")
-
-    # 2. If fail: Try city + district + street (without house)
-    if (lat is None or lon is None) and street and district and house_number:
-        lat, lon = _geocode_addr(f"Vilnius, {district}, {street}")
-
-    # 3. If fail: Try city + street + house (WITHOUT district)
-    if (lat is None or lon is None) and street_with_house:
-        lat, lon = _geocode_addr(f"Vilnius, {street_with_house}")
-
-    # 4. If fail: Try city + street (WITHOUT district, without house)
-    if (lat is None or lon is None) and street:
-        lat, lon = _geocode_addr(f"Vilnius, {street}")
-
-    # 5. If still fail: Try district only
-    if (lat is None or lon is None) and district:
-        lat, lon = _geocode_addr(f"Vilnius, {district}")
-
-    if lat and lon:
-        dist_to_center = geodesic((lat, lon), CITY_CENTER).km
-    else:
-        dist_to_center = np.nan
 
     # Heating - extract primary type
     heating = raw.get('heating', [])
@@ -106,7 +176,6 @@ def featurize_from_db(row, district_categories, feature_order):
         'floor_total': floor_total,
         'area_m2': area,
         'year_centered': year_centered,
-        'dist_to_center_km': dist_to_center,
         'heat_Centrinis': heat_Centrinis,
         'heat_Dujinis': heat_Dujinis,
         'heat_Elektra': heat_Elektra,
@@ -116,25 +185,103 @@ def featurize_from_db(row, district_categories, feature_order):
         'district_encoded': district,
     }
 
-    # Create DataFrame
-    df = pd.DataFrame([features])
-    df['district_encoded'] = pd.Categorical([district], categories=district_categories)
+    return features, street, house_number
 
-    # Reorder to exact feature order
-    df = df.reindex(columns=feature_order)
 
-    return df, dist_to_center, lat, lon
+def featurize_from_db(row, district_categories, feature_order):
+    """
+    Convert DB row to model features using EXACT same logic as production.
+    Returns a plain feature dict for FeatureEncoder.encode.
+    """
+    features, street, house_number = _db_row_inputs(row, district_categories)
+
+    # Geocode for distance - SAME fallback order as production (ab_testing.py)
+    lat, lon = geocode_db_address(features['district_encoded'], street, house_number)
+    dist_to_center = distance_to_center_km(lat, lon)
+    features['dist_to_center_km'] = dist_to_center
+
+    return features, dist_to_center, lat, lon
 
 
-def main(limit=2000, days=12):
+def featurize_batch(rows, district_categories, encoder):
+    """
+    Featurise DB rows (same logic as featurize_from_db) into one
+    (n_rows, n_features) float64 matrix, built column by column: districts are
+    encoded once per distinct name and dist_to_center_km is one vectorized call.
+    Returns (X, lat, lon, dist, errors). Rows in errors ({index: message})
+    could not be featurised; their X rows are NaN and must not be scored.
+    """
+    n = len(rows)
+    inputs = [None] * n
+    lat = np.full(n, np.nan)
+    lon = np.full(n, np.nan)
+    errors = {}
+
+    for i, row in enumerate(rows):
+        if (i + 1) % 100 == 0:
+            print(f"  [{i+1}/{n}] listings featurised...", flush=True)
+        try:
+            features, street, house_number = _db_row_inputs(row, district_categories)
+            row_lat, row_lon = geocode_db_address(features['district_encoded'], street, house_number)
+        except Exception as e:
+            errors[i] = str(e)
+            continue
+        inputs[i] = features
+        if row_lat is not None and row_lon is not None:
+            lat[i], lon[i] = row_lat, row_lon
+
+    dist = distance_to_center_km(lat, lon)
+    X = np.full((n, encoder.n_features), np.nan)
+    for j, name in enumerate(encoder.feature_order):
+        if name == 'dist_to_center_km':
+            X[:, j] = dist
+        elif name == CAT_COL:
+            names = [f[CAT_COL] if f else OTHER_DISTRICT for f in inputs]
+            districts, codes = np.unique(names, return_inverse=True)
+            X[:, j] = np.array([encoder.district_code(d) for d in districts])[codes]
+        else:
+            X[:, j] = [np.nan if f is None or f.get(name) is None else f[name] for f in inputs]
+    if errors:
+        X[list(errors)] = np.nan
+
+    return X, lat, lon, dist, errors
+
+
+def score_batch(rows, X, valid, model, encoder):
+    """
+    Score the valid rows of X with one booster call and compute deal scores.
+    Returns (pred_per_m2, predicted_total, deal_score); deal_score is NaN for
+    rows that cannot be scored (invalid, no area, no price).
+    """
+    n = len(rows)
+    pred_per_m2 = np.full(n, np.nan)
+    if valid.any():
+        pred_per_m2[valid] = encoder.predict(model, X[valid])
+
+    area = np.array([float(row.get('area_m2', 0) or 0) for row in rows])
+    actual = np.array([float(row.get('last_price') or 0) for row in rows])
+    predicted_total = np.where(area > 0, pred_per_m2 * area, 0.0)
+
+    scored = valid & (predicted_total > 0) & (actual > 0)
+    deal_score = np.full(n, np.nan)
+    deal_score[scored] = (predicted_total[scored] - actual[scored]) / predicted_total[scored] * 100
+    return pred_per_m2, predicted_total, deal_score
+
+
+def main(limit=2000, days=12, incremental=False):
+    """
+    Score ACTIVE listings first seen in the last `days` days. With
+    incremental=True only listings whose feature hash (features + model
+    version) or price changed since their stored deal_analysis row are
+    predicted and written; the others keep their stored scores.
+    """
     print(f"Loading NEW model (same as production)...", flush=True)
 
-    with open('model_new.pkl', 'rb') as f:
-        model = pickle.load(f)
-    with open('feature_order.json', 'r') as f:
-        feature_order = json.load(f)
-    with open('district_categories.json', 'r') as f:
-        district_categories = pd.Index(json.load(f))
+    registry = get_registry()
+    model = registry.new_model
+    feature_order = registry.feature_order
+    district_categories = pd.Index(registry.district_categories)
+    encoder = get_encoder()
 
     # Calculate date cutoff
     from datetime import timedelta
@@ -168,76 +315,90 @@ def main(limit=2000, days=12):
     print(f"Fetched {len(all_lifecycle_rows)} listings", flush=True)
 
     print(f"Loading snapshots...", flush=True)
+    started = time.perf_counter()
+    snapshots = fetch_latest_snapshots(supabase, [row['listing_id'] for row in all_lifecycle_rows])
     listings = []
-    for i, row in enumerate(all_lifecycle_rows):
-        if (i + 1) % 100 == 0:
-            print(f"  [{i+1}/{len(all_lifecycle_rows)}] snapshots loaded...", flush=True)
-        snap = supabase.from_('listing_snapshots').select(
-            'area_m2, rooms, district, street, floor_current, floor_total, year_built, date_posted, raw_features'
-        ).eq('listing_id', row['listing_id']).limit(1).execute()
-
-        if snap.data:
-            row.update(snap.data[0])
+    for row in all_lifecycle_rows:
+        snap = snapshots.get(row['listing_id'])
+        if snap:
+            row.update(snap)
             listings.append(row)
 
-    print(f"Found {len(listings)} listings with snapshots\n", flush=True)
-
-    results = []
-    for i, row in enumerate(listings):
-        listing_id = row['listing_id']
-        actual_price = row['last_price']
-        district = row.get('district', 'Unknown')
-        area = float(row.get('area_m2', 0) or 0)
-
-        print(f"[{i+1}/{len(listings)}] {listing_id} ({district})...", end=" ", flush=True)
-
-        try:
-            features_df, dist, lat, lon = featurize_from_db(row, district_categories, feature_order)
-
-            pred_per_m2 = model.predict(features_df)[0]
-            predicted_total = pred_per_m2 * area if area > 0 else 0
-
-            if predicted_total > 0 and actual_price > 0:
-                deal_score = (predicted_total - actual_price) / predicted_total * 100
-                results.append({
-                    'listing_id': listing_id,
-                    'url': row.get('url', ''),
-                    'district': district,
-                    'street': row.get('street', ''),
-                    'rooms': int(row.get('rooms', 0) or 0),
-                    'area_m2': area,
-                    'floor_current': int(row.get('floor_current', 0) or 0),
-                    'floor_total': int(row.get('floor_total', 0) or 0),
-                    'year_built': int(row.get('year_built', 0) or 0),
-                    'actual_price': actual_price,
-                    'predicted_price': round(predicted_total),
-                    'pred_per_m2': round(pred_per_m2, 2),
-                    'deal_score': round(deal_score, 1),
-                    'latitude': lat,
-                    'longitude': lon,
-                    'dist_to_center_km': round(dist, 3) if dist else None,
-                    'first_seen_at': row.get('first_seen_at'),
-                })
-                print(f"€{actual_price} vs €{round(predicted_total)} ({deal_score:+.1f}%)", flush=True)
-            else:
-                print("skip", flush=True)
-        except Exception as e:
-            print(f"error: {e}", flush=True)
-
+    print(f"Found {len(listings)} listings with snapshots ({time.perf_counter() - started:.1f}s)\n", flush=True)
+
+    print(f"Featurising {len(listings)} listings...", flush=True)
+    started = time.perf_counter()
+    X, lats, lons, dists, errors = featurize_batch(listings, district_categories, encoder)
+    for i, message in errors.items():
+        print(f"  {listings[i]['listing_id']}: error: {message}", flush=True)
+
+    valid = np.ones(len(listings), dtype=bool)
+    valid[list(errors)] = False
+    model_version = registry.model_version('new')
+    hashes = feature_hashes(X, model_version)
+
+    # Incremental: keep the stored score of listings whose features, model and price are unchanged
+    rescore = valid.copy()
+    unchanged = []
+    if incremental:
+        previous = fetch_previous_deals(supabase, [row['listing_id'] for row in listings])
+        for i, row in enumerate(listings):
+            prev = previous.get(row['listing_id'])
+            if valid[i] and prev and prev['feature_hash'] == hashes[i] and prev['actual_price'] == row['last_price']:
+                rescore[i] = False
+                unchanged.append({**prev, 'first_seen_at': row.get('first_seen_at')})
+        print(f"Incremental: rescoring {int(rescore.sum())} of {int(valid.sum())} listings "
+              f"({len(unchanged)} unchanged)", flush=True)
+
+    pred_per_m2, predicted_total, deal_score = score_batch(listings, X, rescore, model, encoder)
+    scored = np.flatnonzero(~np.isnan(deal_score))
+    print(f"Scored {len(scored)} listings in {time.perf_counter() - started:.1f}s "
+          f"({len(errors)} errors, {int(rescore.sum()) - len(scored)} skipped)", flush=True)
+
+    rescored = []
+    for i in scored:
+        row = listings[i]
+        dist = dists[i]
+        rescored.append({
+            'listing_id': row['listing_id'],
+            'url': row.get('url', ''),
+            'district': row.get('district', 'Unknown'),
+            'street': row.get('street', ''),
+            'rooms': int(row.get('rooms', 0) or 0),
+            'area_m2': float(row.get('area_m2', 0) or 0),
+            'floor_current': int(row.get('floor_current', 0) or 0),
+            'floor_total': int(row.get('floor_total', 0) or 0),
+            'year_built': int(row.get('year_built', 0) or 0),
+            'actual_price': row['last_price'],
+            'predicted_price': round(float(predicted_total[i])),
+            'pred_per_m2': round(float(pred_per_m2[i]), 2),
+            'deal_score': round(float(deal_score[i]), 1),
+            'latitude': None if np.isnan(lats[i]) else float(lats[i]),
+            'longitude': None if np.isnan(lons[i]) else float(lons[i]),
+            'dist_to_center_km': round(float(dist), 3) if dist and not np.isnan(dist) else None,
+            'first_seen_at': row.get('first_seen_at'),
+            'feature_hash': hashes[i],
+            'model_version': model_version,
+        })
+
+    # Sorted once: the printed top slices and the saved all_results share the order
+    results = rescored + unchanged
     results.sort(key=lambda x: x['deal_score'], reverse=True)
 
-    # Calculate stats
+    # Calculate stats (thresholds: score of the last listing in each top slice)
     total = len(results)
     top_5_pct = int(total * 0.05)
     top_10_pct = int(total * 0.10)
+    top_5_threshold = results[top_5_pct - 1]['deal_score'] if top_5_pct else None
+    top_10_threshold = results[top_10_pct - 1]['deal_score'] if top_10_pct else None
     good_deals = [r for r in results if r['deal_score'] > 0]
 
     print(f"\n{'='*70}")
     print(f"ANALYSIS: {total} listings processed")
     print(f"{'='*70}")
-    print(f"Good deals (below predicted): {len(good_deals)} ({len(good_deals)/total*100:.1f}%)")
-    print(f"Top 5% threshold: {results[top_5_pct-1]['deal_score']:.1f}% below predicted" if top_5_pct > 0 else "")
-    print(f"Top 10% threshold: {results[top_10_pct-1]['deal_score']:.1f}% below predicted" if top_10_pct > 0 else "")
+    print(f"Good deals (below predicted): {len(good_deals)} ({len(good_deals)/total*100 if total else 0:.1f}%)")
+    print(f"Top 5% threshold: {top_5_threshold:.1f}% below predicted" if top_5_pct > 0 else "")
+    print(f"Top 10% threshold: {top_10_threshold:.1f}% below predicted" if top_10_pct > 0 else "")
 
     print(f"\n{'='*70}")
     print(f"TOP 5% BEST DEALS ({top_5_pct} listings)")
@@ -272,47 +433,100 @@ def main(limit=2000, days=12):
         }, f, indent=2, default=str)
     print(f"\nResults saved to {output_file}")
 
-    # Save to database
-    print(f"\nSaving {len(results)} results to database...")
-    save_to_database(supabase, results)
+    # Save to database (unchanged rows are already there)
+    print(f"\nSaving {len(rescored)} results to database...")
+    save_to_database(supabase, rescored, run_stats={
+        'days_analyzed': days,
+        'total_listings': total,
+        'good_deals_count': len(good_deals),
+        'top_5_threshold': top_5_threshold,
+        'top_10_threshold': top_10_threshold,
+    })
 
     return results
 
 
-def save_to_database(supabase, results):
-    """Save deal analysis results to Supabase."""
-    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+def deal_row(r, analyzed_at):
+    """deal_analysis row for one result."""
+    return {
+        'listing_id': r['listing_id'],
+        'url': r['url'],
+        'district': r['district'],
+        'street': r.get('street'),
+        'rooms': r['rooms'],
+        'area_m2': r['area_m2'],
+        'floor_current': r.get('floor_current'),
+        'floor_total': r.get('floor_total'),
+        'year_built': r.get('year_built'),
+        'actual_price': r['actual_price'],
+        'predicted_price': r['predicted_price'],
+        'pred_per_m2': r['pred_per_m2'],
+        'deal_score': r['deal_score'],
+        'latitude': r.get('latitude'),
+        'longitude': r.get('longitude'),
+        'dist_to_center_km': r.get('dist_to_center_km'),
+        'feature_hash': r.get('feature_hash'),
+        'model_version': r.get('model_version'),
+        'analyzed_at': analyzed_at,
+    }
 
-    for r in results:
-        try:
-            supabase.from_('deal_analysis').upsert({
-                'listing_id': r['listing_id'],
-                'run_id': run_id,
-                'url': r['url'],
-                'district': r['district'],
-                'street': r.get('street'),
-                'rooms': r['rooms'],
-                'area_m2': r['area_m2'],
-                'floor_current': r.get('floor_current'),
-                'floor_total': r.get('floor_total'),
-                'year_built': r.get('year_built'),
-                'actual_price': r['actual_price'],
-                'predicted_price': r['predicted_price'],
-                'pred_per_m2': r['pred_per_m2'],
-                'deal_score': r['deal_score'],
-                'latitude': r.get('latitude'),
-                'longitude': r.get('longitude'),
-                'dist_to_center_km': r.get('dist_to_center_km'),
-                'analyzed_at': datetime.now().isoformat(),
-            }, on_conflict='listing_id').execute()
-        except Exception as e:
-            print(f"  Error saving {r['listing_id']}: {e}")
 
-    print(f"✓ Saved to deal_analysis table (run_id: {run_id})")
+def save_to_database(supabase, results, run_stats=None, chunk_size=DEAL_WRITE_CHUNK, retries=DEAL_WRITE_RETRIES):
+    """
+    Save deal analysis results to Supabase as multi-row upserts of chunk_size
+    rows. A failed chunk is retried (with backoff) on its own; the others are
+    not re-sent. The run itself is recorded once in deal_analysis_runs, and
+    its rows share its analyzed_at timestamp.
+    """
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    analyzed_at = datetime.now().isoformat()
+    rows = [deal_row(r, analyzed_at) for r in results]
+
+    started = time.perf_counter()
+    written = 0
+    failed_ids = []
+    requests = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        for attempt in range(retries + 1):
+            requests += 1
+            try:
+                supabase.from_('deal_analysis').upsert(chunk, on_conflict='listing_id').execute()
+                written += len(chunk)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    failed_ids.extend(row['listing_id'] for row in chunk)
+                    print(f"  Error saving rows {start + 1}-{start + len(chunk)}: {e}")
+                else:
+                    print(f"  Rows {start + 1}-{start + len(chunk)} failed ({e}), retrying ({attempt + 1}/{retries})...")
+                    time.sleep(2 ** attempt)
+    seconds = round(time.perf_counter() - started, 2)
+
+    try:
+        supabase.from_('deal_analysis_runs').upsert({
+            'run_id': run_id,
+            'analyzed_at': analyzed_at,
+            **(run_stats or {}),
+            'rows_written': written,
+            'rows_failed': len(failed_ids),
+            'write_seconds': seconds,
+        }, on_conflict='run_id').execute()
+    except Exception as e:
+        print(f"  Error saving run {run_id}: {e}")
+
+    print(f"✓ Saved {written}/{len(rows)} rows to deal_analysis in {seconds:.1f}s "
+          f"({requests} requests, run_id: {run_id})")
+    if failed_ids:
+        print(f"  ✗ {len(failed_ids)} rows failed: {failed_ids}")
+    return {'run_id': run_id, 'written': written, 'failed_ids': failed_ids, 'requests': requests, 'seconds': seconds}
 
 
 if __name__ == "__main__":
-    import sys
-    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
-    days = int(sys.argv[2]) if len(sys.argv) > 2 else 12
-    main(limit=limit, days=days)
+    parser = argparse.ArgumentParser(description="Best Deals Finder")
+    parser.add_argument("limit", nargs="?", type=int, default=2000, help="Max listings to analyze")
+    parser.add_argument("days", nargs="?", type=int, default=12, help="Only listings first seen in the last N days")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rescore listings whose features, model or price changed")
+    args = parser.parse_args()
+    main(limit=args.limit, days=args.days, incremental=args.incremental)
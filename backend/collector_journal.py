@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Crash-safe Run Journal for the Verified Price Collector
+Records the work a collector run has already paid for, so
+`verified_price_collector.py --resume` can continue a run that died (Zyte
+outage, the 90-minute Actions timeout) instead of starting over.
+
+- Stored in Supabase (migrations/002_collector_runs.sql), not on the runner:
+  a killed job's disk and cache are gone, the database is not
+- List pages: the listings each crawled page returned
+- Detail pages: the parsed listing of every NEW id that was scraped
+- Database steps that completed without failed writes (step 5), so a
+  resumed run can skip them; every collector write is idempotent, so a step
+  interrupted mid-way is simply repeated
+- Items are buffered and upserted on (run_id, kind, item_key): re-sending a
+  chunk after a failed flush is harmless
+- Journal write errors are logged and never fail the run
+"""
+
+import logging
+import os
+import threading
+import uuid
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+RUNS_TABLE = "collector_runs"
+ITEMS_TABLE = "collector_run_items"
+ITEMS_CONFLICT = "run_id,kind,item_key"
+JOURNAL_FLUSH_EVERY = int(os.getenv("COLLECTOR_JOURNAL_FLUSH", "25"))  # Items per journal upsert
+JOURNAL_PAGE_SIZE = 1000  # Supabase max rows per request
+
+KIND_PAGE = "page"
+KIND_DETAIL = "detail"
+
+
+def _load_items(supabase: Client, run_id: str, kind: str) -> Dict[int, Any]:
+    """item_key -> payload for one kind of a run's items (keyset pagination on item_key)."""
+    items: Dict[int, Any] = {}
+    after = -1
+    while True:
+        result = supabase.table(ITEMS_TABLE) \
+            .select("item_key, payload") \
+            .eq("run_id", run_id) \
+            .eq("kind", kind) \
+            .gt("item_key", after) \
+            .order("item_key") \
+            .limit(JOURNAL_PAGE_SIZE) \
+            .execute()
+        rows = result.data or []
+        for row in rows:
+            items[row["item_key"]] = row["payload"]
+        if len(rows) < JOURNAL_PAGE_SIZE:
+            return items
+        after = rows[-1]["item_key"]
+
+
+class RunJournal:
+    """
+    Journal of one collector run. Open it with `RunJournal.open`; `pages`,
+    `details` and `steps_done` hold what earlier attempts of the run finished.
+    `record_page` / `record_detail` are thread-safe (called from crawl threads).
+    """
+
+    def __init__(
+        self,
+        supabase: Client,
+        run_id: str,
+        mode: str,
+        pages: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+        details: Optional[Dict[int, Dict[str, Any]]] = None,
+        steps_done: Optional[List[str]] = None,
+        enabled: bool = True,
+    ):
+        self.supabase = supabase
+        self.run_id = run_id
+        self.mode = mode
+        self.pages = pages or {}
+        self.details = details or {}
+        self.steps_done = list(steps_done or [])
+        self.enabled = enabled
+        self.written = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ open
+
+    @classmethod
+    def start(cls, supabase: Client, mode: str) -> "RunJournal":
+        """Journal for a fresh run (disabled with a warning if the tables are missing)."""
+        run_id = str(uuid.uuid4())
+        try:
+            supabase.table(RUNS_TABLE).insert({
+                "run_id": run_id,
+                "run_date": date.today().isoformat(),
+                "mode": mode,
+                "status": "RUNNING",
+            }).execute()
+        except Exception as e:
+            logger.warning(f"  ⚠️ Run journal disabled, this run cannot be resumed: {e}")
+            return cls(supabase, run_id, mode, enabled=False)
+        logger.info(f"  📓 Run journal: {run_id}")
+        return cls(supabase, run_id, mode)
+
+    @classmethod
+    def resume(cls, supabase: Client, mode: str) -> Optional["RunJournal"]:
+        """Journal of today's latest unfinished run in `mode`, or None if there is none."""
+        result = supabase.table(RUNS_TABLE) \
+            .select("run_id, steps_done, resumed_count") \
+            .eq("run_date", date.today().isoformat()) \
+            .eq("mode", mode) \
+            .neq("status", "COMPLETED") \
+            .order("started_at", desc=True) \
+            .limit(1) \
+            .execute()
+        if not result.data:
+            return None
+
+        run = result.data[0]
+        run_id = run["run_id"]
+        pages = _load_items(supabase, run_id, KIND_PAGE)
+        details = _load_items(supabase, run_id, KIND_DETAIL)
+        supabase.table(RUNS_TABLE).update({
+            "status": "RUNNING",
+            "error": None,
+            "resumed_count": (run["resumed_count"] or 0) + 1,
+        }).eq("run_id", run_id).execute()
+
+        steps_done = run["steps_done"] or []
+        logger.info(
+            f"  📓 Resuming run {run_id}: {len(pages)} list pages, {len(details)} detail pages, "
+            f"steps done: {', '.join(steps_done) or 'none'}"
+        )
+        return cls(supabase, run_id, mode, pages=pages, details=details, steps_done=steps_done)
+
+    @classmethod
+    def open(cls, supabase: Client, mode: str, resume: bool = False) -> "RunJournal":
+        """Resume today's unfinished run if asked (and there is one), else start a new one."""
+        if resume:
+            try:
+                journal = cls.resume(supabase, mode)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Could not read the run journal, starting a new run: {e}")
+                journal = None
+            if journal:
+                return journal
+            logger.info("  📓 No unfinished run to resume today, starting a new one")
+        return cls.start(supabase, mode)
+
+    # ------------------------------------------------------------------ crawl items
+
+    def record_page(self, page: int, listings: List[Dict[str, Any]]):
+        """A list page was crawled; `listings` are its ListingBasic dicts."""
+        self._record(KIND_PAGE, page, listings, self.pages)
+
+    def record_detail(self, listing_id: int, listing: Dict[str, Any]):
+        """A NEW listing's detail page was scraped and parsed."""
+        self._record(KIND_DETAIL, listing_id, listing, self.details)
+
+    def _record(self, kind: str, key: int, payload: Any, store: Dict[int, Any]):
+        with self._lock:
+            store[key] = payload
+            if not self.enabled:
+                return
+            self._buffer.append({"run_id": self.run_id, "kind": kind, "item_key": key, "payload": payload})
+            full = len(self._buffer) >= JOURNAL_FLUSH_EVERY
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write buffered items. Failed rows stay buffered and are re-sent with the next flush."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        try:
+            self.supabase.table(ITEMS_TABLE).upsert(rows, on_conflict=ITEMS_CONFLICT).execute()
+            self.written += len(rows)
+        except Exception as e:
+            logger.warning(f"  ⚠️ Run journal write failed ({len(rows)} items kept for retry): {e}")
+            with self._lock:
+                self._buffer[:0] = rows
+
+    # ------------------------------------------------------------------ steps
+
+    def is_done(self, step: str) -> bool:
+        return step in self.steps_done
+
+    def mark_done(self, step: str):
+        """Record that a database step was fully applied, so a resumed run skips it."""
+        if step not in self.steps_done:
+            self.steps_done.append(step)
+        self._update_run({"steps_done": self.steps_done})
+
+    def finish(self, status: str = "COMPLETED", stats: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Close the run: COMPLETED runs are never resumed, FAILED ones can be."""
+        self.flush()
+        self._update_run({
+            "status": status,
+            "stats": stats,
+            "error": error,
+            "finished_at": datetime.now().isoformat(),
+        })
+
+    def _update_run(self, fields: Dict[str, Any]):
+        if not self.enabled:
+            return
+        try:
+            self.supabase.table(RUNS_TABLE).update(fields).eq("run_id", self.run_id).execute()
+        except Exception as e:
+            logger.warning(f"  ⚠️ Run journal update failed: {e}")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Concurrent List/Detail Crawler for TikraKaina
+Producer/consumer pipeline used by the verified price collector: list pages
+are the producers, and every listing that needs its detail page is queued the
+moment its list page arrives, so detail fetches overlap the rest of the list
+crawl instead of waiting for it.
+
+- One concurrency limit (in-flight Zyte requests) shared by list and detail fetches
+- One global rate limiter (request starts per second) across all of them
+- The fetch functions are the collector's blocking ones, run on a thread pool
+- The crawl stops at the first empty list page, like the sequential crawl did;
+  pages fetched past it are discarded
+- Resumable: pages and details finished by an earlier attempt are passed in
+  and not fetched again; on_page/on_detail report new ones as they complete
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Spaces request starts at least 1/rate seconds apart across every task on
+    the event loop. A rate of 0 disables it.
+    """
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next_start = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+@dataclass
+class CrawlResult:
+    """Output of one crawl."""
+    items: List[Any]  # List-page items in page order, up to the first empty page
+    details: Dict[Hashable, Any] = field(default_factory=dict)  # detail_key -> fetch_detail result (None on error)
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+async def crawl(
+    fetch_page: Callable[[int], List[Any]],
+    fetch_detail: Callable[[Any], Any],
+    detail_key: Callable[[Any], Optional[Hashable]],
+    max_pages: int,
+    concurrency: int = 8,
+    rate_per_sec: float = 4.0,
+    page_window: Optional[int] = None,
+    done_pages: Optional[Dict[int, List[Any]]] = None,
+    done_details: Optional[Dict[Hashable, Any]] = None,
+    on_page: Optional[Callable[[int, List[Any]], None]] = None,
+    on_detail: Optional[Callable[[Hashable, Any], None]] = None,
+) -> CrawlResult:
+    """
+    Crawl list pages 1..max_pages and the detail pages they reveal.
+
+    fetch_page(page) returns the page's items ([] ends the crawl).
+    detail_key(item) returns a key for items whose detail page is needed, or
+    None to skip; each key is fetched once with fetch_detail(item).
+    page_window bounds how many list pages are in flight (default: half the
+    concurrency) so detail fetches are not starved and few pages are fetched
+    past the last one.
+
+    done_pages / done_details hold results of an earlier attempt (page ->
+    items, key -> detail), used instead of fetching. on_page(page, items) and
+    on_detail(key, detail) are called on the fetching thread for every
+    non-empty page and non-None detail fetched by this crawl.
+    """
+    concurrency = max(1, concurrency)
+    page_window = max(1, page_window or concurrency // 2)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawl")
+    limiter = RateLimiter(rate_per_sec)
+    slots = asyncio.Semaphore(concurrency)
+    page_slots = asyncio.Semaphore(page_window)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    pages: Dict[int, List[Any]] = {}
+    details: Dict[Hashable, Any] = {}
+    done_pages = done_pages or {}
+    done_details = done_details or {}
+    queued = set()
+    stop_page = max_pages + 1
+    counts = {
+        "list_fetches": 0, "detail_fetches": 0, "detail_errors": 0, "details_skipped": 0,
+        "pages_resumed": 0, "details_resumed": 0,
+    }
+    started = time.perf_counter()
+
+    def run(fn, arg, done):
+        result = fn(arg)
+        if done is not None and result:
+            done(result)
+        return result
+
+    async def call(fn, arg, done=None):
+        async with slots:
+            await limiter.wait()
+            return await loop.run_in_executor(executor, run, fn, arg, done)
+
+    async def fetch_list(page: int):
+        nonlocal stop_page
+        try:
+            if page in done_pages:
+                items = done_pages[page]
+                counts["pages_resumed"] += 1
+            else:
+                items = await call(fetch_page, page, on_page and (lambda items: on_page(page, items)))
+                counts["list_fetches"] += 1
+            if not items:
+                if page < stop_page:
+                    stop_page = page
+                    logger.info(f"No more listings found after page {page - 1}")
+                return
+            pages[page] = items
+            for item in items:
+                key = detail_key(item)
+                if key is None or key in queued:
+                    continue
+                queued.add(key)
+                if key in done_details:
+                    details[key] = done_details[key]
+                    counts["details_resumed"] += 1
+                else:
+                    queue.put_nowait((page, key, item))
+        finally:
+            page_slots.release()
+
+    async def detail_worker():
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            page, key, item = entry
+            if page >= stop_page:  # Its list page is past the end of the crawl
+                counts["details_skipped"] += 1
+                continue
+            try:
+                details[key] = await call(fetch_detail, item, on_detail and (lambda detail: on_detail(key, detail)))
+            except Exception as e:
+                logger.error(f"  Detail fetch failed for {key}: {e}")
+                details[key] = None
+                counts["detail_errors"] += 1
+            counts["detail_fetches"] += 1
+
+    workers = [asyncio.create_task(detail_worker()) for _ in range(concurrency)]
+    page_tasks = []
+    try:
+        for page in range(1, max_pages + 1):
+            await page_slots.acquire()
+            if page >= stop_page:
+                page_slots.release()
+                break
+            page_tasks.append(asyncio.create_task(fetch_list(page)))
+        await asyncio.gather(*page_tasks)
+
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers + page_tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    items = [item for page in sorted(pages) if page < stop_page for item in pages[page]]
+    stats = {
+        "pages": sum(1 for page in pages if page < stop_page),
+        "items": len(items),
+        **counts,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    logger.info(f"🕸️ Crawl done: {stats}")
+    return CrawlResult(items=items, details=details, stats=stats)
+
+
+def run_crawl(*args, **kwargs) -> CrawlResult:
+    """Blocking wrapper around `crawl` for the synchronous collector."""
+    return asyncio.run(crawl(*args, **kwargs))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compiled Feature Encoder for TikraKaina
+Turns a model-ready feature dict into a float64 NumPy row and scores it on the
+LightGBM booster directly, without building one-row pandas DataFrames.
+
+- Column positions and district category codes are precomputed once
+- district_encoded is mapped to its code in district_categories.json
+  (unknown districts fall back to "Other", same as _coerce_dtypes_and_order)
+- Numeric values are coerced like pd.to_numeric(errors="coerce"): anything
+  that is not a number becomes NaN, which LightGBM treats as missing
+
+Parity with the DataFrame path is covered by tests/test_feature_encoder.py.
+"""
+
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CAT_COL = "district_encoded"
+OTHER_DISTRICT = "Other"
+
+
+def _to_float(value: Any) -> float:
+    """Coerce a single feature value to float, NaN if it is missing or not numeric."""
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class FeatureEncoder:
+    """
+    Precompiled dict -> float64 vector encoder for the new model.
+    Use `get_encoder()` to share one instance built from the model registry.
+    """
+
+    def __init__(self, feature_order: Sequence[str], district_categories: Iterable[str]):
+        self.feature_order: List[str] = list(feature_order)
+        self.district_categories: List[str] = list(district_categories)
+        self.n_features = len(self.feature_order)
+
+        self._district_codes: Dict[str, float] = {
+            name: float(code) for code, name in enumerate(self.district_categories)
+        }
+        self._other_code = self._district_codes.get(OTHER_DISTRICT, math.nan)
+        self._cat_index: Optional[int] = (
+            self.feature_order.index(CAT_COL) if CAT_COL in self.feature_order else None
+        )
+        self._numeric = [(i, name) for i, name in enumerate(self.feature_order) if name != CAT_COL]
+
+    def district_name(self, district: Any) -> str:
+        """Return the district if it is a known category, otherwise "Other"."""
+        if isinstance(district, str) and district in self._district_codes:
+            return district
+        return OTHER_DISTRICT
+
+    def district_code(self, district: Any) -> float:
+        """Category code of the district as LightGBM saw it during training."""
+        if isinstance(district, str):
+            return self._district_codes.get(district, self._other_code)
+        return self._other_code
+
+    def encode(self, features: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Encode one feature dict into a 1-D float64 row in training column order."""
+        row = out if out is not None else np.empty(self.n_features, dtype=np.float64)
+        for i, name in self._numeric:
+            row[i] = _to_float(features.get(name))
+        if self._cat_index is not None:
+            row[self._cat_index] = self.district_code(features.get(CAT_COL))
+        return row
+
+    def encode_many(self, rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Encode several feature dicts into a 2-D (n_rows, n_features) float64 matrix."""
+        X = np.empty((len(rows), self.n_features), dtype=np.float64)
+        for i, features in enumerate(rows):
+            self.encode(features, out=X[i])
+        return X
+
+    def decode(self, row: np.ndarray) -> Dict[str, Any]:
+        """Turn an encoded row back into a feature dict (district as its name)."""
+        out: Dict[str, Any] = {}
+        for i, name in enumerate(self.feature_order):
+            if i == self._cat_index:
+                code = row[i]
+                out[name] = self.district_categories[int(code)] if not math.isnan(code) else OTHER_DISTRICT
+            else:
+                out[name] = float(row[i])
+        return out
+
+    def predict(self, model: Any, X: np.ndarray) -> np.ndarray:
+        """
+        Score encoded rows on the raw LightGBM booster.
+        Accepts an LGBMRegressor or a Booster; returns one prediction per row.
+        """
+        booster = getattr(model, "booster_", model)
+        return booster.predict(np.atleast_2d(X))
+
+
+# Singleton instance for the process
+_encoder_instance: Optional[FeatureEncoder] = None
+
+
+def get_encoder() -> FeatureEncoder:
+    """Get or create the encoder for the registry's feature order and districts."""
+    global _encoder_instance
+
+    if _encoder_instance is None:
+        from model_registry import get_registry
+
+        registry = get_registry()
+        if not registry.feature_order or not registry.district_categories:
+            raise RuntimeError("Model configs not available in registry")
+        _encoder_instance = FeatureEncoder(registry.feature_order, registry.district_categories)
+        logger.info(f"✅ Feature encoder compiled ({_encoder_instance.n_features} features)")
+
+    return _encoder_instance
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Offline Vilnius Street Gazetteer for TikraKaina
+Resolves addresses locally before anything goes to Nominatim.
+
+The index (vilnius_gazetteer.npz, next to district_categories.json) holds three
+parallel arrays sorted by key: a 64-bit hash of the normalized address and its
+lat/lon. A lookup is one np.searchsorted over ~24 bytes per address, so the
+whole of Vilnius fits in a few MB and resolves in microseconds.
+
+Built from:
+- Every found address in the persistent geocode cache (geocode_cache.py)
+- Optional OSM extracts: Overpass JSON (nodes/ways with addr:street and
+  addr:housenumber, `out center;`) or CSV with street,housenumber,lat,lon
+- Street entries ("Vilnius, <street>") use the mean of that street's houses
+
+Usage:
+    python gazetteer.py build                           # From the geocode cache
+    python gazetteer.py build --osm vilnius_addr.json   # Plus an OSM extract
+    python gazetteer.py lookup "Vilnius, Žirmūnai, Kalvarijų g. 5"
+    python gazetteer.py stats
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from geocode_cache import Coords, get_geocode_cache, normalize_address
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = Path(os.getenv(
+    "GAZETTEER_PATH", Path(__file__).resolve().parent / "vilnius_gazetteer.npz"
+))
+GAZETTEER_VERSION = 1
+CITY = "Vilnius"
+CITY_KEY = normalize_address(CITY)
+
+
+def _hash_key(key: str) -> np.uint64:
+    return np.uint64(int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little"))
+
+
+def _candidate_keys(addr: str) -> List[str]:
+    """
+    Keys to try for a query: the normalized address itself, then for
+    'Vilnius, <district>, <street ...>' the same address without the district
+    (OSM addresses carry no district).
+    """
+    key = normalize_address(addr)
+    keys = [key]
+    parts = key.split(", ")
+    if len(parts) == 3 and parts[0] == CITY_KEY:
+        keys.append(f"{parts[0]}, {parts[2]}")
+    return keys
+
+
+class Gazetteer:
+    """
+    Sorted-array address index. Use `get_gazetteer()` for the shared instance.
+    """
+
+    def __init__(self, hashes: np.ndarray, lat: np.ndarray, lon: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        order = np.argsort(hashes, kind="stable")
+        self.hashes = np.ascontiguousarray(hashes[order], dtype=np.uint64)
+        self.lat = np.ascontiguousarray(lat[order], dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon[order], dtype=np.float64)
+        self.meta = meta or {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "Gazetteer":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(data["hashes"], data["lat"], data["lon"], meta)
+
+    def save(self, path: Path = GAZETTEER_PATH):
+        np.savez_compressed(
+            path, hashes=self.hashes, lat=self.lat, lon=self.lon, meta=np.array(json.dumps(self.meta))
+        )
+
+    def _find(self, key: str) -> Optional[int]:
+        h = _hash_key(key)
+        i = int(np.searchsorted(self.hashes, h))
+        if i < len(self.hashes) and self.hashes[i] == h:
+            return i
+        return None
+
+    def lookup(self, addr: str) -> Coords:
+        """(lat, lon) for an address, (None, None) if it is not in the index."""
+        for key in _candidate_keys(addr):
+            i = self._find(key)
+            if i is not None:
+                self.hits += 1
+                return float(self.lat[i]), float(self.lon[i])
+        self.misses += 1
+        return None, None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "bytes": int(self.hashes.nbytes + self.lat.nbytes + self.lon.nbytes),
+            "process_hits": self.hits,
+            "process_misses": self.misses,
+            **self.meta,
+        }
+
+
+# Shared instance for the process (None when no index file has been built)
+_gazetteer_instance: Optional[Gazetteer] = None
+_gazetteer_loaded = False
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Load the gazetteer index once per process; None if the file is missing or unreadable."""
+    global _gazetteer_instance, _gazetteer_loaded
+
+    if not _gazetteer_loaded:
+        with _gazetteer_lock:
+            if not _gazetteer_loaded:
+                try:
+                    if GAZETTEER_PATH.exists():
+                        _gazetteer_instance = Gazetteer.load(GAZETTEER_PATH)
+                        logger.info(f"✅ Gazetteer loaded ({len(_gazetteer_instance)} addresses)")
+                    else:
+                        logger.info(f"Gazetteer index not found at {GAZETTEER_PATH.name}, using Nominatim only")
+                except Exception as e:
+                    logger.error(f"❌ Failed to load gazetteer: {e}")
+                _gazetteer_loaded = True
+    return _gazetteer_instance
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _read_osm(path: Path) -> Iterable[Tuple[str, str, float, float]]:
+    """Yield (street, housenumber, lat, lon) from an Overpass JSON or CSV extract."""
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                street = row.get("street") or row.get("addr:street")
+                house = row.get("housenumber") or row.get("addr:housenumber") or ""
+                if street and row.get("lat") and row.get("lon"):
+                    yield street, house, float(row["lat"]), float(row["lon"])
+        return
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for element in data.get("elements", []):
+        tags = element.get("tags", {})
+        street = tags.get("addr:street")
+        point = element if "lat" in element else element.get("center")
+        if street and point:
+            yield street, tags.get("addr:housenumber", ""), float(point["lat"]), float(point["lon"])
+
+
+def build_gazetteer(osm_paths: Iterable[Path] = (), use_geocode_cache: bool = True) -> Gazetteer:
+    """Build the index from OSM extracts and the persistent geocode cache."""
+    entries: Dict[str, Tuple[float, float]] = {}
+    street_points: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+    sources: List[str] = []
+
+    for path in osm_paths:
+        n = 0
+        for street, house, lat, lon in _read_osm(Path(path)):
+            addr = f"{CITY}, {street} {house}".strip()
+            entries.setdefault(normalize_address(addr), (lat, lon))
+            street_points[normalize_address(f"{CITY}, {street}")].append((lat, lon))
+            n += 1
+        sources.append(f"{Path(path).name}:{n}")
+        logger.info(f"  OSM {Path(path).name}: {n} addresses")
+
+    # Street-level entries: centroid of the street's houses
+    for key, points in street_points.items():
+        if key not in entries:
+            entries[key] = (float(np.mean([p[0] for p in points])), float(np.mean([p[1] for p in points])))
+
+    # Geocode cache results win over OSM: they are exactly what Nominatim returned
+    if use_geocode_cache:
+        n = 0
+        for key, lat, lon in get_geocode_cache().iter_found():
+            entries[key] = (lat, lon)
+            n += 1
+        sources.append(f"geocode_cache:{n}")
+        logger.info(f"  Geocode cache: {n} addresses")
+
+    keys = list(entries)
+    meta = {
+        "version": GAZETTEER_VERSION,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "sources": sources,
+    }
+    return Gazetteer(
+        np.array([_hash_key(k) for k in keys], dtype=np.uint64),
+        np.array([entries[k][0] for k in keys], dtype=np.float64),
+        np.array([entries[k][1] for k in keys], dtype=np.float64),
+        meta,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Vilnius street gazetteer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Rebuild the index")
+    build.add_argument("--osm", type=Path, action="append", default=[], help="Overpass JSON or CSV extract (repeatable)")
+    build.add_argument("--no-geocode-cache", action="store_true", help="Do not include geocode cache results")
+    build.add_argument("--output", type=Path, default=GAZETTEER_PATH, help="Index file to write")
+    lookup = sub.add_parser("lookup", help="Resolve one address against the index")
+    lookup.add_argument("address")
+    sub.add_parser("stats", help="Show index size and provenance")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    if args.command == "build":
+        gazetteer = build_gazetteer(args.osm, use_geocode_cache=not args.no_geocode_cache)
+        gazetteer.save(args.output)
+        print(f"✅ Wrote {len(gazetteer)} addresses to {args.output}")
+        return
+
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        raise SystemExit(f"No gazetteer index at {GAZETTEER_PATH}, run `python gazetteer.py build` first")
+    if args.command == "lookup":
+        start = time.perf_counter()
+        coords = gazetteer.lookup(args.address)
+        print(f"{coords} in {(time.perf_counter() - start) * 1e6:.1f} µs")
+    else:
+        for key, value in gazetteer.stats().items():
+            print(f"{key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Vectorized Distance Kernel for TikraKaina
+NumPy replacements for per-listing `geopy.distance.geodesic` calls.
+
+- `distance_km`: WGS84 ellipsoid, local (mid-latitude) approximation. Uses the
+  meridional and prime-vertical radii of curvature at the mean latitude of each
+  pair, so it keeps geodesic accuracy at city scale
+- `haversine_km`: great circle on a sphere of the mean Earth radius, for
+  callers that want the textbook formula
+- `distance_to_center_km`: `distance_km` to CITY_CENTER, the dist_to_center_km
+  feature
+
+All functions broadcast over arrays (or take scalars and return a float);
+missing coordinates (None/NaN) give NaN.
+
+Accuracy against geopy geodesic (Karney, WGS84), measured by `python geo.py`
+on a 200x200 grid over 54.55-54.85 N, 25.05-25.50 E (every point to CITY_CENTER,
+0-23 km):
+    distance_km     max abs error ~3 cm, max rel error ~1e-6
+    haversine_km    max abs error ~50 m, max rel error ~0.33% (sphere vs ellipsoid)
+The error of `distance_km` grows with distance squared (~2.5e-5 relative at
+100 km), so it is meant for city-scale distances, not intercity ones.
+Speed: ~0.1 s per million points vs ~140 us per geodesic call.
+"""
+
+from typing import Any, Tuple
+
+import numpy as np
+
+CITY_CENTER: Tuple[float, float] = (54.6872, 25.2797)  # Vilnius center coordinates
+
+# WGS84
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+MEAN_EARTH_RADIUS_KM = 6371.0088  # IUGG mean radius R1
+
+
+def _as_float_array(x: Any) -> np.ndarray:
+    """Coerce coordinates to float64, None -> NaN."""
+    if x is None:
+        return np.array(np.nan)
+    arr = np.asarray(x)
+    if arr.dtype == object:
+        arr = np.array([np.nan if v is None else v for v in arr.ravel()], dtype=np.float64).reshape(arr.shape)
+    return arr.astype(np.float64, copy=False)
+
+
+def _result(d: np.ndarray) -> Any:
+    return float(d) if d.ndim == 0 else d
+
+
+def distance_km(lat, lon, ref_lat, ref_lon) -> Any:
+    """Ellipsoidal (WGS84) distance in km between point arrays, local approximation."""
+    phi1 = np.radians(_as_float_array(lat))
+    phi2 = np.radians(_as_float_array(ref_lat))
+    dlam = np.radians(_as_float_array(lon) - _as_float_array(ref_lon))
+
+    phi_m = 0.5 * (phi1 + phi2)
+    sin_m = np.sin(phi_m)
+    w = np.sqrt(1.0 - WGS84_E2 * sin_m * sin_m)
+    meridional = WGS84_A_KM * (1.0 - WGS84_E2) / (w * w * w)
+    prime_vertical = WGS84_A_KM / w
+
+    return _result(np.hypot(meridional * (phi1 - phi2), prime_vertical * np.cos(phi_m) * dlam))
+
+
+def haversine_km(lat, lon, ref_lat, ref_lon, radius_km: float = MEAN_EARTH_RADIUS_KM) -> Any:
+    """Great-circle distance in km on a sphere."""
+    phi1 = np.radians(_as_float_array(lat))
+    phi2 = np.radians(_as_float_array(ref_lat))
+    dphi = phi1 - phi2
+    dlam = np.radians(_as_float_array(lon) - _as_float_array(ref_lon))
+
+    h = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    return _result(2 * radius_km * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0))))
+
+
+def distance_to_center_km(lat, lon, center: Tuple[float, float] = CITY_CENTER) -> Any:
+    """dist_to_center_km feature for one listing or arrays of listings."""
+    return distance_km(lat, lon, center[0], center[1])
+
+
+def accuracy_report(n: int = 200) -> dict:
+    """Compare both kernels against geopy geodesic on an n x n grid over Vilnius."""
+    from geopy.distance import geodesic
+
+    lats, lons = np.meshgrid(np.linspace(54.55, 54.85, n), np.linspace(25.05, 25.50, n))
+    lats, lons = lats.ravel(), lons.ravel()
+    reference = np.array([geodesic((a, b), CITY_CENTER).km for a, b in zip(lats, lons)])
+
+    report = {"points": len(lats), "max_km": float(reference.max())}
+    mask = reference > 0.01
+    for name, fn in (("distance_km", distance_km), ("haversine_km", haversine_km)):
+        err = np.abs(fn(lats, lons, *CITY_CENTER) - reference)
+        report[name] = {
+            "max_abs_m": float(err.max() * 1000),
+            "max_rel": float((err[mask] / reference[mask]).max()),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    print(json.dumps(accuracy_report(), indent=2))
+
+    lat = np.random.default_rng(0).uniform(54.55, 54.85, 1_000_000)
+    lon = np.random.default_rng(1).uniform(25.05, 25.50, 1_000_000)
+    start = time.perf_counter()
+    distance_to_center_km(lat, lon)
+    print(f"distance_to_center_km: 1,000,000 points in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Persistent Geocode Cache for TikraKaina
+Disk-backed (SQLite) address -> coordinates cache shared by every process on
+the host: gunicorn workers, best_deals.py and the collector all read the same
+file, and entries survive deploys.
+
+- Address keys are normalized (case, whitespace, comma spacing, Unicode form)
+- Found coordinates are kept indefinitely
+- Not-found results expire after GEOCODE_NEGATIVE_TTL_DAYS, so a street that
+  Nominatim learns later is retried
+- Lookup errors (timeouts, rate limits) are never cached
+
+Usage:
+    python geocode_cache.py stats
+    python geocode_cache.py warm               # Seed from listing_snapshots addresses
+    python geocode_cache.py warm --limit 500
+    python geocode_cache.py purge-negative     # Drop cached not-found results
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_PATH = Path(os.getenv(
+    "GEOCODE_CACHE_PATH", Path(__file__).resolve().parent / "geocode_cache.sqlite"
+))
+NEGATIVE_TTL_SECONDS = float(os.getenv("GEOCODE_NEGATIVE_TTL_DAYS", "7")) * 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    lat REAL,
+    lon REAL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_WS_RE = re.compile(r"\s+")
+_COMMA_RE = re.compile(r"\s*,\s*")
+
+Coords = Tuple[Optional[float], Optional[float]]
+
+
+def normalize_address(addr: str) -> str:
+    """Cache key for an address: 'Vilnius ,  Žirmūnai,Kalvarijų g. 5' -> 'vilnius, žirmūnai, kalvarijų g. 5'."""
+    key = unicodedata.normalize("NFC", addr).casefold()
+    key = _WS_RE.sub(" ", key)
+    key = _COMMA_RE.sub(", ", key)
+    return key.strip(" ,")
+
+
+class GeocodeCache:
+    """
+    SQLite-backed geocode cache with a per-process read-through dict.
+    Use `get_geocode_cache()` to share one instance per process.
+    """
+
+    def __init__(self, path: Path = GEOCODE_CACHE_PATH, negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        self.path = Path(path)
+        self.negative_ttl = negative_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        # WAL lets the API workers read while a batch job writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._memory: Dict[str, Tuple[Coords, float]] = {}
+        self.pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, coords: Coords, updated_at: float) -> bool:
+        return coords[0] is not None or (time.time() - updated_at) < self.negative_ttl
+
+    def get(self, addr: str) -> Tuple[bool, Coords]:
+        """Return (hit, (lat, lon)). A hit with (None, None) is a cached not-found."""
+        key = normalize_address(addr)
+
+        item = self._memory.get(key)
+        if item is None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT lat, lon, updated_at FROM geocodes WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None:
+                item = ((row[0], row[1]), row[2])
+                self._memory[key] = item
+
+        if item is not None and self._fresh(*item):
+            self.hits += 1
+            return True, item[0]
+
+        self.misses += 1
+        return False, (None, None)
+
+    def put(self, addr: str, lat: Optional[float], lon: Optional[float]):
+        """Store a lookup result; (None, None) records a not-found."""
+        key = normalize_address(addr)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocodes (key, query, lat, lon, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, addr, lat, lon, now),
+            )
+            self._conn.commit()
+        self._memory[key] = ((lat, lon), now)
+
+    def iter_found(self):
+        """Yield (key, lat, lon) for every cached address that was found."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, lat, lon FROM geocodes WHERE lat IS NOT NULL").fetchall()
+        yield from rows
+
+    def purge_negative(self) -> int:
+        """Delete every cached not-found result. Returns the number removed."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM geocodes WHERE lat IS NULL").rowcount
+            self._conn.commit()
+        self._memory = {k: v for k, v in self._memory.items() if v[0][0] is not None}
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        cutoff = time.time() - self.negative_ttl
+        with self._lock:
+            found, negative, expired = self._conn.execute(
+                "SELECT "
+                "SUM(CASE WHEN lat IS NOT NULL THEN 1 ELSE 0 END), "
+                "SUM(CASE WHEN lat IS NULL AND updated_at >= ? THEN 1 ELSE 0 END), "
+                "SUM(CASE WHEN lat IS NULL AND updated_at < ? THEN 1 ELSE 0 END) "
+                "FROM geocodes",
+                (cutoff, cutoff),
+            ).fetchone()
+        return {
+            "path": str(self.path),
+            "found": found or 0,
+            "not_found": negative or 0,
+            "expired_not_found": expired or 0,
+            "process_hits": self.hits,
+            "process_misses": self.misses,
+        }
+
+
+# Singleton instance for the process
+_cache_instance: Optional[GeocodeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """Get or create the process-wide geocode cache (reopened after a fork)."""
+    global _cache_instance
+
+    if _cache_instance is None or _cache_instance.pid != os.getpid():
+        with _cache_lock:
+            if _cache_instance is None or _cache_instance.pid != os.getpid():
+                _cache_instance = GeocodeCache()
+    return _cache_instance
+
+
+# ============================================================================
+# WARM-UP
+# ============================================================================
+
+def warm_from_snapshots(limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Seed the cache with every distinct (district, street, house number) in
+    listing_snapshots, using the same fallback chain as best_deals.py.
+    Network lookups go through model_utils' shared Nominatim throttle
+    (NOMINATIM_RATE_PER_SEC, one request per second by default).
+    """
+    from best_deals import geocode_db_address
+    from verified_price_collector import get_supabase, paginated_query
+
+    rows = paginated_query(
+        get_supabase(), "listing_snapshots", "district, street, house_number:raw_features->>house_number"
+    )
+    addresses = sorted({
+        ((r.get("district") or "").strip(), (r.get("street") or "").strip(), (r.get("house_number") or "").strip())
+        for r in rows
+        if r.get("district") or r.get("street")
+    })
+    if limit:
+        addresses = addresses[:limit]
+
+    cache = get_geocode_cache()
+    misses_before = cache.misses
+    logger.info(f"🌍 Warming geocode cache from {len(addresses)} distinct addresses...")
+
+    counts = {"addresses": len(addresses), "located": 0, "unlocated": 0}
+    for i, (district, street, house_number) in enumerate(addresses):
+        lat, lon = geocode_db_address(district, street, house_number)
+        counts["located" if lat is not None else "unlocated"] += 1
+        if (i + 1) % 100 == 0:
+            logger.info(f"  [{i + 1}/{len(addresses)}] warmed ({cache.misses - misses_before} Nominatim lookups)")
+
+    counts["nominatim_lookups"] = cache.misses - misses_before
+    logger.info(f"✅ Geocode cache warmed: {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent geocode cache tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show cache contents")
+    warm = sub.add_parser("warm", help="Seed from listing_snapshots addresses")
+    warm.add_argument("--limit", type=int, help="Only the first N distinct addresses")
+    sub.add_parser("purge-negative", help="Drop cached not-found results")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    if args.command == "stats":
+        for key, value in get_geocode_cache().stats().items():
+            print(f"{key:>18}: {value}")
+    elif args.command == "warm":
+        warm_from_snapshots(args.limit)
+    else:
+        print(f"Removed {get_geocode_cache().purge_negative()} not-found entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Raw HTML Archive for Aruodas.lt fetches
+
+Every page fetched through Zyte is kept on disk so it can be re-parsed later
+(new features, markup changes) without paying for the request again.
+
+- Content-addressed: each body is stored once under its SHA-256,
+  compressed with zstd if `zstandard` is installed, gzip otherwise
+- Indexed in SQLite by listing id, URL and fetch date
+- Writing never raises: a full disk must not break scraping
+- Durable copy in Supabase Storage (bucket HTML_ARCHIVE_BUCKET, see
+  migrations/005_html_archive_bucket.sql): `push` uploads the fetches not
+  pushed yet as one tar shard, `pull` merges every shard not imported yet.
+  CI runners start with an empty archive and push at the end of each run
+
+Layout (HTML_ARCHIVE_DIR, default backend/html_archive):
+    index.sqlite
+    blobs/ab/abcdef....html.zst   (or .html.gz)
+
+Storage layout:
+    shards/2025-01-31/20250131T061502-1a2b3c.tar   (index.jsonl + blobs/...)
+
+Usage:
+    python html_archive.py stats
+    python html_archive.py push                      # Upload new fetches as one shard
+    python html_archive.py pull                      # Merge shards from storage
+    python html_archive.py backfill                  # Re-parse -> listing_snapshots.raw_features
+    python html_archive.py backfill --since 2025-01-01 --workers 8 --dry-run
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import tarfile
+import threading
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is the fallback
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.getenv("HTML_ARCHIVE_DIR", Path(__file__).resolve().parent / "html_archive"))
+ARCHIVE_ENABLED = os.getenv("HTML_ARCHIVE_ENABLED", "1") != "0"
+ARCHIVE_BUCKET = os.getenv("HTML_ARCHIVE_BUCKET", "html-archive")
+SHARD_PREFIX = "shards"
+STORAGE_LIST_LIMIT = 1000
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    listing_id INTEGER,
+    url TEXT NOT NULL,
+    fetch_date TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    stored_bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fetches_listing ON fetches (listing_id, fetch_date);
+CREATE INDEX IF NOT EXISTS idx_fetches_date ON fetches (fetch_date);
+-- Sync with Supabase Storage: highest fetch id already pushed, shards already merged
+CREATE TABLE IF NOT EXISTS pushes (
+    shard TEXT PRIMARY KEY,
+    last_fetch_id INTEGER NOT NULL,
+    pushed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS imported_shards (
+    shard TEXT PRIMARY KEY,
+    imported_at TEXT NOT NULL
+);
+"""
+
+_FETCH_COLUMNS = ("listing_id", "url", "fetch_date", "fetched_at", "sha256", "codec", "raw_bytes", "stored_bytes")
+
+_LISTING_ID_RE = re.compile(r"-(\d+)/?(?:[?#].*)?$")
+
+
+def _listing_id(url: str) -> Optional[int]:
+    """Listing id from a detail URL like '...-4-1403809/', None for list pages."""
+    if "/puslapis/" in url:
+        return None
+    match = _LISTING_ID_RE.search(url)
+    return int(match.group(1)) if match else None
+
+
+def _compress(body: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), "zst"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL), "gz"
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("Archive blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class HtmlArchive:
+    """
+    Content-addressed store of fetched HTML with a SQLite index.
+    Use `get_archive()` to share one instance per process.
+    """
+
+    def __init__(self, root: Union[str, Path] = ARCHIVE_DIR):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _blob_path(self, sha: str, codec: str) -> Path:
+        return self.blob_dir / sha[:2] / f"{sha}.html.{codec}"
+
+    def put(self, url: str, body: Union[str, bytes], fetched_at: Optional[datetime] = None) -> str:
+        """Store one fetched body and index it. Returns its SHA-256."""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        fetched_at = fetched_at or datetime.now()
+        sha = hashlib.sha256(body).hexdigest()
+
+        # Identical bodies (re-fetch of an unchanged page) share one blob
+        existing = [p for p in (self._blob_path(sha, "zst"), self._blob_path(sha, "gz")) if p.exists()]
+        if existing:
+            path = existing[0]
+            codec = path.suffix.lstrip(".")
+        else:
+            data, codec = _compress(body)
+            path = self._blob_path(sha, codec)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + f".tmp{os.getpid()}")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO fetches (listing_id, url, fetch_date, fetched_at, sha256, codec, raw_bytes, stored_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (_listing_id(url), url, fetched_at.date().isoformat(), fetched_at.isoformat(),
+                 sha, codec, len(body), path.stat().st_size),
+            )
+            self._conn.commit()
+        return sha
+
+    def get(self, sha: str, codec: Optional[str] = None) -> str:
+        """Load an archived body as text."""
+        codecs = [codec] if codec else ["zst", "gz"]
+        for c in codecs:
+            path = self._blob_path(sha, c)
+            if path.exists():
+                return _decompress(path.read_bytes(), c).decode("utf-8", errors="ignore")
+        raise FileNotFoundError(f"No archived blob for {sha}")
+
+    def iter_listing_fetches(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        listing_ids: Optional[List[int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Latest detail-page fetch per (listing_id, fetch_date), oldest first.
+        Each row: listing_id, url, fetch_date, sha256, codec.
+        """
+        where = ["listing_id IS NOT NULL"]
+        params: List[Any] = []
+        if since:
+            where.append("fetch_date >= ?")
+            params.append(since.isoformat())
+        if until:
+            where.append("fetch_date <= ?")
+            params.append(until.isoformat())
+        if listing_ids:
+            where.append(f"listing_id IN ({','.join('?' * len(listing_ids))})")
+            params.extend(listing_ids)
+
+        query = (
+            "SELECT f.listing_id, f.url, f.fetch_date, f.sha256, f.codec FROM fetches f "
+            "JOIN (SELECT MAX(id) AS id FROM fetches WHERE " + " AND ".join(where) +
+            " GROUP BY listing_id, fetch_date) latest ON latest.id = f.id "
+            "ORDER BY f.fetch_date, f.listing_id"
+        )
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for listing_id, url, fetch_date, sha, codec in rows:
+            yield {"listing_id": listing_id, "url": url, "fetch_date": fetch_date, "sha256": sha, "codec": codec}
+
+    # ------------------------------------------------------------------ shards
+
+    def export_shard(self) -> Optional[Tuple[bytes, int, int]]:
+        """
+        Tar of the fetches not pushed yet (index.jsonl + their blobs), or None
+        if there are none. Returns (tar bytes, fetch count, last fetch id);
+        call `mark_pushed` once the upload succeeded.
+        """
+        with self._lock:
+            (after,) = self._conn.execute("SELECT COALESCE(MAX(last_fetch_id), 0) FROM pushes").fetchone()
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(_FETCH_COLUMNS)} FROM fetches WHERE id > ? ORDER BY id", (after,)
+            ).fetchall()
+        if not rows:
+            return None
+
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            index = "".join(json.dumps(dict(zip(_FETCH_COLUMNS, row[1:]))) + "\n" for row in rows)
+            _add_tar_member(tar, "index.jsonl", index.encode("utf-8"))
+            for sha, codec in sorted({(row[5], row[6]) for row in rows}):
+                path = self._blob_path(sha, codec)
+                tar.add(str(path), arcname=str(path.relative_to(self.root)))
+        return buf.getvalue(), len(rows), rows[-1][0]
+
+    def mark_pushed(self, shard: str, last_fetch_id: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pushes (shard, last_fetch_id, pushed_at) VALUES (?, ?, ?)",
+                (shard, last_fetch_id, datetime.now().isoformat()),
+            )
+            self._conn.commit()
+
+    def imported_shards(self) -> set:
+        with self._lock:
+            imported = {r[0] for r in self._conn.execute("SELECT shard FROM imported_shards")}
+            pushed = {r[0] for r in self._conn.execute("SELECT shard FROM pushes")}
+        return imported | pushed
+
+    def import_shard(self, shard: str, data: bytes) -> int:
+        """Merge a pushed shard: write missing blobs, index its fetches. Returns the fetch count."""
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r") as tar:
+            rows = []
+            for member in tar.getmembers():
+                if not member.isfile():
+                    continue
+                content = tar.extractfile(member).read()
+                if member.name == "index.jsonl":
+                    rows = [json.loads(line) for line in content.decode("utf-8").splitlines() if line]
+                    continue
+                sha, codec = _blob_name(member.name)
+                path = self._blob_path(sha, codec)
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_suffix(path.suffix + f".tmp{os.getpid()}")
+                    tmp.write_bytes(content)
+                    os.replace(tmp, path)
+
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO fetches ({', '.join(_FETCH_COLUMNS)}) VALUES ({', '.join('?' * len(_FETCH_COLUMNS))})",
+                [tuple(row[c] for c in _FETCH_COLUMNS) for row in rows],
+            )
+            self._conn.execute(
+                "INSERT INTO imported_shards (shard, imported_at) VALUES (?, ?)", (shard, datetime.now().isoformat())
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fetches, listings, raw, first, last = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT listing_id), COALESCE(SUM(raw_bytes), 0), "
+                "MIN(fetch_date), MAX(fetch_date) FROM fetches"
+            ).fetchone()
+            blobs, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(stored_bytes), 0) FROM "
+                "(SELECT sha256, MAX(stored_bytes) AS stored_bytes FROM fetches GROUP BY sha256)"
+            ).fetchone()
+        return {
+            "root": str(self.root),
+            "fetches": fetches,
+            "listings": listings,
+            "unique_blobs": blobs,
+            "raw_mb": round(raw / 1024 / 1024, 2),
+            "stored_mb": round(stored / 1024 / 1024, 2),
+            "first_fetch": first,
+            "last_fetch": last,
+        }
+
+
+def _add_tar_member(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+_BLOB_NAME_RE = re.compile(r"^blobs/[0-9a-f]{2}/([0-9a-f]{64})\.html\.(zst|gz)$")
+
+
+def _blob_name(name: str) -> Tuple[str, str]:
+    """(sha256, codec) of a shard blob member; rejects anything else (no path tricks)."""
+    match = _BLOB_NAME_RE.match(name)
+    if not match:
+        raise ValueError(f"Unexpected shard member: {name}")
+    return match.group(1), match.group(2)
+
+
+# Singleton instance for the process
+_archive_instance: Optional[HtmlArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> HtmlArchive:
+    """Get or create the process-wide archive."""
+    global _archive_instance
+
+    if _archive_instance is None:
+        with _archive_lock:
+            if _archive_instance is None:
+                _archive_instance = HtmlArchive()
+    return _archive_instance
+
+
+def archive_fetch(url: str, body: Union[str, bytes]) -> Optional[str]:
+    """Archive a Zyte fetch if archiving is enabled. Never raises."""
+    if not ARCHIVE_ENABLED:
+        return None
+    try:
+        return get_archive().put(url, body)
+    except Exception as e:
+        logger.warning(f"⚠️ HTML archive write failed for {url}: {e}")
+        return None
+
+
+# ============================================================================
+# OFFLINE RE-PARSE / BACKFILL
+# ============================================================================
+
+def _reparse(item: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[str]]:
+    """Worker: load one archived page and run the collector's detail parser on it."""
+    from verified_price_collector import parse_detail_page
+
+    try:
+        html = get_archive().get(item["sha256"], item["codec"])
+        listing = parse_detail_page(html, item["url"])
+        if listing is None:
+            return item, None, "parser returned nothing"
+        return item, listing.raw_features, None
+    except Exception as e:
+        return item, None, str(e)
+
+
+def backfill_raw_features(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    listing_ids: Optional[List[int]] = None,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Re-parse archived detail pages in parallel (one process per core) and write
+    the result to listing_snapshots.raw_features for the matching
+    (listing_id, snapshot_date). No network calls besides the Supabase writes.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    items = list(get_archive().iter_listing_fetches(since, until, listing_ids))
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"🗄️  Re-parsing {len(items)} archived pages with {workers} workers...")
+
+    supabase = None
+    if not dry_run:
+        from verified_price_collector import get_supabase
+        supabase = get_supabase()
+
+    counts = {"pages": len(items), "parsed": 0, "updated": 0, "failed": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, (item, raw_features, error) in enumerate(pool.map(_reparse, items, chunksize=16)):
+            if error:
+                counts["failed"] += 1
+                logger.warning(f"  ⚠️ {item['listing_id']} ({item['fetch_date']}): {error}")
+                continue
+            counts["parsed"] += 1
+
+            if supabase is not None:
+                try:
+                    supabase.table("listing_snapshots").update(
+                        {"raw_features": raw_features}
+                    ).eq("listing_id", item["listing_id"]).eq("snapshot_date", item["fetch_date"]).execute()
+                    counts["updated"] += 1
+                except Exception as e:
+                    counts["failed"] += 1
+                    logger.error(f"  ❌ Update failed for {item['listing_id']} ({item['fetch_date']}): {e}")
+
+            if (i + 1) % 500 == 0:
+                logger.info(f"  [{i + 1}/{len(items)}] re-parsed...")
+
+    logger.info(f"✅ Backfill done: {counts}")
+    return counts
+
+
+# ============================================================================
+# DURABLE COPY (SUPABASE STORAGE)
+# ============================================================================
+
+def push_to_storage(supabase: Any = None) -> Optional[str]:
+    """Upload the fetches not pushed yet as one shard. Returns the shard path, or None if nothing was new."""
+    archive = get_archive()
+    shard = archive.export_shard()
+    if shard is None:
+        logger.info("🗄️  HTML archive: nothing new to push")
+        return None
+    data, fetches, last_fetch_id = shard
+
+    if supabase is None:
+        from verified_price_collector import get_supabase
+        supabase = get_supabase()
+
+    now = datetime.now()
+    path = f"{SHARD_PREFIX}/{now.date().isoformat()}/{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}.tar"
+    supabase.storage.from_(ARCHIVE_BUCKET).upload(path, data, {"content-type": "application/x-tar"})
+    archive.mark_pushed(path, last_fetch_id)
+    logger.info(f"✅ HTML archive: pushed {fetches} fetches ({len(data) / 1024 / 1024:.1f} MB) to {ARCHIVE_BUCKET}/{path}")
+    return path
+
+
+def _list_storage(bucket: Any, prefix: str) -> List[str]:
+    """Names directly under `prefix` in a storage bucket (paginated)."""
+    names: List[str] = []
+    offset = 0
+    while True:
+        entries = bucket.list(prefix, {"limit": STORAGE_LIST_LIMIT, "offset": offset, "sortBy": {"column": "name", "order": "asc"}})
+        names.extend(entry["name"] for entry in entries)
+        if len(entries) < STORAGE_LIST_LIMIT:
+            return names
+        offset += STORAGE_LIST_LIMIT
+
+
+def pull_from_storage(since: Optional[date] = None, supabase: Any = None) -> Dict[str, int]:
+    """Merge every pushed shard (from `since` on) that this archive has not imported or pushed itself."""
+    if supabase is None:
+        from verified_price_collector import get_supabase
+        supabase = get_supabase()
+
+    archive = get_archive()
+    bucket = supabase.storage.from_(ARCHIVE_BUCKET)
+    known = archive.imported_shards()
+    counts = {"shards": 0, "fetches": 0}
+    for day in _list_storage(bucket, SHARD_PREFIX):
+        if since and day < since.isoformat():
+            continue
+        for name in _list_storage(bucket, f"{SHARD_PREFIX}/{day}"):
+            path = f"{SHARD_PREFIX}/{day}/{name}"
+            if path in known:
+                continue
+            counts["fetches"] += archive.import_shard(path, bucket.download(path))
+            counts["shards"] += 1
+            logger.info(f"  📥 Imported {path}")
+
+    logger.info(f"✅ HTML archive: pulled {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw HTML archive tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="Show archive size and coverage")
+    sub.add_parser("push", help="Upload fetches not pushed yet to Supabase Storage")
+    pull = sub.add_parser("pull", help="Merge shards from Supabase Storage into the local archive")
+    pull.add_argument("--since", type=date.fromisoformat, help="Only shards pushed on or after this date")
+
+    backfill = sub.add_parser("backfill", help="Re-parse archived pages into listing_snapshots.raw_features")
+    backfill.add_argument("--since", type=date.fromisoformat, help="First fetch date (YYYY-MM-DD)")
+    backfill.add_argument("--until", type=date.fromisoformat, help="Last fetch date (YYYY-MM-DD)")
+    backfill.add_argument("--listing-id", type=int, action="append", dest="listing_ids", help="Only this listing (repeatable)")
+    backfill.add_argument("--workers", type=int, help="Parser processes (default: all cores)")
+    backfill.add_argument("--dry-run", action="store_true", help="Parse only, do not write to Supabase")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    if args.command == "stats":
+        for key, value in get_archive().stats().items():
+            print(f"{key:>14}: {value}")
+    elif args.command == "push":
+        push_to_storage()
+    elif args.command == "pull":
+        pull_from_storage(args.since)
+    else:
+        backfill_raw_features(args.since, args.until, args.listing_ids, args.workers, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Unified Aruodas.lt Listing Parser
+One parser for every scraper: /api/predict (model_utils), the verified price
+collector and predict.py.
+
+- Parses the raw decoded bytes with lxml (no BeautifulSoup tree)
+- Walks the document ONCE, collecting everything the scrapers need:
+  <dl> details and stats, title location, phone, description, image URLs,
+  external links, the VIP partner badge and the visible page text
+- Returns a typed `ParsedListing` record
+
+Run `python listing_parser.py [page.html ...]` to benchmark it against the
+previous BeautifulSoup html.parser path (uses the HTML archive if no files given).
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import lxml.html
+from lxml import etree
+
+# Explicit UTF-8: without a <meta charset> libxml2 would fall back to Latin-1
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+
+# Text inside these tags is not page text (same as BeautifulSoup get_text)
+_SKIP_TEXT_TAGS = frozenset(["script", "style", "template"])
+
+_VIP_CLASS_HINTS = ("vip-partner", "vip_partner")
+_EXTERNAL_LINK_RE = re.compile(r"https?://(?!www\.aruodas)")
+_TITLE_TAIL_RE = re.compile(r"\b(buto|būsto)\s+nuoma\b", re.IGNORECASE)
+
+FULL_IMAGE_MARKER = "aruodas-img.dgn.lt/object_62_"
+IMAGE_MARKER = "aruodas-img.dgn.lt/object"
+
+
+@dataclass
+class ParsedListing:
+    """Everything the scrapers read from one aruodas.lt detail page."""
+    url: str
+    details: Dict[str, List[str]] = field(default_factory=dict)  # obj-details + obj-stats <dt>/<dd> pairs
+    city: Optional[str] = None
+    district: Optional[str] = None
+    street: Optional[str] = None
+    phone: Optional[str] = None
+    description: Optional[str] = None
+    image_urls: List[str] = field(default_factory=list)
+    external_links: List[str] = field(default_factory=list)
+    has_vip_section: bool = False
+    text_nodes: List[str] = field(default_factory=list)  # visible text, stripped, in document order
+
+    def first(self, key: str) -> Optional[str]:
+        vals = self.details.get(key, [])
+        return vals[0] if vals else None
+
+    @property
+    def page_text(self) -> str:
+        """Visible page text joined by spaces (BeautifulSoup get_text(" ", strip=True))."""
+        return " ".join(self.text_nodes)
+
+    def raw_dict(self) -> Dict[str, Any]:
+        """The {column: [values]} dict the model featurisers consume."""
+        result: Dict[str, Any] = {"url": self.url}
+        result.update(self.details)
+        if self.city:
+            result["city"] = [self.city]
+        if self.district:
+            result["district"] = [self.district]
+        if self.street:
+            result["street"] = [self.street]
+        return result
+
+
+def _classes(el) -> str:
+    return el.get("class") or ""
+
+
+def _strings(el) -> List[str]:
+    """Stripped, non-empty text nodes under an element (scripts/styles excluded)."""
+    out = []
+    for node in el.iter():
+        if not isinstance(node.tag, str):
+            continue
+        if node.tag not in _SKIP_TEXT_TAGS and node.text:
+            s = node.text.strip()
+            if s:
+                out.append(s)
+        if node is not el and node.tail:
+            s = node.tail.strip()
+            if s:
+                out.append(s)
+    return out
+
+
+def _text(el, sep: str = "") -> str:
+    return sep.join(_strings(el))
+
+
+def parse_dl_block(dl) -> Dict[str, List[str]]:
+    """Extract <dt>/<dd> pairs from a <dl> element. Returns a dict of {key: [values]}."""
+    out: Dict[str, List[str]] = {}
+    if dl is None:
+        return out
+
+    for dt in dl.iter("dt"):
+        key = _text(dt).rstrip(":")
+        dd = next(dt.itersiblings("dd"), None)
+        if dd is None:
+            continue
+
+        spans = [t for t in (_text(s) for s in dd.iter("span")) if t]
+        if spans:
+            out[key] = spans
+        else:
+            text = _text(dd)
+            out[key] = [text] if text else []
+    return out
+
+
+def _split_title(title: str):
+    """'Vilnius, Žirmūnai, Kalvarijų g., ...' -> (city, district, street)."""
+    head = _TITLE_TAIL_RE.split(title)[0]
+    parts = [p.strip(" ,") for p in head.split(",") if p.strip(" ,")]
+    city = parts[0] if len(parts) >= 1 else None
+    district = parts[1] if len(parts) >= 2 else None
+    street = parts[2] if len(parts) >= 3 else None
+    return city, district, street
+
+
+def parse_listing(html: Union[bytes, str], url: str) -> ParsedListing:
+    """Parse a detail page (raw bytes preferred) in a single pass over the tree."""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    root = lxml.html.document_fromstring(html, parser=_HTML_PARSER)
+    listing = ParsedListing(url=url)
+
+    details_dl = None
+    stats_div = None
+    title_h1 = None
+    phone_el = None
+    collapsed_text = None
+    comment_el = None
+    full_images: List[str] = []
+    fallback_images: List[str] = []
+    texts = listing.text_nodes
+
+    for event, el in etree.iterwalk(root, events=("start", "end")):
+        tag = el.tag
+        if not isinstance(tag, str):  # processing instructions, entities
+            continue
+
+        # Visible text in document order: el.text on entering, el.tail on leaving
+        if event == "end":
+            if el.tail:
+                s = el.tail.strip()
+                if s:
+                    texts.append(s)
+            continue
+        if el.text and tag not in _SKIP_TEXT_TAGS:
+            s = el.text.strip()
+            if s:
+                texts.append(s)
+
+        cls = _classes(el)
+        if cls:
+            if details_dl is None and tag == "dl" and "obj-details" in cls.split():
+                details_dl = el
+            elif stats_div is None and tag == "div" and "obj-stats" in cls.split():
+                stats_div = el
+            elif title_h1 is None and tag == "h1" and "obj-header-text" in cls.split():
+                title_h1 = el
+            if phone_el is None and "phone" in cls:
+                phone_el = el
+            if comment_el is None and "obj-comment" in cls.split():
+                comment_el = el
+            if not listing.has_vip_section and any(h in cls for h in _VIP_CLASS_HINTS):
+                listing.has_vip_section = True
+
+        if collapsed_text is None and el.get("id") == "collapsedText":
+            collapsed_text = el
+
+        if tag == "a":
+            href = el.get("href")
+            if href:
+                if FULL_IMAGE_MARKER in href and href not in full_images:
+                    full_images.append(href)
+                if _EXTERNAL_LINK_RE.search(href):
+                    listing.external_links.append(href)
+        elif tag == "img":
+            src = el.get("src", "")
+            if IMAGE_MARKER in src:
+                full_src = src.replace("object_63_", "object_62_")
+                if full_src not in fallback_images:
+                    fallback_images.append(full_src)
+
+    listing.details = parse_dl_block(details_dl)
+    if stats_div is not None:
+        listing.details.update(parse_dl_block(next(stats_div.iter("dl"), None)))
+
+    if title_h1 is not None:
+        listing.city, listing.district, listing.street = _split_title(_text(title_h1, " "))
+
+    if phone_el is not None:
+        listing.phone = _text(phone_el) or None
+
+    desc_el = collapsed_text if collapsed_text is not None else comment_el
+    if desc_el is not None:
+        listing.description = _text(desc_el) or None
+
+    listing.image_urls = full_images or fallback_images
+    return listing
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _bs4_parse(html: bytes, url: str) -> Dict[str, Any]:
+    """The previous path: BeautifulSoup html.parser, one tree search per field."""
+    from bs4 import BeautifulSoup
+
+    def dl_block(dl):
+        out = {}
+        if not dl:
+            return out
+        for dt in dl.find_all("dt"):
+            key = dt.get_text(strip=True).rstrip(":")
+            dd = dt.find_next_sibling("dd")
+            if not dd:
+                continue
+            spans = [s.get_text(strip=True) for s in dd.find_all("span") if s.get_text(strip=True)]
+            out[key] = spans if spans else ([dd.get_text(strip=True)] if dd.get_text(strip=True) else [])
+        return out
+
+    soup = BeautifulSoup(html, "html.parser")
+    details = dl_block(soup.find("dl", class_="obj-details"))
+    stats_div = soup.find("div", class_="obj-stats")
+    if stats_div:
+        details.update(dl_block(stats_div.find("dl")))
+    h1 = soup.select_one("h1.obj-header-text")
+    title = _split_title(h1.get_text(" ", strip=True)) if h1 else (None, None, None)
+    phone_elem = soup.select_one(".phone-show, .phone-nr, [class*='phone']")
+    desc_elem = soup.find(id="collapsedText") or soup.find(class_="obj-comment")
+    page_text = soup.get_text(" ", strip=True).lower()
+    vip = soup.select_one(".vip-partner, [class*='vip-partner'], [class*='vip_partner']")
+    links = [a.get("href") for a in soup.find_all("a", href=_EXTERNAL_LINK_RE)]
+    images = [a.get("href") for a in soup.find_all("a", href=True) if FULL_IMAGE_MARKER in a.get("href", "")]
+    if not images:
+        images = [i.get("src") for i in soup.find_all("img") if IMAGE_MARKER in i.get("src", "")]
+    return {
+        "details": details, "title": title, "phone": phone_elem, "desc": desc_elem,
+        "text": page_text, "vip": vip, "links": links, "images": images,
+    }
+
+
+def benchmark(pages: List[bytes], repeat: int = 3) -> Dict[str, float]:
+    """Mean ms per page for the old BeautifulSoup path vs parse_listing."""
+    import time
+
+    results = {}
+    for name, fn in (("bs4_html_parser", _bs4_parse), ("lxml_single_pass", parse_listing)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for page in pages:
+                fn(page, "https://www.aruodas.lt/benchmark-4-1/")
+            best = min(best, time.perf_counter() - start)
+        results[name] = round(best / len(pages) * 1000, 3)
+    results["speedup"] = round(results["bs4_html_parser"] / results["lxml_single_pass"], 1)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    if len(sys.argv) > 1:
+        pages = [Path(p).read_bytes() for p in sys.argv[1:]]
+    else:
+        from html_archive import get_archive
+
+        archive = get_archive()
+        pages = [
+            archive.get(item["sha256"], item["codec"]).encode("utf-8")
+            for _, item in zip(range(200), archive.iter_listing_fetches())
+        ]
+    if not pages:
+        raise SystemExit("No pages to benchmark: pass HTML files or populate the HTML archive")
+
+    print(f"Benchmarking {len(pages)} page(s)...")
+    for key, value in benchmark(pages).items():
+        print(f"{key:>18}: {value}{'x' if key == 'speedup' else ' ms/page'}")
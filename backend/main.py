@@ -2,21 +2,29 @@ from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, List, Dict, Any
-import pickle
+from typing import Optional, List, Dict, Any, Tuple
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 import asyncio
 import logging
+import os
 from pathlib import Path
 
 # Import our model utilities (OLD - kept for compatibility)
-from model_utils import scrape_listing, featurise, predict_from_url
+from model_utils import scrape_listing_async, close_async_client, featurise, predict_from_url
+
+# Shared model registry (loads each pickle once per process)
+from model_registry import get_registry
+from singleflight import SingleFlight, listing_key
+from response_cache import get_cache, cache_key, cache_stats
 
 # Import A/B testing module (NEW - runs both models)
-from ab_testing import DualModelPredictor, run_dual_prediction, get_ab_test_stats, get_ab_test_history
+from ab_testing import (
+    DualModelPredictor, run_dual_prediction, get_ab_test_stats, get_ab_test_history,
+    featurise_new_dict, extract_actual_price
+)
 
 # Import SHAP explainer for model explanations
 from shap_explainer import get_explainer as get_shap_explainer, explain_prediction
@@ -45,15 +53,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load the OLD model once at startup (kept for fallback)
-MODEL_PATH = Path("model.pkl")
-try:
-    with open(MODEL_PATH, "rb") as f:
-        model = pickle.load(f)
+# Load both models once per process through the shared registry
+# (under `gunicorn --preload` this happens in the master, before forking)
+model_registry = get_registry()
+model = model_registry.old_model
+if model is not None:
     logger.info("✅ Old model loaded successfully")
-except Exception as e:
-    logger.error(f"❌ Failed to load old model: {e}")
-    model = None
+else:
+    logger.error("❌ Failed to load old model")
 
 # Initialize A/B Testing System (loads BOTH models)
 try:
@@ -72,6 +79,11 @@ except Exception as e:
     logger.warning(f"⚠️ SHAP Explainer failed to initialize: {e}")
     shap_explainer = None
 
+@app.on_event("shutdown")
+async def shutdown_scrape_client():
+    """Release pooled Zyte connections when the worker stops."""
+    await close_async_client()
+
 # Include routers
 app.include_router(sumup_router)
 app.include_router(webhook_router)
@@ -115,6 +127,22 @@ class PredictionResponse(BaseModel):
     shap_explanation: Optional[Dict[str, Any]] = None  # SHAP-based explanation
     error: Optional[str] = None
 
+class BatchPredictionRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, description="Aruodas.lt listing URLs")
+    user_id: Optional[str] = Field(None, description="User ID for tracking")
+    concurrency: Optional[int] = Field(None, ge=1, description="Max listings scraped at once (capped server-side)")
+
+class BatchPredictionItem(PredictionResponse):
+    url: str
+
+class BatchPredictionResponse(BaseModel):
+    success: bool
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchPredictionItem]
+    error: Optional[str] = None
+
 class StatsResponse(BaseModel):
     total_predictions: int
     average_price_per_m2: float
@@ -130,8 +158,17 @@ class HealthResponse(BaseModel):
     timestamp: datetime
     version: str
 
-# Cache for storing recent predictions (in production, use Redis)
-prediction_cache = {}
+# Response caches: per-worker LRU+TTL in front of the shared backend (Redis if REDIS_URL is set)
+prediction_cache = get_cache("predict")
+manual_cache = get_cache("manual")
+shap_cache = get_cache("shap")
+
+# In-flight /api/predict pipelines, keyed by listing id
+predict_flight = SingleFlight("predict")
+
+# Batch valuation limits
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "100"))
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "10"))
 
 # Stats cache (mock data for now)
 MOCK_STATS = {
@@ -169,6 +206,64 @@ async def root():
         version="1.0.0"
     )
 
+def normalize_listing_url(url_str: str) -> str:
+    """
+    Normalize mobile/English URLs to standard desktop URLs
+    Handles: m.aruodas.lt, en.aruodas.lt, m.en.aruodas.lt -> www.aruodas.lt
+    """
+    original_url = url_str
+    url_str = url_str.replace("//m.en.aruodas.lt/", "//www.aruodas.lt/")
+    url_str = url_str.replace("//en.aruodas.lt/", "//www.aruodas.lt/")
+    url_str = url_str.replace("//m.aruodas.lt/", "//www.aruodas.lt/")
+    if url_str != original_url:
+        logger.info(f"📱 Normalized URL to: {url_str}")
+    return url_str
+
+
+async def get_cached_prediction(url_str: str) -> Optional[PredictionResponse]:
+    """Return the cached prediction for a listing URL, if any"""
+    cached = await prediction_cache.aget(url_str)
+    return PredictionResponse(**cached) if cached is not None else None
+
+
+async def cache_prediction(url_str: str, response: PredictionResponse):
+    """Cache a successful prediction for a listing URL"""
+    await prediction_cache.aset(url_str, response.model_dump())
+
+
+def build_prediction_response(
+    price_per_m2: float,
+    total_price: Optional[float],
+    features_used: dict,
+    listing_price: Optional[float] = None,
+    shap_explanation: Optional[Dict[str, Any]] = None
+) -> PredictionResponse:
+    """Build a successful new-model PredictionResponse (analysis, confidence, deal rating)"""
+    analysis = generate_analysis(price_per_m2, total_price, features_used)
+    confidence = calculate_confidence(features_used)
+
+    price_diff = None
+    price_diff_pct = None
+    deal_rating = None
+    if listing_price and total_price:
+        price_diff, price_diff_pct, deal_rating = calculate_deal_rating(total_price, listing_price)
+        logger.info(f"📊 Deal rating: {deal_rating} ({price_diff_pct:+.1f}%)")
+
+    return PredictionResponse(
+        success=True,
+        price_per_m2=price_per_m2,
+        total_price=total_price,
+        confidence=confidence,
+        listing_price=listing_price,
+        price_difference=price_diff,
+        price_difference_percent=price_diff_pct,
+        deal_rating=deal_rating,
+        features=features_used,
+        analysis=analysis,
+        shap_explanation=shap_explanation
+    )
+
+
 @app.post("/api/predict", response_model=PredictionResponse)
 async def predict(request: PredictionRequest):
     """
@@ -182,16 +277,7 @@ async def predict(request: PredictionRequest):
             detail="Models not loaded"
         )
 
-    url_str = str(request.url)
-
-    # Normalize mobile/English URLs to standard desktop URLs
-    # Handles: m.aruodas.lt, en.aruodas.lt, m.en.aruodas.lt -> www.aruodas.lt
-    original_url = url_str
-    url_str = url_str.replace("//m.en.aruodas.lt/", "//www.aruodas.lt/")
-    url_str = url_str.replace("//en.aruodas.lt/", "//www.aruodas.lt/")
-    url_str = url_str.replace("//m.aruodas.lt/", "//www.aruodas.lt/")
-    if url_str != original_url:
-        logger.info(f"📱 Normalized URL to: {url_str}")
+    url_str = normalize_listing_url(str(request.url))
 
     # Check if URL is from aruodas.lt
     if "aruodas.lt" not in url_str:
@@ -201,78 +287,55 @@ async def predict(request: PredictionRequest):
         )
 
     # Check cache
-    if url_str in prediction_cache:
-        cached_result = prediction_cache[url_str]
-        if datetime.now() - cached_result["timestamp"] < timedelta(minutes=5):
-            logger.info(f"📦 Returning cached prediction for {url_str}")
-            return cached_result["response"]
+    cached_response = await get_cached_prediction(url_str)
+    if cached_response is not None:
+        logger.info(f"📦 Returning cached prediction for {url_str}")
+        return cached_response
+
+    # Concurrent calls for the same listing share one pipeline run
+    return await predict_flight.do(
+        listing_key(url_str),
+        lambda: _run_prediction(url_str, request.user_id)
+    )
 
+
+async def _run_prediction(url_str: str, user_id: Optional[str]) -> PredictionResponse:
+    """Scrape, predict and explain one listing (the work behind /api/predict)"""
     try:
         # 🚀 RUN DUAL PREDICTION (both old and new models)
         if dual_predictor:
             logger.info(f"🔬 Running A/B Test: Old Model vs New Model")
-            ab_result = await run_dual_prediction(url_str, dual_predictor, request.user_id)
+            ab_result = await run_dual_prediction(url_str, dual_predictor, user_id)
 
             # If new model succeeded, use its prediction
             if ab_result.get("success") and ab_result["new_model"].get("success"):
                 new_model_data = ab_result["new_model"]
 
-                # Generate analysis for the new model prediction
-                analysis = generate_analysis(
-                    new_model_data["price_per_m2"],
-                    new_model_data["total_price"],
-                    new_model_data["features_used"]
-                )
-
-                # Calculate confidence
-                confidence = calculate_confidence(new_model_data["features_used"])
-
-                # Extract listing price and calculate deal rating
-                listing_price = None
-                price_diff = None
-                price_diff_pct = None
-                deal_rating = None
-
                 # Get actual price from ab_result (already extracted in ab_testing.py)
+                listing_price = None
                 if ab_result.get("actual_price") and ab_result["actual_price"].get("actual_price_total"):
                     listing_price = ab_result["actual_price"]["actual_price_total"]
                     logger.info(f"💰 Listing price from ab_result: €{listing_price}")
 
-                    if listing_price:
-                        price_diff, price_diff_pct, deal_rating = calculate_deal_rating(
-                            new_model_data["total_price"],
-                            listing_price
-                        )
-                        logger.info(f"📊 Deal rating: {deal_rating} ({price_diff_pct:+.1f}%)")
-
                 # Generate SHAP explanation
                 shap_explanation = None
                 if shap_explainer:
                     try:
-                        shap_explanation = get_shap_explanation(new_model_data["features_used"])
+                        shap_explanation = await asyncio.to_thread(get_shap_explanation, new_model_data["features_used"])
                         logger.info(f"🧠 SHAP explanation generated")
                     except Exception as e:
                         logger.warning(f"⚠️ SHAP explanation failed: {e}")
 
-                response = PredictionResponse(
-                    success=True,
-                    price_per_m2=new_model_data["price_per_m2"],
-                    total_price=new_model_data["total_price"],
-                    confidence=confidence,
+                response = build_prediction_response(
+                    new_model_data["price_per_m2"],
+                    new_model_data["total_price"],
+                    new_model_data["features_used"],
                     listing_price=listing_price,
-                    price_difference=price_diff,
-                    price_difference_percent=price_diff_pct,
-                    deal_rating=deal_rating,
-                    features=new_model_data["features_used"],
-                    analysis=analysis,
                     shap_explanation=shap_explanation
                 )
 
                 # Cache the result
-                prediction_cache[url_str] = {
-                    "timestamp": datetime.now(),
-                    "response": response
-                }
+                await cache_prediction(url_str, response)
 
                 logger.info(f"✅ Returned NEW model prediction: €{response.price_per_m2}/m²")
                 logger.info(f"📊 Comparison: {ab_result['comparison'].get('diff_pct_per_m2', 0):+.1f}% difference")
@@ -309,10 +372,10 @@ async def predict(request: PredictionRequest):
         else:
             logger.warning("⚠️  A/B testing not available, using old model only")
             logger.info(f"Scraping listing: {url_str}")
-            raw_data = scrape_listing(url_str)
+            raw_data = await scrape_listing_async(url_str)
 
             logger.info("Processing features")
-            features_df = featurise(raw_data)
+            features_df = await asyncio.to_thread(featurise, raw_data)
 
             logger.info("Making prediction")
             pred_price_pm2 = model.predict(features_df)[0]
@@ -335,10 +398,7 @@ async def predict(request: PredictionRequest):
                 analysis=analysis
             )
 
-            prediction_cache[url_str] = {
-                "timestamp": datetime.now(),
-                "response": response
-            }
+            await cache_prediction(url_str, response)
 
             return response
 
@@ -349,6 +409,114 @@ async def predict(request: PredictionRequest):
             error=f"Failed to process listing: {str(e)}"
         )
 
+async def _scrape_and_featurise(url_str: str, semaphore: asyncio.Semaphore) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Scrape one listing and build its new-model features, at most `semaphore` at a time"""
+    async with semaphore:
+        raw_data = await scrape_listing_async(url_str)
+        features = await asyncio.to_thread(featurise_new_dict, raw_data, dual_predictor.encoder)
+    return raw_data, features
+
+
+@app.post("/api/predict-batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    """
+    Predict rental prices for many Aruodas.lt listings at once.
+    Listings are scraped concurrently (capped per request), featurised, and
+    scored with ONE new-model call; SHAP explanations are batched the same way.
+    Per-URL failures are reported in their item without failing the batch.
+    """
+    if dual_predictor is None or dual_predictor.new_model is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model not loaded"
+        )
+
+    if len(request.urls) > BATCH_MAX_URLS:
+        return BatchPredictionResponse(
+            success=False, total=len(request.urls), succeeded=0, failed=len(request.urls), results=[],
+            error=f"Too many URLs: {len(request.urls)} (max {BATCH_MAX_URLS})"
+        )
+
+    concurrency = min(request.concurrency or BATCH_SCRAPE_CONCURRENCY, BATCH_SCRAPE_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    url_strs = [normalize_listing_url(str(u)) for u in request.urls]
+    results: List[Optional[BatchPredictionItem]] = [None] * len(url_strs)
+
+    logger.info(f"📦 Batch prediction: {len(url_strs)} URLs (concurrency {concurrency})")
+
+    # Validate URLs and serve cached ones; scrape the rest concurrently
+    pending: Dict[int, asyncio.Task] = {}
+    for i, url_str in enumerate(url_strs):
+        if "aruodas.lt" not in url_str:
+            results[i] = BatchPredictionItem(
+                url=url_str, success=False, error="Please provide a valid aruodas.lt listing URL"
+            )
+            continue
+        cached_response = await get_cached_prediction(url_str)
+        if cached_response is not None:
+            results[i] = BatchPredictionItem(url=url_str, **cached_response.model_dump())
+            continue
+        pending[i] = asyncio.create_task(_scrape_and_featurise(url_str, semaphore))
+
+    outcomes = await asyncio.gather(*pending.values(), return_exceptions=True)
+
+    scored_idx: List[int] = []
+    raw_rows: List[Dict[str, Any]] = []
+    feature_rows: List[Dict[str, Any]] = []
+    for i, outcome in zip(pending.keys(), outcomes):
+        if isinstance(outcome, BaseException):
+            logger.warning(f"⚠️ Batch item failed: {url_strs[i]}: {outcome}")
+            results[i] = BatchPredictionItem(
+                url=url_strs[i], success=False, error=f"Failed to process listing: {str(outcome)}"
+            )
+            continue
+        raw_data, features = outcome
+        scored_idx.append(i)
+        raw_rows.append(raw_data)
+        feature_rows.append(features)
+
+    if scored_idx:
+        try:
+            # One vectorized call for every successfully featurised listing
+            encoder = dual_predictor.encoder
+            X = encoder.encode_many(feature_rows)
+            preds = encoder.predict(dual_predictor.new_model, X)
+            features_used_rows = [encoder.decode(row) for row in X]
+            shap_explanations = await asyncio.to_thread(get_shap_explanations, features_used_rows)
+
+            for row_no, i in enumerate(scored_idx):
+                features_used = features_used_rows[row_no]
+                pred_pm2 = float(preds[row_no])
+                area = features_used["area_m2"]
+                total_price = pred_pm2 * area if pd.notnull(area) else None
+
+                response = build_prediction_response(
+                    price_per_m2=round(pred_pm2, 2),
+                    total_price=round(total_price, 2) if total_price else None,
+                    features_used=features_used,
+                    listing_price=extract_actual_price(raw_rows[row_no]).get("actual_price_total"),
+                    shap_explanation=shap_explanations[row_no]
+                )
+                await cache_prediction(url_strs[i], response)
+                results[i] = BatchPredictionItem(url=url_strs[i], **response.model_dump())
+        except Exception as e:
+            logger.error(f"❌ Batch scoring error: {str(e)}")
+            for i in scored_idx:
+                results[i] = BatchPredictionItem(
+                    url=url_strs[i], success=False, error=f"Failed to score listing: {str(e)}"
+                )
+
+    succeeded = sum(1 for r in results if r.success)
+    logger.info(f"✅ Batch prediction done: {succeeded}/{len(results)} succeeded")
+
+    return BatchPredictionResponse(
+        success=True,
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
 @app.post("/api/predict-manual", response_model=PredictionResponse)
 async def predict_manual(request: ManualPredictionRequest):
     """
@@ -361,13 +529,15 @@ async def predict_manual(request: ManualPredictionRequest):
             detail="Model not loaded"
         )
 
+    manual_key = cache_key(request.manual_data.model_dump())
+    cached = await manual_cache.aget(manual_key)
+    if cached is not None:
+        logger.info("📦 Returning cached manual prediction")
+        return PredictionResponse(**cached)
+
     try:
         data = request.manual_data
 
-        # Prepare features in the exact format the NEW model expects
-        # Use the same district categories and feature order as the new model
-        from ab_testing import _coerce_dtypes_and_order
-
         # Build feature dict matching the new model's expected format
         features_dict = {
             'rooms': float(data.rooms),
@@ -384,32 +554,21 @@ async def predict_manual(request: ManualPredictionRequest):
             'heat_Elektra': float(int(data.heat_Elektra)),
         }
 
-        # Create DataFrame
-        features_df = pd.DataFrame([features_dict])
-
         # Handle district encoding - validate against known categories
+        encoder = dual_predictor.encoder
         district_val = data.district if data.district else "Other"
-        if district_val not in dual_predictor.district_categories:
+        if encoder.district_name(district_val) != district_val:
             logger.warning(f"Unknown district '{district_val}', mapping to 'Other'")
             district_val = "Other"
 
-        features_df["district_encoded"] = pd.Categorical(
-            [district_val],
-            categories=dual_predictor.district_categories
-        )
-
-        # Apply the same dtype coercion and column ordering as URL scraper
-        features_df = _coerce_dtypes_and_order(
-            features_df,
-            dual_predictor.district_categories,
-            dual_predictor.feature_order
-        )
+        # Encode straight to a float64 row in the model's column order
+        X = encoder.encode({**features_dict, "district_encoded": district_val})
 
         logger.info(f"Making prediction with manual data (NEW MODEL): {features_dict}")
         logger.info(f"District: {district_val}")
 
         # Make prediction using NEW model
-        pred_price_pm2 = dual_predictor.new_model.predict(features_df)[0]
+        pred_price_pm2 = encoder.predict(dual_predictor.new_model, X)[0]
         total_price = pred_price_pm2 * data.area_m2
 
         # High confidence for complete manual data
@@ -429,7 +588,7 @@ async def predict_manual(request: ManualPredictionRequest):
                 # Add district to features_dict for SHAP
                 features_for_shap = features_dict.copy()
                 features_for_shap["district_encoded"] = district_val
-                shap_explanation = get_shap_explanation(features_for_shap)
+                shap_explanation = await asyncio.to_thread(get_shap_explanation, features_for_shap)
                 logger.info(f"🧠 SHAP explanation generated for manual prediction")
             except Exception as e:
                 logger.warning(f"⚠️ SHAP explanation failed: {e}")
@@ -439,13 +598,13 @@ async def predict_manual(request: ManualPredictionRequest):
             price_per_m2=round(float(pred_price_pm2), 2),
             total_price=round(float(total_price), 2),
             confidence=confidence,
-            features={k: (float(v) if isinstance(v, (int, float, np.number)) else str(v))
-                     for k, v in features_df.iloc[0].to_dict().items()},
+            features=encoder.decode(X),
             analysis=analysis,
             shap_explanation=shap_explanation
         )
 
         logger.info(f"✅ Manual prediction (NEW MODEL): €{result.price_per_m2}/m² (€{result.total_price} total)")
+        await manual_cache.aset(manual_key, result.model_dump())
         return result
 
     except Exception as e:
@@ -613,69 +772,122 @@ def calculate_deal_rating(predicted_price: float, listing_price: float) -> tuple
     return round(difference, 2), round(difference_percent, 1), rating
 
 
+def _shap_feature_data(features: dict) -> Dict[str, Any]:
+    """Build sanitized SHAP feature dict (missing numerics become 0.0)"""
+    feature_data = {}
+    for feat in model_registry.feature_order:
+        if feat == "district_encoded":
+            # Handle district categorical
+            district_val = features.get("district_encoded", "Other")
+            if isinstance(district_val, str):
+                feature_data[feat] = district_val
+            else:
+                feature_data[feat] = str(district_val) if district_val else "Other"
+        else:
+            # Numeric features - handle None, NaN, and various types
+            val = features.get(feat)
+            try:
+                if val is None:
+                    feature_data[feat] = 0.0
+                elif isinstance(val, (int, float, np.number)):
+                    if pd.isna(val):
+                        feature_data[feat] = 0.0
+                    else:
+                        feature_data[feat] = float(val)
+                elif isinstance(val, str):
+                    feature_data[feat] = float(val) if val else 0.0
+                else:
+                    feature_data[feat] = 0.0
+            except (ValueError, TypeError):
+                feature_data[feat] = 0.0
+    return feature_data
+
+
+def _add_area(explanation: Optional[Dict[str, Any]], features: dict) -> Optional[Dict[str, Any]]:
+    """Add area for total price calculation context"""
+    if explanation and "area_m2" in features and features["area_m2"]:
+        explanation["area_m2"] = float(features["area_m2"])
+    return explanation
+
+
 def get_shap_explanation(features: dict) -> Optional[Dict[str, Any]]:
     """
     Generate SHAP explanation for a prediction.
-    Converts features dict to DataFrame and calls SHAP explainer.
+    Sanitizes the features dict and calls SHAP explainer.
     """
     if shap_explainer is None:
         return None
 
     try:
-        # Load feature order and district categories
-        with open("feature_order.json", "r") as f:
-            feature_order = json.load(f)
-        with open("district_categories.json", "r") as f:
-            district_categories = json.load(f)
-
-        # Build feature DataFrame
-        feature_data = {}
-        for feat in feature_order:
-            if feat == "district_encoded":
-                # Handle district categorical
-                district_val = features.get("district_encoded", "Other")
-                if isinstance(district_val, str):
-                    feature_data[feat] = district_val
-                else:
-                    feature_data[feat] = str(district_val) if district_val else "Other"
-            else:
-                # Numeric features - handle None, NaN, and various types
-                val = features.get(feat)
-                try:
-                    if val is None:
-                        feature_data[feat] = 0.0
-                    elif isinstance(val, (int, float, np.number)):
-                        if pd.isna(val):
-                            feature_data[feat] = 0.0
-                        else:
-                            feature_data[feat] = float(val)
-                    elif isinstance(val, str):
-                        feature_data[feat] = float(val) if val else 0.0
-                    else:
-                        feature_data[feat] = 0.0
-                except (ValueError, TypeError):
-                    feature_data[feat] = 0.0
+        feature_data = _shap_feature_data(features)
+        key = cache_key(feature_data)
+        explanation = shap_cache.get(key)
+        if explanation is None:
+            explanation = shap_explainer.explain_features(feature_data)
+            if explanation and "error" not in explanation:
+                shap_cache.set(key, explanation)
+        return _add_area(explanation, features)
 
-        # Create DataFrame
-        df = pd.DataFrame([feature_data])
-        df["district_encoded"] = pd.Categorical(
-            df["district_encoded"],
-            categories=district_categories
-        )
-        df = df[feature_order]
+    except Exception as e:
+        logger.error(f"❌ get_shap_explanation error: {e}")
+        return None
 
-        # Get SHAP explanation
-        explanation = shap_explainer.explain(df)
 
-        # Add area for total price calculation context
-        if "area_m2" in features and features["area_m2"]:
-            explanation["area_m2"] = float(features["area_m2"])
+def get_shap_explanations(features_list: List[dict]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Generate SHAP explanations for many predictions in one explainer call.
+    Returns one entry per input (None where it failed).
+    """
+    if shap_explainer is None or not features_list:
+        return [None] * len(features_list)
 
-        return explanation
+    try:
+        feature_data = [_shap_feature_data(f) for f in features_list]
+        keys = [cache_key(d) for d in feature_data]
+        explanations = [shap_cache.get(k) for k in keys]
+
+        # Explain only the cache misses, in one call
+        missing = [i for i, e in enumerate(explanations) if e is None]
+        if missing:
+            fresh = shap_explainer.explain_batch([feature_data[i] for i in missing])
+            for i, e in zip(missing, fresh):
+                if e and "error" not in e:
+                    shap_cache.set(keys[i], e)
+                    explanations[i] = e
+
+        return [
+            _add_area(e, f) if e and "error" not in e else None
+            for e, f in zip(explanations, features_list)
+        ]
 
     except Exception as e:
-        logger.error(f"❌ get_shap_explanation error: {e}")
-        return None
+        logger.error(f"❌ get_shap_explanations error: {e}")
+        return [None] * len(features_list)
+
+
+@app.get("/api/models/stats")
+async def get_model_stats():
+    """
+    Per-model load time and memory for this worker process
+    """
+    return {
+        "success": True,
+        "data": model_registry.stats()
+    }
+
+
+@app.get("/api/predict/stats")
+async def get_predict_stats():
+    """
+    Request coalescing and response cache metrics for this worker process
+    """
+    return {
+        "success": True,
+        "data": {
+            "single_flight": predict_flight.stats(),
+            "caches": cache_stats()
+        }
+    }
 
 
 # ============================================================================
@@ -0,0 +1,60 @@
+-- ============================================================================
+-- COLLECTOR RUN JOURNAL (collector_journal.py)
+-- Run this in Supabase SQL Editor
+-- ============================================================================
+
+-- Table 1: collector_runs
+-- One row per verified_price_collector run; `--resume` continues the latest
+-- unfinished run of the same day and mode
+CREATE TABLE IF NOT EXISTS collector_runs (
+    run_id UUID PRIMARY KEY,
+    run_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    mode TEXT NOT NULL,                             -- 'daily', 'bootstrap', 'test'
+    status TEXT NOT NULL DEFAULT 'RUNNING',         -- 'RUNNING', 'COMPLETED', 'FAILED'
+    steps_done TEXT[] NOT NULL DEFAULT '{}',        -- Steps fully applied, skipped on resume (e.g. '5')
+    stats JSONB,
+    error TEXT,
+    resumed_count INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_collector_runs_date_mode ON collector_runs(run_date, mode);
+
+-- Table 2: collector_run_items
+-- Completed crawl work: a list page's listings (kind 'page', item_key = page
+-- number) or a NEW listing's parsed detail page (kind 'detail', item_key =
+-- listing_id). Empty pages and failed fetches are not recorded, so a resumed
+-- run retries them
+CREATE TABLE IF NOT EXISTS collector_run_items (
+    run_id UUID NOT NULL REFERENCES collector_runs(run_id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    item_key BIGINT NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (run_id, kind, item_key)
+);
+
+-- Trigger for collector_runs (update_updated_at_column is defined in 001)
+DROP TRIGGER IF EXISTS update_collector_runs_updated_at ON collector_runs;
+CREATE TRIGGER update_collector_runs_updated_at
+    BEFORE UPDATE ON collector_runs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- ============================================================================
+-- ROW LEVEL SECURITY
+-- ============================================================================
+
+ALTER TABLE collector_runs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE collector_run_items ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access collector runs" ON collector_runs
+    FOR ALL USING (true) WITH CHECK (true);
+
+CREATE POLICY "Service role full access collector run items" ON collector_run_items
+    FOR ALL USING (true) WITH CHECK (true);
+
+-- Journals are only needed until the run completes; prune old ones with:
+-- DELETE FROM collector_runs WHERE run_date < CURRENT_DATE - 7;
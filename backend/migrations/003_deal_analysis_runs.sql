@@ -0,0 +1,31 @@
+-- ============================================================================
+-- BEST DEALS RUNS (best_deals.py)
+-- Run this in Supabase SQL Editor
+-- ============================================================================
+
+-- One row per best_deals.py run. The run's deal_analysis rows share its
+-- analyzed_at timestamp, so run_id is no longer written to every row
+CREATE TABLE IF NOT EXISTS deal_analysis_runs (
+    run_id TEXT PRIMARY KEY,                        -- e.g. '20260114_105017'
+    analyzed_at TIMESTAMPTZ NOT NULL,
+    days_analyzed INTEGER,
+    total_listings INTEGER,
+    good_deals_count INTEGER,
+    top_5_threshold NUMERIC(6,1),                   -- deal_score of the last top-5% listing
+    top_10_threshold NUMERIC(6,1),
+    rows_written INTEGER,
+    rows_failed INTEGER,
+    write_seconds NUMERIC(10,2),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_deal_analysis_runs_analyzed ON deal_analysis_runs(analyzed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_deal_analysis_analyzed ON deal_analysis(analyzed_at);
+
+ALTER TABLE deal_analysis_runs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access deal analysis runs" ON deal_analysis_runs
+    FOR ALL USING (true) WITH CHECK (true);
+
+-- deal_analysis.run_id is no longer written; once nothing reads it:
+-- ALTER TABLE deal_analysis DROP COLUMN IF EXISTS run_id;
@@ -0,0 +1,9 @@
+-- ============================================================================
+-- INCREMENTAL BEST DEALS (best_deals.py --incremental)
+-- Run this in Supabase SQL Editor
+-- ============================================================================
+
+-- Hash of the model-ready feature vector plus the model version that scored
+-- the row; `--incremental` only rescores listings whose hash or price changed
+ALTER TABLE deal_analysis ADD COLUMN IF NOT EXISTS feature_hash TEXT;
+ALTER TABLE deal_analysis ADD COLUMN IF NOT EXISTS model_version TEXT;   -- ModelRegistry.model_version('new')
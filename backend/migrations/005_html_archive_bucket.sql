@@ -0,0 +1,16 @@
+-- ============================================================================
+-- HTML ARCHIVE STORAGE (html_archive.py push / pull)
+-- Run this in Supabase SQL Editor
+-- ============================================================================
+
+-- Private bucket holding the raw HTML archive as tar shards
+-- (shards/<date>/<timestamp>-<id>.tar); each collector run pushes the pages
+-- it fetched, so the archive does not depend on the CI runner's cache.
+-- The service role key used by the collector bypasses storage RLS.
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('html-archive', 'html-archive', false)
+ON CONFLICT (id) DO NOTHING;
+
+-- Storage is billed per GB and shards are never rewritten: old history can
+-- be dropped a day folder at a time (Storage dashboard) once it has been
+-- re-parsed and is no longer needed
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Model Registry for TikraKaina
+Owns the pickled models and their JSON configs so every module in the process
+shares the same objects instead of unpickling its own copy.
+
+- model.pkl / model_new.pkl are each loaded exactly once per process
+- feature_order.json and district_categories.json are loaded alongside them
+- Load time and memory cost are recorded per artifact
+- `model_version(name)` is a content hash of the model file and configs, so
+  stored predictions can tell which model produced them
+
+Under `gunicorn --preload` the registry is populated in the master before the
+workers fork, so the boosters live in copy-on-write pages shared by all workers.
+"""
+
+import gc
+import hashlib
+import json
+import logging
+import os
+import pickle
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Artifact name -> file name (relative to the backend directory)
+MODEL_FILES = {
+    "old": "model.pkl",
+    "new": "model_new.pkl",
+}
+FEATURE_ORDER_FILE = "feature_order.json"
+DISTRICT_CATEGORIES_FILE = "district_categories.json"
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size of this process in bytes (Linux), else None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Process-wide owner of the prediction models and their configs.
+    Use `get_registry()` instead of instantiating this directly.
+    """
+
+    def __init__(self, base_dir: Path = BASE_DIR):
+        self.base_dir = Path(base_dir)
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self.feature_order: Optional[List[str]] = None
+        self.district_categories: Optional[List[str]] = None
+
+        self._load_configs()
+        for name in MODEL_FILES:
+            self._load_model(name)
+
+    def _load_model(self, name: str):
+        """Unpickle one model and record how long it took and how much memory it added."""
+        path = self.base_dir / MODEL_FILES[name]
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            self._models[name] = pickle.loads(data)
+            load_seconds = time.perf_counter() - start
+            rss_after = _rss_bytes()
+            rss_delta = (rss_after - rss_before) if (rss_before is not None and rss_after is not None) else None
+
+            self._stats[name] = {
+                "path": str(path),
+                "loaded": True,
+                "load_seconds": round(load_seconds, 3),
+                "file_size_mb": round(path.stat().st_size / 1024 / 1024, 2),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "rss_delta_mb": round(rss_delta / 1024 / 1024, 2) if rss_delta is not None else None,
+            }
+            logger.info(
+                f"✅ Registry: {name} model loaded from {path.name} in {load_seconds:.2f}s "
+                f"(+{self._stats[name]['rss_delta_mb']} MB RSS)"
+            )
+        except Exception as e:
+            self._models[name] = None
+            self._stats[name] = {"path": str(path), "loaded": False, "error": str(e)}
+            logger.error(f"❌ Registry: Failed to load {name} model: {e}")
+
+    def _load_configs(self):
+        """Load feature order and district categories used by the new model."""
+        try:
+            with open(self.base_dir / FEATURE_ORDER_FILE, "r") as f:
+                self.feature_order = json.load(f)
+            with open(self.base_dir / DISTRICT_CATEGORIES_FILE, "r") as f:
+                self.district_categories = json.load(f)
+            logger.info(
+                f"✅ Registry: Configs loaded ({len(self.feature_order)} features, "
+                f"{len(self.district_categories)} districts)"
+            )
+        except Exception as e:
+            logger.error(f"❌ Registry: Failed to load model configs: {e}")
+
+    def get(self, name: str) -> Any:
+        """Return the shared model object for `name` ("old" or "new"), or None if it failed to load."""
+        if name not in MODEL_FILES:
+            raise KeyError(f"Unknown model '{name}', expected one of {list(MODEL_FILES)}")
+        return self._models.get(name)
+
+    def model_version(self, name: str = "new") -> Optional[str]:
+        """
+        Short content hash of a model file plus the feature order and district
+        categories it is encoded with. Changes whenever any of them does.
+        """
+        sha = self._stats.get(name, {}).get("sha256")
+        if sha is None:
+            return None
+        configs = json.dumps([self.feature_order, self.district_categories]).encode("utf-8")
+        return hashlib.sha256(sha.encode("ascii") + configs).hexdigest()[:16]
+
+    @property
+    def old_model(self) -> Any:
+        return self.get("old")
+
+    @property
+    def new_model(self) -> Any:
+        return self.get("new")
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model load time and memory, plus the current process RSS."""
+        rss = _rss_bytes()
+        if rss is None:
+            # ru_maxrss is in KiB on Linux; only a peak, but better than nothing
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {
+            "pid": os.getpid(),
+            "process_rss_mb": round(rss / 1024 / 1024, 2),
+            "models": {name: dict(stat) for name, stat in self._stats.items()},
+            "feature_count": len(self.feature_order) if self.feature_order else 0,
+            "district_count": len(self.district_categories) if self.district_categories else 0,
+        }
+
+
+# Singleton instance for the process
+_registry_instance: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Get or create the singleton model registry."""
+    global _registry_instance
+
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                logger.info("🚀 Initializing model registry...")
+                _registry_instance = ModelRegistry()
+                # Move everything allocated so far into the permanent generation so
+                # the cyclic GC never writes to these pages after a preload fork.
+                gc.freeze()
+    return _registry_instance
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(get_registry().stats(), indent=2))
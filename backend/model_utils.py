@@ -4,24 +4,33 @@ Lithuanian Apartment Rental Price Predictor
 Scrapes aruodas.lt listings and predicts rental prices using a trained model.
 """
 
-import requests
+import httpx
+import asyncio
 import random
 import re
 import json
-from bs4 import BeautifulSoup
 import pandas as pd
 import pickle
 import os
+import threading
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
 import ast
 from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 import warnings
 import logging
-from base64 import b64decode
 from dotenv import load_dotenv
 
+from gazetteer import get_gazetteer
+from geo import distance_to_center_km
+from geocode_cache import get_geocode_cache
+from html_archive import archive_fetch
+from listing_parser import parse_listing
+from zyte_client import close_zyte_client, get_zyte_client
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -34,9 +43,7 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 BASE = "https://www.aruodas.lt/butu-nuoma/vilniuje/puslapis/{page}/"
-CITY_CENTER = (54.6872, 25.2797)  # Vilnius center coordinates
 ZYTE_API_KEY = os.getenv("ZYTE_API_KEY")
-ZYTE_API_ENDPOINT = "https://api.zyte.com/v1/extract"
 
 # Browser simulation
 USER_AGENTS = [
@@ -59,51 +66,82 @@ COMMON_HEADERS = {
 
 # Geocoding setup
 _geocoder = Nominatim(user_agent="rent_model_geocoder", timeout=10)
-_GEOCODE_CACHE = {}
-
-
-
-def _parse_dl_block(dl):
-    """Extract <dt>/<dd> pairs from a <dl> block. Returns a dict of {key: [values]}."""
-    out = {}
-    if not dl:
-        return out
-    
-    for dt in dl.find_all("dt"):
-        key = dt.get_text(strip=True).rstrip(":")
-        dd = dt.find_next_sibling("dd")
-        if not dd:
-            continue
-
-        spans = [s.get_text(strip=True) for s in dd.find_all("span") if s.get_text(strip=True)]
-        if spans:
-            out[key] = spans
-        else:
-            text = dd.get_text(strip=True)
-            out[key] = [text] if text else []
-    return out
-
-
-def _extract_location_from_title(soup):
-    """Parse <h1 class="obj-header-text"> to extract city, district, street."""
-    h1 = soup.select_one("h1.obj-header-text")
-    if not h1:
-        return None, None, None
-
-    txt = h1.get_text(" ", strip=True)
-    head = re.split(r"\b(buto|būsto)\s+nuoma\b", txt, flags=re.IGNORECASE)[0]
-    parts = [p.strip(" ,") for p in head.split(",") if p.strip(" ,")]
-
-    city = parts[0] if len(parts) >= 1 else None
-    district = parts[1] if len(parts) >= 2 else None
-    street = parts[2] if len(parts) >= 3 else None
-    return city, district, street
+# Nominatim usage policy: at most one request per second (shared by every thread)
+NOMINATIM_RATE_PER_SEC = float(os.getenv("NOMINATIM_RATE_PER_SEC", "1"))
+GEOCODE_WORKERS = 5  # Background lookups of lower-priority address variants
+
+
+class _NominatimThrottle:
+    """Spaces Nominatim requests at least 1/rate seconds apart across threads (rate 0 = no limit)."""
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserve the next free request slot; returns the seconds until it starts."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        return start - now
+
+    def wait(self):
+        """Reserve the next free request slot and sleep until it starts."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def try_acquire(self) -> float:
+        """
+        Claim a slot only if it is free right now: 0.0 on success, else the
+        seconds until the next free slot. Never reserves a future slot, so it
+        cannot delay a later `wait`.
+        """
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            if self._next_start > now:
+                return self._next_start - now
+            self._next_start = now + self.interval
+            return 0.0
+
+
+_nominatim_throttle = _NominatimThrottle(NOMINATIM_RATE_PER_SEC)
+_geocode_pool = None
+_geocode_pool_pid = None
+_geocode_pool_lock = threading.Lock()
+
+
+def _get_geocode_pool() -> ThreadPoolExecutor:
+    """Process-wide pool for speculative geocoding (recreated after a fork)."""
+    global _geocode_pool, _geocode_pool_pid
+
+    if _geocode_pool is None or _geocode_pool_pid != os.getpid():
+        with _geocode_pool_lock:
+            if _geocode_pool is None or _geocode_pool_pid != os.getpid():
+                _geocode_pool = ThreadPoolExecutor(max_workers=GEOCODE_WORKERS, thread_name_prefix="geocode")
+                _geocode_pool_pid = os.getpid()
+    return _geocode_pool
+
+
+
+def _parse_listing_html(http_response_body_bytes: bytes, url: str) -> dict:
+    """Parse a decoded aruodas.lt detail page into the raw listing dict."""
+    return parse_listing(http_response_body_bytes, url).raw_dict()
 
 
 def scrape_listing(url: str) -> dict:
     """
     Scrape apartment listing data using Zyte API,
     decoding the Base64 httpResponseBody.
+
+    Blocking version for scripts and notebooks. Request handlers running on
+    the event loop must use `scrape_listing_async` instead.
     """
     if not ZYTE_API_KEY:
         logger.error("ZYTE_API_KEY environment variable is not set. Cannot use Zyte API.")
@@ -112,46 +150,47 @@ def scrape_listing(url: str) -> dict:
     try:
         logger.info(f"Scraping {url} via Zyte API (optimized, no JS rendering)...")
 
-        # Make the request to Zyte API using their specified auth method
-        api_response = requests.post(
-            ZYTE_API_ENDPOINT,
-            auth=(ZYTE_API_KEY, ""), # <--- AUTHENTICATION AS PER ZYTE SNIPPET
-            json={
-                "url": url, # <--- DYNAMICALLY USE THE USER'S URL
-                "httpResponseBody": True, # Request the raw HTTP response body
-                "followRedirect": True, # Follow redirects
-            },
-            timeout=30 # Keep a reasonable timeout
-        )
-        api_response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx) from Zyte
-
-        response_json = api_response.json()
-
-        # Check if httpResponseBody is present and decode it
-        if not response_json.get("httpResponseBody"):
-            raise ValueError("Zyte API did not return httpResponseBody in the response.")
-
-        # Decode the Base64 encoded HTML body
-        http_response_body_bytes: bytes = b64decode(response_json["httpResponseBody"])
-        
-        # BeautifulSoup parses the decoded HTML content
-        soup = BeautifulSoup(http_response_body_bytes, "html.parser")
+        # Shared pooled client: keep-alive connections, retries with backoff
+        http_response_body_bytes = get_zyte_client().fetch(url, api_key=ZYTE_API_KEY)
+        archive_fetch(url, http_response_body_bytes)
+        return _parse_listing_html(http_response_body_bytes, url)
+
+    except httpx.HTTPError as e:
+        logger.error(f"Error calling Zyte API: {e}")
+        raise RuntimeError(f"Failed to fetch listing via Zyte API: {e}")
+    except ValueError as e:
+        logger.error(f"Zyte API response processing error: {e}", exc_info=True)
+        raise RuntimeError(f"Failed to process Zyte API response: {e}")
+    except Exception as e:
+        logger.error(f"General error during scraping or Aruodas HTML parsing: {e}", exc_info=True)
+        raise RuntimeError(f"Failed to parse listing details from Aruodas.lt: {e}")
+
+
+async def close_async_client() -> None:
+    """Close the shared Zyte client's connections (called on application shutdown)."""
+    await close_zyte_client()
+
 
-        # --- Your existing parsing logic for Aruodas.lt starts here, completely unchanged ---
-        details = _parse_dl_block(soup.find("dl", class_="obj-details"))
-        stats = _parse_dl_block(soup.find("div", class_="obj-stats").find("dl")) if soup.find("div", class_="obj-stats") else {}
-        details.update(stats)
+async def scrape_listing_async(url: str) -> dict:
+    """
+    Non-blocking version of `scrape_listing`.
+
+    The Zyte round trip is awaited on the shared async client, and HTML parsing
+    runs in a worker thread, so the event loop keeps serving other requests
+    while a scrape is in flight.
+    """
+    if not ZYTE_API_KEY:
+        logger.error("ZYTE_API_KEY environment variable is not set. Cannot use Zyte API.")
+        raise ValueError("Zyte API Key is missing. Cannot scrape.")
 
-        city, district, street = _extract_location_from_title(soup)
-        if city: details["city"] = [city]
-        if district: details["district"] = [district]
-        if street: details["street"] = [street]
+    try:
+        logger.info(f"Scraping {url} via Zyte API (async, no JS rendering)...")
 
-        result = {"url": url}
-        result.update(details)
-        return result
+        http_response_body_bytes = await get_zyte_client().fetch_async(url, api_key=ZYTE_API_KEY)
+        await asyncio.to_thread(archive_fetch, url, http_response_body_bytes)
+        return await asyncio.to_thread(_parse_listing_html, http_response_body_bytes, url)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error calling Zyte API: {e}")
         raise RuntimeError(f"Failed to fetch listing via Zyte API: {e}")
     except ValueError as e:
@@ -162,25 +201,149 @@ def scrape_listing(url: str) -> dict:
         raise RuntimeError(f"Failed to parse listing details from Aruodas.lt: {e}")
 
 
+def _geocode_local(addr: str):
+    """Resolve an address without the network: (hit, (lat, lon)) from the gazetteer or the persistent cache."""
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        lat, lon = gazetteer.lookup(addr)
+        if lat is not None:
+            return True, (lat, lon)
+    return get_geocode_cache().get(addr)
+
+
 def _geocode_addr(addr: str):
-    """Geocode address with caching."""
+    """
+    Geocode address: offline gazetteer first, then the persistent cache,
+    then Nominatim.
+    """
     if not addr:
         return None, None
-    if addr in _GEOCODE_CACHE:
-        return _GEOCODE_CACHE[addr]
-    
+    hit, coords = _geocode_local(addr)
+    if hit:
+        return coords
+    return _geocode_remote(addr)
+
+
+def _geocode_remote(addr: str, slot_delay: Optional[float] = None):
+    """
+    Look an address up on Nominatim (rate limited) and cache the result, found
+    or not. `slot_delay`: a throttle slot was already reserved, starting then.
+    """
+    cache = get_geocode_cache()
     try:
+        if slot_delay is None:
+            _nominatim_throttle.wait()
+        elif slot_delay > 0:
+            time.sleep(slot_delay)
         loc = _geocoder.geocode(addr)
-        if loc:
-            _GEOCODE_CACHE[addr] = (loc.latitude, loc.longitude)
-            return loc.latitude, loc.longitude
-    except Exception:
-        pass
-    
-    _GEOCODE_CACHE[addr] = (None, None)
+    except Exception as e:
+        # Timeouts / rate limits are not cached, the next call retries
+        logger.warning(f"Geocoding failed for '{addr}': {e}")
+        return None, None
+
+    if loc:
+        cache.put(addr, loc.latitude, loc.longitude)
+        return loc.latitude, loc.longitude
+
+    cache.put(addr, None, None)
     return None, None
 
 
+class _SpeculativeLookup:
+    """
+    Background Nominatim lookup of a lower-priority address variant. It only
+    takes throttle slots nobody has reserved, so it never delays a needed
+    lookup; `result()` promotes it to a regular one, `cancel()` drops it.
+    """
+
+    def __init__(self, addr: str):
+        self.addr = addr
+        self._needed = False
+        self._cancelled = False
+        self._wake = threading.Event()
+        self._future = _get_geocode_pool().submit(self._run)
+
+    def _run(self):
+        while not (self._needed or self._cancelled):
+            delay = _nominatim_throttle.try_acquire()
+            if not delay:
+                return _geocode_remote(self.addr, slot_delay=0.0)
+            self._wake.wait(delay)
+        if self._cancelled:
+            return None, None
+        return _geocode_remote(self.addr)
+
+    def result(self):
+        if self._future.cancel():
+            # Never started: look it up here rather than behind other background work
+            return _geocode_remote(self.addr)
+        self._needed = True
+        self._wake.set()
+        return self._future.result()
+
+    def cancel(self):
+        self._cancelled = True
+        self._wake.set()
+        self._future.cancel()
+
+
+def geocode_first(candidates):
+    """
+    Geocode an address fallback chain (highest priority first) and return the
+    first candidate that resolves, like trying them in turn.
+
+    Candidates are checked locally first (gazetteer, cache). The highest
+    ranked remaining one is looked up on Nominatim right away; the variants
+    below it are looked up speculatively in the background, but only on
+    request slots that are idle, so they never push back another listing's
+    lookups. Once the answer is known, speculative lookups that have not
+    started are dropped.
+    """
+    candidates = list(dict.fromkeys(addr for addr in candidates if addr))
+    local = {}
+    for i, addr in enumerate(candidates):
+        hit, coords = _geocode_local(addr)
+        if hit:
+            local[addr] = coords
+            if coords[0] is not None:
+                candidates = candidates[:i + 1]  # Lower-priority variants cannot change the answer
+                break
+
+    remote = [addr for addr in candidates if addr not in local]
+    # The first lookup's slot is reserved before any speculative one can take it
+    first_delay = _nominatim_throttle.reserve() if remote else None
+    speculative = {addr: _SpeculativeLookup(addr) for addr in remote[1:]}
+    try:
+        for addr in candidates:
+            if addr in local:
+                lat, lon = local[addr]
+            elif addr in speculative:
+                lat, lon = speculative.pop(addr).result()
+            else:
+                lat, lon = _geocode_remote(addr, slot_delay=first_delay)
+            if lat is not None and lon is not None:
+                return lat, lon
+        return None, None
+    finally:
+        for lookup in speculative.values():
+            lookup.cancel()
+
+
+def listing_address_candidates(city, district, street, house):
+    """
+    Address fallback chain of a scraped listing, highest priority first:
+    with district (with, then without house number), then without district.
+    """
+    base_with = ", ".join(p for p in [city, district, street] if p)
+    base_no = ", ".join(p for p in [city, street] if p)
+    return [
+        f"{base_with} {house}" if (base_with and house) else base_with,
+        base_with if house else None,
+        f"{base_no} {house}" if (base_no and house) else base_no,
+        base_no if house else None,
+    ]
+
+
 def add_primary_heating_dummies(df, source_col="Šildymas"):
     """Add heating type dummy variables."""
     def get_primary(s):
@@ -289,33 +452,13 @@ def featurise(raw_dict):
     lat = df.get('latitude', pd.Series([None])).iloc[0]
     lon = df.get('longitude', pd.Series([None])).iloc[0]
 
-    # Geocode if coordinates missing
+    # Geocode if coordinates missing (with district first, then without)
     if pd.isna(lat) or pd.isna(lon):
-        # Try with district first
-        parts_with = [p for p in [city, district, street] if p]
-        base_with = ", ".join(parts_with)
-        addr_with = f"{base_with} {house}" if (base_with and house) else base_with
-
-        lat, lon = _geocode_addr(addr_with)
-        if (lat is None or lon is None) and house:
-            lat, lon = _geocode_addr(base_with)
-
-        # Retry without district if still no results
-        if (lat is None or lon is None):
-            parts_no = [p for p in [city, street] if p]
-            base_no = ", ".join(parts_no)
-            addr_no = f"{base_no} {house}" if (base_no and house) else base_no
-
-            lat, lon = _geocode_addr(addr_no)
-            if (lat is None or lon is None) and house:
-                lat, lon = _geocode_addr(base_no)
+        lat, lon = geocode_first(listing_address_candidates(city, district, street, house))
 
     df["latitude"] = lat
     df["longitude"] = lon
-    df["dist_to_center_km"] = (
-        geodesic((lat, lon), CITY_CENTER).km
-        if pd.notnull(lat) and pd.notnull(lon) else np.nan
-    )
+    df["dist_to_center_km"] = distance_to_center_km(lat, lon)
 
     # Process posting age
     posted_txt = _first_value(df, "Įdėtas")
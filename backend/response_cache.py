@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Two-tier Response Cache for TikraKaina
+Bounded per-worker LRU with TTL in front of a backend shared by all workers.
+
+- L1: in-process LRU (OrderedDict), max entries + TTL, evicts least recently used
+- L2: Redis when REDIS_URL is set; without it there is no L2 unless
+  CACHE_BACKEND=memory selects a bounded in-process stand-in (LRU + TTL,
+  CACHE_MEMORY_BACKEND_SIZE entries) for tests and local runs
+- One cache per response type ("predict", "manual", "shap"), each with its own
+  size and TTL (env: CACHE_<TYPE>_SIZE / CACHE_<TYPE>_TTL)
+- Values are JSON-serialisable dicts; every get returns a fresh copy
+- `get`/`set` block on Redis (for sync code and worker threads); async
+  handlers use `aget`/`aset`, which run the Redis call in a thread
+- Redis errors are counted and treated as misses, never raised to the caller
+
+Hit / miss / eviction counters are available via `cache_stats()`.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis" if REDIS_URL else "none")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "tikrakaina:v1")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+MEMORY_BACKEND_SIZE = int(os.getenv("CACHE_MEMORY_BACKEND_SIZE", "10000"))
+
+# Response type -> (L1 max entries, TTL seconds)
+CACHE_DEFAULTS = {
+    "predict": (1024, 300),
+    "manual": (2048, 3600),
+    "shap": (4096, 3600),
+}
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable short key for arbitrary JSON-serialisable parts (e.g. a feature dict)."""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class InMemoryBackend:
+    """
+    Shared-backend stand-in living in this process: an LRU of at most
+    `maxsize` entries with per-entry TTL. Expired entries are dropped on read
+    and swept before evicting live ones.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = MEMORY_BACKEND_SIZE):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._sweep()
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _sweep(self):
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend:
+    """Shared backend on Redis (SET with EX), one connection pool per process."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            decode_responses=True,
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: int):
+        self._client.set(key, value, ex=ttl)
+
+    def clear(self):
+        for key in self._client.scan_iter(f"{CACHE_KEY_PREFIX}:*"):
+            self._client.delete(key)
+
+
+class TieredCache:
+    """
+    LRU+TTL L1 in front of a shared L2 backend for one response type.
+    Use `get_cache(name)` to share instances within the process.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: int, backend: Any = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._l1: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "backend_errors": 0,
+        }
+
+    def _key(self, key: str) -> str:
+        return f"{CACHE_KEY_PREFIX}:{self.name}:{key}"
+
+    def _l1_put(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._l1[key] = (expires_at, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.maxsize:
+                self._l1.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _l1_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._l1.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at > time.monotonic():
+                self._l1.move_to_end(key)
+                self._counters["l1_hits"] += 1
+                return value
+            del self._l1[key]
+            self._counters["expirations"] += 1
+            return None
+
+    def _backend_get(self, key: str) -> Optional[str]:
+        try:
+            return self.backend.get(self._key(key))
+        except Exception as e:
+            self._counters["backend_errors"] += 1
+            logger.warning(f"⚠️ Cache backend get failed ({self.name}): {e}")
+            return None
+
+    def _backend_set(self, key: str, serialized: str):
+        try:
+            self.backend.set(self._key(key), serialized, self.ttl)
+        except Exception as e:
+            self._counters["backend_errors"] += 1
+            logger.warning(f"⚠️ Cache backend set failed ({self.name}): {e}")
+
+    def _l2_result(self, key: str, value: Optional[str]) -> Optional[Dict[str, Any]]:
+        if value is None:
+            self._counters["misses"] += 1
+            return None
+        # L2 does not tell us the remaining TTL; a full L1 TTL is close enough
+        self._l1_put(key, value, time.monotonic() + self.ttl)
+        self._counters["l2_hits"] += 1
+        return json.loads(value)
+
+    def _l1_set(self, key: str, value: Dict[str, Any]) -> str:
+        serialized = json.dumps(value, default=str)
+        self._l1_put(key, serialized, time.monotonic() + self.ttl)
+        self._counters["sets"] += 1
+        return serialized
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached value, or None on a miss (blocks on L2)."""
+        value = self._l1_get(key)
+        if value is not None:
+            return json.loads(value)
+        if self.backend is None:
+            self._counters["misses"] += 1
+            return None
+        return self._l2_result(key, self._backend_get(key))
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """`get` for async handlers: an L1 hit never leaves the event loop, L2 runs in a thread."""
+        value = self._l1_get(key)
+        if value is not None:
+            return json.loads(value)
+        if self.backend is None:
+            self._counters["misses"] += 1
+            return None
+        return self._l2_result(key, await asyncio.to_thread(self._backend_get, key))
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a JSON-serialisable value in both tiers (blocks on L2)."""
+        serialized = self._l1_set(key, value)
+        if self.backend is not None:
+            self._backend_set(key, serialized)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        """`set` for async handlers: the L2 write runs in a thread."""
+        serialized = self._l1_set(key, value)
+        if self.backend is not None:
+            await asyncio.to_thread(self._backend_set, key, serialized)
+
+    def clear(self):
+        """Drop the L1 entries of this cache (the shared backend is left alone)."""
+        with self._lock:
+            self._l1.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["l1_hits"] + self._counters["l2_hits"] + self._counters["misses"]
+        hits = self._counters["l1_hits"] + self._counters["l2_hits"]
+        return {
+            "size": len(self._l1),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "backend": self.backend.name if self.backend is not None else None,
+            **self._counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared backend and per-type caches for the process
+_backend: Any = None
+_backend_checked = False
+_backend_lock = threading.Lock()
+_caches: Dict[str, TieredCache] = {}
+
+
+def get_backend() -> Any:
+    """
+    Get or create the shared L2 backend: Redis if configured, the in-memory
+    stand-in for CACHE_BACKEND=memory, else None (L1 only).
+    """
+    global _backend, _backend_checked
+
+    if not _backend_checked:
+        with _backend_lock:
+            if not _backend_checked:
+                if CACHE_BACKEND == "redis" and REDIS_URL:
+                    try:
+                        _backend = RedisBackend(REDIS_URL)
+                        logger.info("✅ Cache: using Redis backend")
+                    except Exception as e:
+                        logger.error(f"❌ Cache: Redis unavailable ({e}), using per-worker L1 only")
+                elif CACHE_BACKEND == "memory":
+                    _backend = InMemoryBackend()
+                    logger.info("✅ Cache: using in-memory backend")
+                else:
+                    logger.info("✅ Cache: no shared backend configured, using per-worker L1 only")
+                _backend_checked = True
+    return _backend
+
+
+def get_cache(name: str) -> TieredCache:
+    """Get or create the cache for a response type ("predict", "manual", "shap")."""
+    cache = _caches.get(name)
+    if cache is None:
+        default_size, default_ttl = CACHE_DEFAULTS.get(name, (1024, 300))
+        cache = _caches.setdefault(name, TieredCache(
+            name,
+            maxsize=int(os.getenv(f"CACHE_{name.upper()}_SIZE", default_size)),
+            ttl=int(os.getenv(f"CACHE_{name.upper()}_TTL", default_ttl)),
+            backend=get_backend(),
+        ))
+    return cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Counters for every cache created in this process."""
+    return {name: cache.stats() for name, cache in _caches.items()}
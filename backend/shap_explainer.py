@@ -4,22 +4,32 @@ SHAP Explainer Module for TikraKaina
 Provides model explanations using TreeSHAP for LightGBM predictions.
 
 Optimized for production:
-- Uses kmeans-summarized background data for speed
+- Default "lightgbm" backend uses LightGBM's native pred_contrib (exact
+  TreeSHAP + bias term), so the shap package is never imported at startup
+- "shap" backend (SHAP_BACKEND=shap) keeps the shap.TreeExplainer path
+- Batched explanations for many rows in one booster call
 - Caches explainer at startup
 - Provides human-readable explanations in Lithuanian
 """
 
 import json
 import logging
+import os
 import pickle
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
 import numpy as np
 import pandas as pd
-import shap
+
+from model_registry import get_registry
+from feature_encoder import FeatureEncoder
 
 logger = logging.getLogger(__name__)
 
+# Explanation backends: "lightgbm" (native pred_contrib) or "shap" (shap.TreeExplainer)
+SHAP_BACKENDS = ("lightgbm", "shap")
+DEFAULT_SHAP_BACKEND = os.getenv("SHAP_BACKEND", "lightgbm").lower()
+
 # Human-readable feature names in Lithuanian
 FEATURE_NAMES_LT = {
     "rooms": "Kambariai",
@@ -84,57 +94,99 @@ DISTRICT_AVERAGES = {
 class ShapExplainer:
     """
     SHAP-based model explainer for rental price predictions.
-    Uses TreeSHAP with kmeans-optimized background data for fast explanations.
+    Uses exact TreeSHAP, either from LightGBM's pred_contrib (default) or
+    from shap.TreeExplainer.
     """
 
     def __init__(
         self,
-        model_path: str = "model_new.pkl",
-        feature_order_path: str = "feature_order.json",
-        district_categories_path: str = "district_categories.json",
+        model_path: Optional[str] = None,
+        feature_order_path: Optional[str] = None,
+        district_categories_path: Optional[str] = None,
         training_data_path: str = "new-map/aruodas_rent_enriched_20November.csv",
-        background_samples: int = 100
+        background_samples: int = 100,
+        backend: Optional[str] = None
     ):
         self.model = None
         self.explainer = None
         self.feature_order = None
         self.district_categories = None
+        self.encoder = None
         self.expected_value = None
         self.background_samples = background_samples
+        self.backend = (backend or DEFAULT_SHAP_BACKEND).lower()
+        if self.backend not in SHAP_BACKENDS:
+            raise ValueError(f"Unknown SHAP backend '{self.backend}', expected one of {SHAP_BACKENDS}")
 
         self._load_model(model_path)
         self._load_configs(feature_order_path, district_categories_path)
-        self._create_explainer(training_data_path)
+        self.encoder = FeatureEncoder(self.feature_order, self.district_categories.categories)
 
-    def _load_model(self, model_path: str):
-        """Load the LightGBM model"""
+        if self.backend == "lightgbm":
+            self._create_native_explainer()
+        else:
+            self._create_explainer(training_data_path)
+
+    def _load_model(self, model_path: Optional[str]):
+        """Load the LightGBM model (shared registry instance unless a path is given)"""
         try:
-            with open(model_path, "rb") as f:
-                self.model = pickle.load(f)
+            if model_path is None:
+                self.model = get_registry().new_model
+                if self.model is None:
+                    raise RuntimeError("new model not available in registry")
+            else:
+                with open(model_path, "rb") as f:
+                    self.model = pickle.load(f)
             logger.info("✅ SHAP: Model loaded successfully")
         except Exception as e:
             logger.error(f"❌ SHAP: Failed to load model: {e}")
             raise
 
-    def _load_configs(self, feature_order_path: str, district_categories_path: str):
-        """Load feature order and district categories"""
+    def _load_configs(self, feature_order_path: Optional[str], district_categories_path: Optional[str]):
+        """Load feature order and district categories (from the registry unless paths are given)"""
         try:
-            with open(feature_order_path, "r") as f:
-                self.feature_order = json.load(f)
+            registry = get_registry()
 
-            with open(district_categories_path, "r") as f:
-                self.district_categories = pd.CategoricalDtype(categories=json.load(f))
+            if feature_order_path is None:
+                self.feature_order = registry.feature_order
+            else:
+                with open(feature_order_path, "r") as f:
+                    self.feature_order = json.load(f)
+
+            if district_categories_path is None:
+                categories = registry.district_categories
+            else:
+                with open(district_categories_path, "r") as f:
+                    categories = json.load(f)
+            self.district_categories = pd.CategoricalDtype(categories=categories)
 
             logger.info(f"✅ SHAP: Configs loaded ({len(self.feature_order)} features)")
         except Exception as e:
             logger.error(f"❌ SHAP: Failed to load configs: {e}")
             raise
 
+    def _native_expected_value(self) -> float:
+        """Model expected value, read from the bias column of pred_contrib."""
+        booster = getattr(self.model, "booster_", self.model)
+        probe = self.encoder.encode({}).reshape(1, -1)
+        return float(booster.predict(probe, pred_contrib=True)[0, -1])
+
+    def _create_native_explainer(self):
+        """
+        Use LightGBM's built-in TreeSHAP. The bias column of pred_contrib is the
+        model's expected value, so no training data is needed at startup.
+        """
+        self.explainer = getattr(self.model, "booster_", self.model)
+        self.expected_value = self._native_expected_value()
+        logger.info(f"✅ SHAP: Native LightGBM explainer ready (base value: €{self.expected_value:.2f}/m²)")
+
     def _create_explainer(self, training_data_path: str):
         """
         Create SHAP TreeExplainer with kmeans-summarized background data.
         This is the key optimization for production speed.
         """
+        import shap  # heavy import, only needed for the "shap" backend
+
         try:
             # Load training data
             training_data_file = Path(training_data_path)
@@ -143,6 +195,9 @@ class ShapExplainer:
                 logger.info("🔄 SHAP: Creating explainer without background data (will use interventional)")
                 self.explainer = shap.TreeExplainer(self.model)
                 self.expected_value = self.explainer.expected_value
+                if self.expected_value is None:
+                    # Same base value the native backend reports (pred_contrib bias term)
+                    self.expected_value = self._native_expected_value()
                 return
 
             df = pd.read_csv(training_data_file)
@@ -274,6 +329,10 @@ class ShapExplainer:
             logger.error("❌ SHAP: Explainer not initialized")
             return {"error": "Explainer not initialized"}
 
+        if self.backend == "lightgbm":
+            rows = features_df[self.feature_order].to_dict("records")
+            return self.explain_batch(rows)[0]
+
         try:
             # Ensure correct column order
             features_df = features_df[self.feature_order].copy()
@@ -315,17 +374,68 @@ class ShapExplainer:
             logger.error(f"❌ SHAP: Traceback: {traceback.format_exc()}")
             return {"error": str(e)}
 
+    def explain_features(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """Explain a single prediction given as a feature dict (district as its name)."""
+        if self.backend == "lightgbm":
+            return self.explain_batch([features])[0]
+
+        df = pd.DataFrame([{feat: features.get(feat) for feat in self.feature_order}])
+        df["district_encoded"] = pd.Categorical(
+            [self.encoder.district_name(features.get("district_encoded"))],
+            dtype=self.district_categories
+        )
+        return self.explain(df)
+
+    def explain_batch(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Explain many predictions with a single pred_contrib call.
+
+        Args:
+            rows: feature dicts (district_encoded as its name)
+
+        Returns:
+            One explanation dict per row, in the same order
+        """
+        if not rows:
+            return []
+        if self.backend != "lightgbm":
+            return [self.explain_features(row) for row in rows]
+        if self.explainer is None:
+            logger.error("❌ SHAP: Explainer not initialized")
+            return [{"error": "Explainer not initialized"} for _ in rows]
+
+        try:
+            X = self.encoder.encode_many(rows)
+            contrib = self.explainer.predict(X, pred_contrib=True)
+
+            explanations = [
+                self._build_explanation(
+                    shap_values=contrib[i, :-1],
+                    feature_values=self.encoder.decode(X[i]),
+                    base_value=float(contrib[i, -1])
+                )
+                for i in range(len(rows))
+            ]
+            logger.info(f"✅ SHAP: {len(explanations)} explanation(s) generated via pred_contrib")
+            return explanations
+
+        except Exception as e:
+            logger.error(f"❌ SHAP: Batch explanation failed: {e}")
+            import traceback
+            logger.error(f"❌ SHAP: Traceback: {traceback.format_exc()}")
+            return [{"error": str(e)} for _ in rows]
+
     def _build_explanation(
         self,
         shap_values: np.ndarray,
-        feature_values: pd.Series,
+        feature_values: Union[pd.Series, Dict[str, Any]],
         base_value: float
     ) -> Dict[str, Any]:
         """Build human-readable explanation from SHAP values"""
 
         # Extract district for comparison
         district = None
-        if "district_encoded" in feature_values.index:
+        if "district_encoded" in feature_values:
             district_val = feature_values["district_encoded"]
             district = str(district_val) if pd.notnull(district_val) else None
 
@@ -564,7 +674,7 @@ def get_explainer() -> ShapExplainer:
     global _explainer_instance
 
     if _explainer_instance is None:
-        logger.info("🚀 Initializing SHAP Explainer...")
+        logger.info(f"🚀 Initializing SHAP Explainer ({DEFAULT_SHAP_BACKEND} backend)...")
         _explainer_instance = ShapExplainer()
         logger.info("✅ SHAP Explainer ready!")
 
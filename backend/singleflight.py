@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Single-flight request coalescing for TikraKaina
+Concurrent callers asking for the same key share ONE in-flight execution
+instead of each running the full scrape -> predict -> SHAP pipeline.
+
+- The first caller for a key (the leader) starts the work as a task
+- Callers arriving while it runs await the same task (coalesced)
+- The key is released as soon as the task finishes, so results are only
+  reused through the normal prediction cache afterwards
+- A caller disconnecting never cancels the shared task (asyncio.shield)
+"""
+
+import asyncio
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Aruodas listing id, e.g. https://www.aruodas.lt/butu-nuoma-vilniuje-...-4-1234567/
+_LISTING_ID_RE = re.compile(r"aruodas\.lt/.*?(\d+-\d+)/?(?:[?#]|$)")
+
+
+def listing_key(url_str: str) -> str:
+    """Coalescing key for a listing URL: the aruodas listing id if present, else the URL."""
+    match = _LISTING_ID_RE.search(url_str)
+    return match.group(1) if match else url_str.split("#")[0]
+
+
+class SingleFlight:
+    """
+    Per-process group of in-flight executions keyed by string.
+    Must be used from a single event loop (one per uvicorn worker).
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn()` for `key`, or await the execution already in flight for it."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"🔗 Coalesced request for {key} ({self.name})")
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._release(k, t))
+
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Leader/coalesced counters and the number of keys currently in flight."""
+        total = self.leaders + self.coalesced
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
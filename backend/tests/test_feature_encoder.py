@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ab_testing import _coerce_dtypes_and_order, featurise_new, featurise_new_dict
+from feature_encoder import CAT_COL, OTHER_DISTRICT, get_encoder
+from model_registry import get_registry
+
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope="module")
+def registry():
+    registry = get_registry()
+    if registry.new_model is None:
+        pytest.skip("model_new.pkl is not available")
+    return registry
+
+
+@pytest.fixture(scope="module")
+def encoder(registry):
+    return get_encoder()
+
+
+def dataframe_predict(registry, rows):
+    """Reference path: one DataFrame through _coerce_dtypes_and_order and model.predict."""
+    categories = pd.Index(registry.district_categories)
+    df = _coerce_dtypes_and_order(pd.DataFrame(rows), categories, registry.feature_order)
+    return registry.new_model.predict(df)
+
+
+def encoder_predict(registry, encoder, rows):
+    return encoder.predict(registry.new_model, encoder.encode_many(rows))
+
+
+def random_rows(encoder, n, seed):
+    """Random feature dicts with missing values, numeric strings and unknown districts."""
+    rng = np.random.default_rng(seed)
+    districts = encoder.district_categories + ["Unknown district", None]
+    rows = []
+    for _ in range(n):
+        row = {
+            "rooms": float(rng.integers(1, 6)),
+            "floor_current": float(rng.integers(1, 20)),
+            "floor_total": float(rng.integers(1, 25)),
+            "area_m2": float(rng.uniform(15, 160)),
+            "year_centered": float(rng.integers(-70, 25)),
+            "dist_to_center_km": float(rng.uniform(0, 15)),
+            "heat_Centrinis": int(rng.integers(0, 2)),
+            "heat_Dujinis": int(rng.integers(0, 2)),
+            "heat_Elektra": int(rng.integers(0, 2)),
+            "has_lift": bool(rng.integers(0, 2)),
+            "has_balcony_terrace": int(rng.integers(0, 2)),
+            "has_parking_spot": int(rng.integers(0, 2)),
+            CAT_COL: districts[int(rng.integers(0, len(districts)))],
+        }
+        for name in encoder.feature_order:
+            if name != CAT_COL and rng.random() < 0.1:
+                row[name] = None if rng.random() < 0.5 else np.nan
+        if rng.random() < 0.05:
+            row["rooms"] = str(int(rng.integers(1, 6)))
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_rows_match_dataframe_path(registry, encoder, seed):
+    rows = random_rows(encoder, 300, seed)
+
+    expected = dataframe_predict(registry, rows)
+    actual = encoder_predict(registry, encoder, rows)
+
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE)
+
+
+EDGE_CASES = {
+    "unknown_district": {"area_m2": 50.0, "rooms": 2.0, CAT_COL: "Niekur"},
+    "no_district": {"area_m2": 50.0, "rooms": 2.0},
+    "district_none": {"area_m2": 50.0, "rooms": 2.0, CAT_COL: None},
+    "district_not_a_string": {"area_m2": 50.0, CAT_COL: 3},
+    "all_fields_missing": {},
+    "all_fields_none": {"area_m2": None, "rooms": None, "floor_current": None, CAT_COL: None},
+    "numeric_strings": {"area_m2": " 45.5 ", "rooms": "2", "floor_total": "5", CAT_COL: OTHER_DISTRICT},
+    "non_numeric_strings": {"area_m2": "n/a", "rooms": "", "year_centered": "abc"},
+    "booleans_and_infinity": {"area_m2": math.inf, "has_lift": True, "heat_Dujinis": False},
+}
+
+
+@pytest.mark.parametrize("case", sorted(EDGE_CASES))
+def test_edge_cases_match_dataframe_path(registry, encoder, case):
+    rows = [EDGE_CASES[case]]
+
+    expected = dataframe_predict(registry, rows)
+    actual = encoder_predict(registry, encoder, rows)
+
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_unknown_district_is_encoded_as_other(encoder):
+    for district in ["Niekur", None, 3]:
+        assert encoder.district_name(district) == OTHER_DISTRICT
+        assert encoder.district_code(district) == encoder.district_code(OTHER_DISTRICT)
+
+
+RAW_LISTINGS = [
+    {
+        "Plotas": ["45,5 m²"], "Kambarių sk.": ["2"], "Aukštas": ["3"], "Aukštų sk.": ["5"],
+        "Metai": ["1975"], "Šildymas": ["Centrinis kolektorinis"], "Ypatybės": ["Yra liftas"],
+        "Papildomos patalpos": ["Balkonas"], "district": ["Žirmūnai"],
+        "latitude": 54.7100, "longitude": 25.3000,
+    },
+    {
+        "Plotas": ["120 m²"], "Kambarių sk.": ["4"], "Aukštas": ["2"], "Aukštų sk.": ["2"],
+        "Metai": ["2019 statyba"], "Šildymas": ["Dujinis"], "Papildomos patalpos": ["Vieta automobiliui", "Terasa"],
+        "district": ["Niekur"], "latitude": 54.6500, "longitude": 25.2000,
+    },
+    {"Plotas": ["30 m²"], "district": ["Senamiestis"], "latitude": 54.6800, "longitude": 25.2800},
+]
+
+
+@pytest.mark.parametrize("raw", RAW_LISTINGS, ids=["full", "unknown_district", "sparse"])
+def test_scraped_listing_matches_featurise_new(registry, encoder, raw):
+    categories = pd.Index(registry.district_categories)
+    expected = registry.new_model.predict(featurise_new(raw, categories, registry.feature_order))
+    actual = encoder.predict(registry.new_model, encoder.encode(featurise_new_dict(raw, encoder)))
+
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE)
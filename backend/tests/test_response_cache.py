@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+import response_cache
+from response_cache import InMemoryBackend, TieredCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "monotonic", clock)
+    return clock
+
+
+def make_cache(backend, maxsize=2, ttl=60):
+    return TieredCache("test", maxsize=maxsize, ttl=ttl, backend=backend)
+
+
+def test_l2_hit_after_l1_is_cleared(clock):
+    cache = make_cache(InMemoryBackend())
+    cache.set("a", {"price": 1})
+    cache.clear()
+
+    assert cache.get("a") == {"price": 1}
+    assert cache.get("a") == {"price": 1}
+    stats = cache.stats()
+    assert (stats["l2_hits"], stats["l1_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_miss_in_both_tiers(clock):
+    cache = make_cache(InMemoryBackend())
+
+    assert cache.get("missing") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_get_returns_a_copy(clock):
+    cache = make_cache(InMemoryBackend())
+    cache.set("a", {"items": [1]})
+    cache.get("a")["items"].append(2)
+
+    assert cache.get("a") == {"items": [1]}
+
+
+def test_entries_expire_in_both_tiers(clock):
+    backend = InMemoryBackend()
+    cache = make_cache(backend, ttl=60)
+    cache.set("a", {"price": 1})
+
+    clock.now += 61
+    assert cache.get("a") is None
+    assert len(backend) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_l1_evicts_least_recently_used_and_falls_back_to_l2(clock):
+    cache = make_cache(InMemoryBackend(), maxsize=2)
+    cache.set("a", {"v": "a"})
+    cache.set("b", {"v": "b"})
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", {"v": "c"})
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("b") == {"v": "b"}
+    assert cache.stats()["l2_hits"] == 1
+
+
+def test_backend_evicts_least_recently_used(clock):
+    backend = InMemoryBackend(maxsize=2)
+    cache = make_cache(backend, maxsize=1)
+    cache.set("a", {"v": "a"})
+    cache.set("b", {"v": "b"})
+    cache.set("c", {"v": "c"})
+    cache.clear()
+
+    assert backend.evictions == 1
+    assert cache.get("a") is None
+    assert cache.get("b") == {"v": "b"}
+    assert cache.get("c") == {"v": "c"}
+
+
+def test_backend_sweeps_expired_entries_before_evicting(clock):
+    backend = InMemoryBackend(maxsize=2)
+    backend.set("old", "1", ttl=10)
+    backend.set("live", "2", ttl=100)
+    clock.now += 11
+    backend.set("new", "3", ttl=100)
+
+    assert backend.evictions == 0
+    assert backend.get("live") == "2"
+    assert backend.get("new") == "3"
+
+
+def test_async_get_and_set_use_the_backend(clock):
+    backend = InMemoryBackend()
+    cache = make_cache(backend)
+
+    async def run():
+        await cache.aset("a", {"price": 1})
+        cache.clear()
+        return await cache.aget("a"), await cache.aget("b")
+
+    assert asyncio.run(run()) == ({"price": 1}, None)
+    assert backend.get(cache._key("a")) is not None
+
+
+def test_backend_errors_are_misses(clock):
+    class BrokenBackend:
+        name = "broken"
+
+        def get(self, key):
+            raise ConnectionError("down")
+
+        def set(self, key, value, ttl):
+            raise ConnectionError("down")
+
+    cache = make_cache(BrokenBackend())
+    cache.set("a", {"price": 1})
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.stats()["backend_errors"] == 2
+
+
+@pytest.mark.parametrize("setting, expected", [("memory", InMemoryBackend), ("none", type(None))])
+def test_get_backend_selection(monkeypatch, setting, expected):
+    monkeypatch.setattr(response_cache, "CACHE_BACKEND", setting)
+    monkeypatch.setattr(response_cache, "_backend", None)
+    monkeypatch.setattr(response_cache, "_backend_checked", False)
+
+    assert isinstance(response_cache.get_backend(), expected)
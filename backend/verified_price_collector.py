@@ -9,6 +9,9 @@ Usage:
     python verified_price_collector.py              # Run daily collection
     python verified_price_collector.py --bootstrap  # Initial full scrape
     python verified_price_collector.py --test       # Test mode (5 pages only)
+    python verified_price_collector.py --concurrency 12 --rate 6  # Crawl tuning
+    python verified_price_collector.py --resume     # Continue today's unfinished run
+    python verified_price_collector.py --self-check # Offline consistency checks
 """
 
 import os
@@ -18,16 +21,21 @@ import hashlib
 import logging
 import argparse
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterable, List, Optional, Tuple, Any, Union
 from dataclasses import dataclass, asdict
-from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 
-import requests
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from collector_journal import RunJournal
+from crawler import run_crawl
+from html_archive import archive_fetch
+from listing_parser import ParsedListing, parse_listing
+from zyte_client import get_zyte_client
+
 # Load environment
 load_dotenv()
 
@@ -35,9 +43,6 @@ load_dotenv()
 # CONFIGURATION
 # ============================================================================
 
-ZYTE_API_KEY = os.getenv("ZYTE_API_KEY")
-ZYTE_API_ENDPOINT = "https://api.zyte.com/v1/extract"
-
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", os.getenv("SUPABASE_ANON_KEY"))
 
@@ -50,6 +55,15 @@ MAX_PAGES = 100  # Safety limit
 LISTINGS_PER_PAGE = 25
 MISSING_DAYS_THRESHOLD = 2  # Calendar days since last seen before marking as ENDED
 MAX_LISTING_AGE_DAYS = 40  # Skip listings older than this (stale/overpriced)
+WRITE_CHUNK_SIZE = int(os.getenv("COLLECTOR_WRITE_CHUNK", "500"))  # Rows per multi-row upsert
+SNAPSHOT_CONFLICT = "listing_id,snapshot_date"
+LIFECYCLE_CONFLICT = "listing_id"
+IN_FILTER_CHUNK = 200  # listing ids per `in_` filter (kept well under URL length limits)
+STATE_COLUMNS = "listing_id, url, status, last_price, phone_normalized, fingerprint_hash, repost_chain_id, last_seen_at"
+STATE_PAGE_SIZE = 1000  # Supabase max rows per request
+STATE_LOAD_WORKERS = int(os.getenv("COLLECTOR_STATE_WORKERS", "4"))  # Concurrent keyset readers
+CRAWL_CONCURRENCY = int(os.getenv("COLLECTOR_CONCURRENCY", "8"))  # In-flight Zyte requests
+CRAWL_RATE_PER_SEC = float(os.getenv("COLLECTOR_RATE_PER_SEC", "4"))  # Zyte request starts per second (0 = no limit)
 
 # HTML-based broker detection patterns (strong signals only)
 BROKER_HTML_PATTERNS = [
@@ -69,12 +83,56 @@ OWNER_HTML_PATTERNS = [
     r"nuomoju\s*pats",            # Renting myself
 ]
 
+# Lithuanian mobile: +370 6XX XXXXX or 86XXXXXXX
+# Lithuanian landline: +370 5XX XXXXX or 85XXXXXXX
+PHONE_HTML_PATTERN = r"\+370\s*[56]\d{2}\s*\d{5}|(?<!\d)8[56]\d{7}(?!\d)"
+PHONE_HTML_PREFIXES = [r"\+3", r"8[56]"]
+
+BROKER_LINK_KEYWORDS = ["rebaltic", "ntbroker", "realtor", "agentura", "broker"]
+
+# Text nodes are joined with a separator that phrase patterns may span (as
+# they did over get_text(" ")) but phone numbers may not (they were matched
+# per text node): `\s` matches "\x1e" in Python's re, so the phone pattern's
+# whitespace is narrowed to exclude it
+_NODE_SEP = "\x1e"
+_LITERAL_HEAD_RE = re.compile(r"[^\\\[\](){}.*+?|^$]*")
+
+
+def _compile_signal_matcher() -> "re.Pattern":
+    """
+    One alternation of every phrase pattern (named broker<i>/owner<i>) and the
+    phone pattern, for lowercased text. A lookahead on the first two literal
+    characters of each pattern lets the scan skip most positions without
+    trying all the alternatives.
+    """
+    def spanning(pattern: str) -> str:
+        return pattern.replace(r"\s", r"[\s\x1e]")
+
+    def node_local(pattern: str) -> str:
+        return pattern.replace(r"\s", r"[^\S\x1e]")
+
+    phrases = [(f"broker{i}", p) for i, p in enumerate(BROKER_HTML_PATTERNS)]
+    phrases += [(f"owner{i}", p) for i, p in enumerate(OWNER_HTML_PATTERNS)]
+
+    # A pattern without a literal head contributes "", which disables the guard
+    heads = {re.escape(_LITERAL_HEAD_RE.match(p).group()[:2]) for _, p in phrases}
+    guard = "|".join(sorted(heads) + PHONE_HTML_PREFIXES)
+
+    parts = [f"(?P<{name}>{spanning(p)})" for name, p in phrases]
+    parts.append(f"(?P<phone>{node_local(PHONE_HTML_PATTERN)})")
+    return re.compile(f"(?=(?:{guard}))(?:{'|'.join(parts)})")
+
+
+_SIGNAL_RE = _compile_signal_matcher()
+_BROKER_LINK_RE = re.compile("|".join(BROKER_LINK_KEYWORDS), re.IGNORECASE)
+
 # Logging setup
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s | %(levelname)s | %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 )
+logging.getLogger("httpx").setLevel(logging.WARNING)  # One INFO line per Zyte request otherwise
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -131,6 +189,27 @@ class ListingFull:
     fingerprint_hash: str
 
 
+_LISTING_DATE_FIELDS = ("date_posted", "date_edited", "expires_at")
+
+
+def listing_full_to_dict(listing: ListingFull) -> Dict[str, Any]:
+    """JSON-safe dict of a ListingFull (dates as ISO strings), for the run journal."""
+    data = asdict(listing)
+    for name in _LISTING_DATE_FIELDS:
+        if data[name]:
+            data[name] = data[name].isoformat()
+    return data
+
+
+def listing_full_from_dict(data: Dict[str, Any]) -> ListingFull:
+    """Inverse of `listing_full_to_dict`."""
+    data = dict(data)
+    for name in _LISTING_DATE_FIELDS:
+        if data.get(name):
+            data[name] = datetime.fromisoformat(data[name])
+    return ListingFull(**data)
+
+
 # ============================================================================
 # SUPABASE CLIENT
 # ============================================================================
@@ -146,56 +225,11 @@ def get_supabase() -> Client:
 # ZYTE API HELPERS
 # ============================================================================
 
-def zyte_fetch(url: str, timeout: int = 30, max_retries: int = 3) -> str:
-    """Fetch URL via Zyte API, bypassing Cloudflare. Includes retry logic."""
-    if not ZYTE_API_KEY:
-        raise RuntimeError("ZYTE_API_KEY not set")
-
-    import time
-    last_error = None
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                ZYTE_API_ENDPOINT,
-                auth=(ZYTE_API_KEY, ""),
-                json={
-                    "url": url,
-                    "httpResponseBody": True,
-                    "followRedirect": True,
-                },
-                timeout=timeout
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            body_b64 = data.get("httpResponseBody", "")
-
-            if not body_b64:
-                raise ValueError(f"No HTML content returned for {url}")
-
-            return b64decode(body_b64).decode("utf-8", errors="ignore")
-
-        except requests.exceptions.HTTPError as e:
-            last_error = e
-            status_code = e.response.status_code if e.response else 0
-            # Retry on 421 (rate limit), 429 (too many requests), 5xx (server errors)
-            if status_code in [421, 429] or status_code >= 500:
-                wait_time = (attempt + 1) * 5  # 5s, 10s, 15s
-                logger.warning(f"  ⚠️ Zyte API error {status_code}, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                continue
-            raise  # Don't retry on 4xx errors (except 421, 429)
-        except Exception as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 5
-                logger.warning(f"  ⚠️ Zyte API error: {e}, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                continue
-            raise
-
-    raise last_error or RuntimeError(f"Failed to fetch {url} after {max_retries} attempts")
+def zyte_fetch(url: str, timeout: int = 30) -> bytes:
+    """Fetch URL via Zyte API, bypassing Cloudflare. Retries are handled by the shared client."""
+    body = get_zyte_client().fetch(url, timeout=timeout)
+    archive_fetch(url, body)
+    return body
 
 
 # ============================================================================
@@ -254,10 +288,11 @@ def calculate_fingerprint(
     return hashlib.md5(fingerprint_str.encode()).hexdigest()
 
 
-def detect_broker_from_html(soup: BeautifulSoup) -> Tuple[bool, int]:
+def detect_broker_from_html(listing: ParsedListing) -> Tuple[bool, int, List[str]]:
     """
     Detect if listing is from broker based on HTML content.
-    Returns (is_broker, score) where score is negative for broker, positive for owner.
+    Returns (is_broker, score, signals) where score is negative for broker,
+    positive for owner, and signals lists what matched.
 
     Looks for:
     - VIP partneris badge
@@ -265,59 +300,57 @@ def detect_broker_from_html(soup: BeautifulSoup) -> Tuple[bool, int]:
     - TOP brokeris badges
     - Company websites
     - Identity verification badges
-    """
-    # Get full page text for pattern matching
-    page_text = soup.get_text(" ", strip=True).lower()
 
+    All text signals (broker/owner phrases and phone numbers) are found in one
+    scan of the page text with `_SIGNAL_RE`.
+    """
     score = 0
     broker_signals = []
     owner_signals = []
 
+    # One pass over the visible text: each phrase counts once, phones are collected
+    seen = set()
+    unique_phones = set()
+    for match in _SIGNAL_RE.finditer(_NODE_SEP.join(listing.text_nodes).lower()):
+        group = match.lastgroup
+        if group == "phone":
+            normalized = re.sub(r"\D", "", match.group())[-8:]  # Last 8 digits
+            if len(normalized) == 8:
+                unique_phones.add(normalized)
+        else:
+            seen.add(group)
+
     # Check for broker patterns in page text
-    for pattern in BROKER_HTML_PATTERNS:
-        if re.search(pattern, page_text, re.IGNORECASE):
+    for i, pattern in enumerate(BROKER_HTML_PATTERNS):
+        if f"broker{i}" in seen:
             score -= 30
             broker_signals.append(pattern)
 
     # Check for owner patterns
-    for pattern in OWNER_HTML_PATTERNS:
-        if re.search(pattern, page_text, re.IGNORECASE):
+    for i, pattern in enumerate(OWNER_HTML_PATTERNS):
+        if f"owner{i}" in seen:
             score += 25
             owner_signals.append(pattern)
 
     # Check for VIP partner section (very strong broker signal)
-    vip_section = soup.select_one(".vip-partner, [class*='vip-partner'], [class*='vip_partner']")
-    if vip_section:
+    if listing.has_vip_section:
         score -= 50
         broker_signals.append("vip_section_element")
 
     # Check for broker company links (rebaltic.lt, ntbroker.lt, etc.)
-    external_links = soup.find_all("a", href=re.compile(r"https?://(?!www\.aruodas)"))
-    for link in external_links:
-        href = link.get("href", "").lower()
-        if any(kw in href for kw in ["rebaltic", "ntbroker", "realtor", "agentura", "broker"]):
+    for link in listing.external_links:
+        if _BROKER_LINK_RE.search(link):
             score -= 40
-            broker_signals.append(f"company_link:{href[:50]}")
+            broker_signals.append(f"company_link:{link.lower()[:50]}")
 
-    # Check for multiple UNIQUE phone numbers (brokers often have office + mobile)
-    # Lithuanian mobile: +370 6XX XXXXX or 86XXXXXXX
-    # Lithuanian landline: +370 5XX XXXXX or 85XXXXXXX
-    phone_pattern = re.compile(r"\+370\s*[56]\d{2}\s*\d{5}|(?<!\d)8[56]\d{7}(?!\d)")
-    phone_elements = soup.find_all(string=phone_pattern)
-    unique_phones = set()
-    for elem in phone_elements:
-        matches = phone_pattern.findall(str(elem))
-        for match in matches:
-            normalized = re.sub(r"\D", "", match)[-8:]  # Last 8 digits
-            if len(normalized) == 8:
-                unique_phones.add(normalized)
+    # Multiple UNIQUE phone numbers (brokers often have office + mobile)
     if len(unique_phones) >= 3:  # 3+ different phone numbers = likely broker/agency
         score -= 25
         broker_signals.append(f"multiple_phones:{len(unique_phones)}")
 
     is_broker = score < 0
 
-    return is_broker, score
+    return is_broker, score, broker_signals + owner_signals
 
 
 def parse_lithuanian_date(text: str) -> Optional[datetime]:
@@ -382,7 +415,7 @@ def scrape_list_page(page: int) -> List[ListingBasic]:
 
     try:
         html = zyte_fetch(url)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, "html.parser", from_encoding="utf-8")
 
         listings = []
         seen_ids = set()
@@ -472,22 +505,52 @@ def scrape_list_page(page: int) -> List[ListingBasic]:
         return []
 
 
-def scrape_all_list_pages(max_pages: int = MAX_PAGES) -> List[ListingBasic]:
-    """Scrape all list pages until empty or max reached."""
-    all_listings = []
-
-    for page in range(1, max_pages + 1):
-        listings = scrape_list_page(page)
-
-        if not listings:
-            logger.info(f"No more listings found after page {page - 1}")
-            break
-
-        all_listings.extend(listings)
+def crawl_listings(
+    max_pages: int = MAX_PAGES,
+    known_ids: Optional[set] = None,
+    concurrency: int = CRAWL_CONCURRENCY,
+    rate_per_sec: float = CRAWL_RATE_PER_SEC,
+    journal: Optional[RunJournal] = None,
+) -> Tuple[List[ListingBasic], Dict[int, Optional[ListingFull]]]:
+    """
+    Scrape list pages concurrently until empty or max reached. With known_ids,
+    the detail page of every listing NOT in known_ids is scraped too, starting
+    as soon as its list page arrives. With a journal, pages and detail pages it
+    already holds are not fetched again, and new ones are recorded in it.
+    Returns (listings, {listing_id: ListingFull or None if the scrape failed}).
+    """
+    def detail_key(basic: ListingBasic) -> Optional[int]:
+        if known_ids is None or basic.listing_id in known_ids:
+            return None
+        return basic.listing_id
+
+    resume_kwargs = {}
+    if journal is not None:
+        resume_kwargs = {
+            "done_pages": {
+                page: [ListingBasic(**item) for item in items] for page, items in journal.pages.items()
+            },
+            "done_details": {
+                listing_id: listing_full_from_dict(item) for listing_id, item in journal.details.items()
+            },
+            "on_page": lambda page, items: journal.record_page(page, [asdict(l) for l in items]),
+            "on_detail": lambda listing_id, full: journal.record_detail(listing_id, listing_full_to_dict(full)),
+        }
 
-        # Small delay to be nice
-        import time
-        time.sleep(0.5)
+    try:
+        result = run_crawl(
+            scrape_list_page,
+            lambda basic: scrape_detail_page(basic.url),
+            detail_key,
+            max_pages,
+            concurrency=concurrency,
+            rate_per_sec=rate_per_sec,
+            **resume_kwargs,
+        )
+    finally:
+        if journal is not None:
+            journal.flush()
+    all_listings = result.items
 
     # Log price extraction stats
     with_price = sum(1 for l in all_listings if l.price is not None)
@@ -498,35 +561,18 @@ def scrape_all_list_pages(max_pages: int = MAX_PAGES) -> List[ListingBasic]:
     if without_price and len(without_price) <= 10:
         logger.warning(f"  Listings without prices: {[l.listing_id for l in without_price]}")
 
-    return all_listings
+    return all_listings, result.details
+
+
+def scrape_all_list_pages(max_pages: int = MAX_PAGES) -> List[ListingBasic]:
+    """Scrape all list pages until empty or max reached."""
+    return crawl_listings(max_pages)[0]
 
 
 # ============================================================================
 # DETAIL PAGE SCRAPER
 # ============================================================================
 
-def parse_dl_block(dl) -> Dict[str, List[str]]:
-    """Extract <dt>/<dd> pairs from a <dl> block."""
-    out = {}
-    if not dl:
-        return out
-
-    for dt in dl.find_all("dt"):
-        key = dt.get_text(strip=True).rstrip(":")
-        dd = dt.find_next_sibling("dd")
-        if not dd:
-            continue
-
-        spans = [s.get_text(strip=True) for s in dd.find_all("span") if s.get_text(strip=True)]
-        if spans:
-            out[key] = spans
-        else:
-            text = dd.get_text(strip=True)
-            out[key] = [text] if text else []
-
-    return out
-
-
 def scrape_detail_page(url: str) -> Optional[ListingFull]:
     """Scrape full listing details from detail page."""
     listing_id = extract_listing_id(url)
@@ -538,32 +584,25 @@ def scrape_detail_page(url: str) -> Optional[ListingFull]:
 
     try:
         html = zyte_fetch(url)
-        soup = BeautifulSoup(html, "html.parser")
-
-        # Parse main details block
-        details = parse_dl_block(soup.find("dl", class_="obj-details"))
-
-        # Parse stats block
-        stats_div = soup.find("div", class_="obj-stats")
-        if stats_div:
-            stats = parse_dl_block(stats_div.find("dl"))
-            details.update(stats)
-
-        # Extract location from title
-        h1 = soup.select_one("h1.obj-header-text")
-        district, street = None, None
-        if h1:
-            txt = h1.get_text(" ", strip=True)
-            parts = [p.strip(" ,") for p in txt.split(",") if p.strip(" ,")]
-            if len(parts) >= 2:
-                district = parts[1]
-            if len(parts) >= 3:
-                street = parts[2]
-
-        # Helper to get first value
-        def first(key: str) -> Optional[str]:
-            vals = details.get(key, [])
-            return vals[0] if vals else None
+    except Exception as e:
+        logger.error(f"Error scraping detail page {url}: {e}")
+        return None
+
+    return parse_detail_page(html, url)
+
+
+def parse_detail_page(html: Union[str, bytes], url: str) -> Optional[ListingFull]:
+    """Parse a detail page's HTML (live or from the HTML archive) into a ListingFull."""
+    listing_id = extract_listing_id(url)
+    if not listing_id:
+        logger.warning(f"Could not extract listing ID from {url}")
+        return None
+
+    try:
+        parsed = parse_listing(html, url)
+        details = parsed.details
+        district, street = parsed.district, parsed.street
+        first = parsed.first
 
         # Parse fields
         price = parse_int(first("Kaina mėn.") or first("Kaina"))
@@ -596,35 +635,12 @@ def scrape_detail_page(url: str) -> Optional[ListingFull]:
         saves_text = first("Įsiminė")
         saves_count = parse_int(saves_text) if saves_text else None
 
-        # Extract phone
-        phone_elem = soup.select_one(".phone-show, .phone-nr, [class*='phone']")
-        phone = phone_elem.get_text(strip=True) if phone_elem else None
-        phone_normalized = normalize_phone(phone)
+        phone_normalized = normalize_phone(parsed.phone)
 
         # Broker detection from HTML content
-        is_broker, broker_score = detect_broker_from_html(soup)
-
-        # Extract description text
-        desc_elem = soup.find(id="collapsedText") or soup.find(class_="obj-comment")
-        description = desc_elem.get_text(strip=True) if desc_elem else None
-
-        # Extract full-size image URLs from CDN (object_62_ = full, object_63_ = thumbnail)
-        # Get from <a href> links which have full-size versions
-        image_urls = []
-        for a in soup.find_all('a', href=True):
-            href = a.get('href', '')
-            if 'aruodas-img.dgn.lt/object_62_' in href:
-                if href not in image_urls:
-                    image_urls.append(href)
-
-        # Fallback to img src if no links found, converting to full-size
-        if not image_urls:
-            for img in soup.find_all('img'):
-                src = img.get('src', '')
-                if 'aruodas-img.dgn.lt/object' in src:
-                    full_src = src.replace('object_63_', 'object_62_')
-                    if full_src not in image_urls:
-                        image_urls.append(full_src)
+        is_broker, broker_score, broker_signals = detect_broker_from_html(parsed)
+        if broker_signals:
+            logger.debug(f"  Broker signals for {listing_id}: {broker_signals}")
 
         # Build raw features for ML
         raw_features = {
@@ -641,8 +657,8 @@ def scrape_detail_page(url: str) -> Optional[ListingFull]:
             "additional_rooms": details.get("Papildomos patalpos", []),
             "building_type": first("Pastato tipas"),
             "condition": first("Įrengimas"),
-            "description": description,
-            "image_urls": image_urls,
+            "description": parsed.description,
+            "image_urls": parsed.image_urls,
         }
 
         # Calculate fingerprint
@@ -676,7 +692,7 @@ def scrape_detail_page(url: str) -> Optional[ListingFull]:
         )
 
     except Exception as e:
-        logger.error(f"Error scraping detail page {url}: {e}")
+        logger.error(f"Error parsing detail page {url}: {e}")
         return None
 
 
@@ -719,65 +735,105 @@ def paginated_query(supabase: Client, table: str, select: str, filters: dict = N
     return all_data
 
 
-def get_active_listing_ids(supabase: Client) -> set:
-    """Get all currently active listing IDs from database."""
-    data = paginated_query(
-        supabase,
-        "listing_lifecycle",
-        "listing_id",
-        filters={"eq": {"status": "ACTIVE"}}
-    )
-    return {row["listing_id"] for row in data}
-
-
-def get_all_listing_ids(supabase: Client) -> set:
-    """Get ALL listing IDs from database (any status)."""
-    data = paginated_query(supabase, "listing_lifecycle", "listing_id")
-    return {row["listing_id"] for row in data}
-
-
-def get_listing_prices(supabase: Client) -> Dict[int, int]:
-    """Get last known prices for active listings."""
-    data = paginated_query(
-        supabase,
-        "listing_lifecycle",
-        "listing_id, last_price",
-        filters={"eq": {"status": "ACTIVE"}}
-    )
-    return {row["listing_id"]: row["last_price"] for row in data}
-
+@dataclass
+class DbState:
+    """In-memory view of listing_lifecycle for one run (see `load_db_state`)."""
+    all_ids: set  # ALL listings ever tracked
+    active_ids: set  # Only ACTIVE ones
+    prices: Dict[int, Optional[int]]  # Last known price of active listings
+    phone_counts: Dict[str, int]  # Phone -> number of active listings
+    ended_ids: set  # status ENDED
+    fingerprints: Dict[str, int]  # Fingerprint -> first (lowest) listing_id, for repost detection
+    chains: Dict[int, str]  # listing_id -> repost_chain_id, where set
+    urls: Dict[int, str]
+    last_seen: Dict[int, Optional[str]]  # last_seen_at of active listings
+
+
+def _keyset_range(supabase: Client, select: str, after_id: int, last_id: int, page_size: int) -> list:
+    """Rows with after_id < listing_id <= last_id, paged by listing_id (no OFFSET scans)."""
+    rows = []
+    while True:
+        result = supabase.table("listing_lifecycle") \
+            .select(select) \
+            .gt("listing_id", after_id) \
+            .lte("listing_id", last_id) \
+            .order("listing_id") \
+            .limit(page_size) \
+            .execute()
+        rows.extend(result.data)
+        if len(result.data) < page_size:
+            return rows
+        after_id = result.data[-1]["listing_id"]
 
-def get_fingerprints(supabase: Client) -> Dict[str, int]:
-    """Get fingerprint -> listing_id mapping for repost detection."""
-    data = paginated_query(
-        supabase,
-        "listing_lifecycle",
-        "listing_id, fingerprint_hash",
-        filters={"not_null": ["fingerprint_hash"]}
-    )
-    return {row["fingerprint_hash"]: row["listing_id"] for row in data}
 
+def _listing_id_bound(supabase: Client, desc: bool) -> Optional[int]:
+    result = supabase.table("listing_lifecycle") \
+        .select("listing_id") \
+        .order("listing_id", desc=desc) \
+        .limit(1) \
+        .execute()
+    return result.data[0]["listing_id"] if result.data else None
 
-def get_phone_counts(supabase: Client) -> Dict[str, int]:
-    """Get phone number -> count of active listings."""
-    data = paginated_query(
-        supabase,
-        "listing_lifecycle",
-        "phone_normalized",
-        filters={"eq": {"status": "ACTIVE"}, "not_null": ["phone_normalized"]}
-    )
 
-    counts = {}
-    for row in data:
+def load_db_state(
+    supabase: Client,
+    workers: int = STATE_LOAD_WORKERS,
+    page_size: int = STATE_PAGE_SIZE,
+) -> DbState:
+    """
+    Load listing_lifecycle ONCE (STATE_COLUMNS only) and build every map the
+    run needs. The listing_id range is split into slices that are read
+    concurrently, each with keyset pagination on listing_id.
+    """
+    lo = _listing_id_bound(supabase, desc=False)
+    hi = _listing_id_bound(supabase, desc=True)
+    rows = []
+    if lo is not None:
+        n_slices = max(1, workers * 4)  # More slices than workers evens out dense id ranges
+        step = max(1, -(-(hi - lo + 1) // n_slices))
+        bounds = [(start - 1, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for chunk in pool.map(lambda b: _keyset_range(supabase, STATE_COLUMNS, b[0], b[1], page_size), bounds):
+                rows.extend(chunk)
+
+    state = DbState(set(), set(), {}, {}, set(), {}, {}, {}, {})
+    for row in rows:  # In listing_id order
+        listing_id = row["listing_id"]
+        state.all_ids.add(listing_id)
+        state.urls[listing_id] = row["url"]
+        if row["fingerprint_hash"]:
+            state.fingerprints.setdefault(row["fingerprint_hash"], listing_id)
+        if row["repost_chain_id"]:
+            state.chains[listing_id] = row["repost_chain_id"]
+        if row["status"] == "ENDED":
+            state.ended_ids.add(listing_id)
+        if row["status"] != "ACTIVE":
+            continue
+        state.active_ids.add(listing_id)
+        state.prices[listing_id] = row["last_price"]
+        state.last_seen[listing_id] = row["last_seen_at"]
         phone = row["phone_normalized"]
-        counts[phone] = counts.get(phone, 0) + 1
-
-    return counts
-
-
-def insert_snapshot(supabase: Client, listing: ListingFull) -> None:
-    """Insert a snapshot record."""
-    data = {
+        if phone:
+            state.phone_counts[phone] = state.phone_counts.get(phone, 0) + 1
+    return state
+
+
+def fetch_lifecycle_rows(supabase: Client, listing_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Full lifecycle rows for a set of listings, via chunked `in_` filters."""
+    ids = sorted(listing_ids)
+    rows = {}
+    for start in range(0, len(ids), IN_FILTER_CHUNK):
+        result = supabase.table("listing_lifecycle") \
+            .select("*") \
+            .in_("listing_id", ids[start:start + IN_FILTER_CHUNK]) \
+            .execute()
+        rows.update((row["listing_id"], row) for row in result.data)
+    return rows
+
+
+def snapshot_row(listing: ListingFull) -> Dict[str, Any]:
+    """listing_snapshots row for today's scrape of a listing."""
+    return {
         "listing_id": listing.listing_id,
         "snapshot_date": date.today().isoformat(),
         "url": listing.url,
@@ -803,16 +859,14 @@ def insert_snapshot(supabase: Client, listing: ListingFull) -> None:
         "raw_features": listing.raw_features,
     }
 
-    # Upsert (update if exists for same date)
-    supabase.table("listing_snapshots").upsert(
-        data,
-        on_conflict="listing_id,snapshot_date"
-    ).execute()
 
-
-def create_lifecycle(supabase: Client, listing: ListingFull, is_multi_listing: bool = False) -> None:
-    """Create new lifecycle record."""
-    data = {
+def lifecycle_row(
+    listing: ListingFull,
+    is_multi_listing: bool = False,
+    repost: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """New listing_lifecycle row. `repost` holds the fields from `RepostIndex.link` for a repost."""
+    row = {
         "listing_id": listing.listing_id,
         "url": listing.url,
         "first_seen_at": datetime.now().isoformat(),
@@ -834,91 +888,93 @@ def create_lifecycle(supabase: Client, listing: ListingFull, is_multi_listing: b
         "year_built": listing.year_built,
         "max_views": listing.views_total or 0,
         "max_saves": listing.saves_count or 0,
+        # Always present so every row in a multi-row upsert has the same keys
+        "repost_chain_id": None,
+        "is_repost": False,
+        "original_listing_id": None,
     }
+    if repost:
+        row.update(repost)
+    return row
 
-    supabase.table("listing_lifecycle").insert(data).execute()
-
-
-def update_lifecycle_seen(
-    supabase: Client,
-    listing_id: int,
-    price: Optional[int] = None,
-    views: Optional[int] = None,
-    saves: Optional[int] = None
-) -> None:
-    """Update lifecycle: mark as seen today, optionally update price."""
-    updates = {
-        "last_seen_at": datetime.now().isoformat(),
-        "consecutive_missing_days": 0,
-    }
-
-    if views:
-        # Use raw SQL for GREATEST
-        pass  # Will handle in main logic
-
-    supabase.table("listing_lifecycle").update(updates).eq("listing_id", listing_id).execute()
-
-
-def update_lifecycle_price_change(
-    supabase: Client,
-    listing_id: int,
-    old_price: int,
-    new_price: int
-) -> None:
-    """Record a price change."""
-    # Get current price history
-    result = supabase.table("listing_lifecycle") \
-        .select("price_history, price_changes") \
-        .eq("listing_id", listing_id) \
-        .execute()
-
-    if not result.data:
-        return
-
-    row = result.data[0]
-    history = json.loads(row["price_history"]) if row["price_history"] else []
-    history.append({"date": date.today().isoformat(), "price": new_price})
-
-    supabase.table("listing_lifecycle").update({
-        "last_price": new_price,
-        "price_changes": row["price_changes"] + 1,
-        "price_history": json.dumps(history),
-        "last_seen_at": datetime.now().isoformat(),
-        "consecutive_missing_days": 0,
-    }).eq("listing_id", listing_id).execute()
-
-
-def mark_lifecycle_missing(supabase: Client, listing_id: int) -> int:
-    """Increment missing days counter, return new count."""
-    result = supabase.table("listing_lifecycle") \
-        .select("consecutive_missing_days") \
-        .eq("listing_id", listing_id) \
-        .execute()
-
-    if not result.data:
-        return 0
-
-    new_count = result.data[0]["consecutive_missing_days"] + 1
-
-    supabase.table("listing_lifecycle").update({
-        "consecutive_missing_days": new_count,
-    }).eq("listing_id", listing_id).execute()
 
-    return new_count
+class BufferedWriter:
+    """
+    Buffers rows and writes them as chunked multi-row upserts
+    (WRITE_CHUNK_SIZE rows per request) instead of one request per row.
+
+    Rows are grouped by table and column set, since every row of a multi-row
+    upsert must have the same keys. Partial updates (`partial=True`, e.g. a
+    repost chain id for an original listing) must never be overwritten by a
+    full row of the same listing:
+    - if that listing's full row is still buffered, the update is merged
+      into it (when it only touches columns the full row has)
+    - otherwise it is queued and flushed after every full-row group
+
+    Use as a context manager: the final flush runs on exit, also when the
+    run fails. A failed chunk is logged with its listing ids and skipped;
+    the other chunks are still written.
+    """
 
+    def __init__(self, supabase: Client, chunk_size: int = WRITE_CHUNK_SIZE):
+        self.supabase = supabase
+        self.chunk_size = chunk_size
+        self._buffers: Dict[Tuple[bool, str, str, Tuple[str, ...]], List[Dict[str, Any]]] = {}
+        self._full_rows: Dict[Tuple[str, Any], Dict[str, Any]] = {}  # (table, listing_id) -> buffered full row
+        self.written: Dict[str, int] = {}
+        self.failed_ids: Dict[str, List[int]] = {}
+        self.requests = 0
 
-def end_lifecycle(supabase: Client, listing_id: int, outcome: str) -> None:
-    """Mark lifecycle as ended with outcome."""
-    # Get lifecycle data
-    result = supabase.table("listing_lifecycle") \
-        .select("first_seen_at, last_price, initial_price, max_views, max_saves") \
-        .eq("listing_id", listing_id) \
-        .execute()
+    def __enter__(self) -> "BufferedWriter":
+        return self
 
-    if not result.data:
-        return
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
 
-    row = result.data[0]
+    def add(self, table: str, row: Dict[str, Any], on_conflict: str, partial: bool = False) -> None:
+        """Queue a row; everything is flushed once any group holds a full chunk."""
+        key = (table, row.get("listing_id"))
+        if partial:
+            full_row = self._full_rows.get(key)
+            if full_row is not None and row.keys() <= full_row.keys():
+                full_row.update(row)
+                return
+        else:
+            self._full_rows[key] = row
+        buffer = self._buffers.setdefault((partial, table, on_conflict, tuple(sorted(row))), [])
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every buffered row: full-row groups first, then partial updates."""
+        groups = sorted(self._buffers.items(), key=lambda item: item[0][0])  # Stable: first-use order within each kind
+        self._buffers = {}
+        self._full_rows = {}
+        for (_, table, on_conflict, columns), rows in groups:
+            for start in range(0, len(rows), self.chunk_size):
+                chunk = rows[start:start + self.chunk_size]
+                self.requests += 1
+                try:
+                    self.supabase.table(table).upsert(chunk, on_conflict=on_conflict).execute()
+                    self.written[table] = self.written.get(table, 0) + len(chunk)
+                except Exception as e:
+                    ids = [row.get("listing_id") for row in chunk]
+                    self.failed_ids.setdefault(table, []).extend(ids)
+                    logger.error(f"  ❌ Failed to write {len(chunk)} {table} rows (listing ids {ids}): {e}")
+
+    def summary(self) -> str:
+        parts = [f"{name}: {count} written" for name, count in self.written.items()]
+        parts += [f"{name}: {len(ids)} FAILED" for name, ids in self.failed_ids.items()]
+        return f"{', '.join(parts) or 'nothing written'} in {self.requests} requests"
+
+
+def ended_fields(row: Dict[str, Any], outcome: str) -> Dict[str, Any]:
+    """
+    Lifecycle columns for ending a listing, from its row
+    (first_seen_at, max_views, max_saves).
+    """
     first_seen = datetime.fromisoformat(row["first_seen_at"].replace("Z", "+00:00"))
     days_on_market = (datetime.now() - first_seen.replace(tzinfo=None)).days
 
@@ -937,56 +993,99 @@ def end_lifecycle(supabase: Client, listing_id: int, outcome: str) -> None:
     if row["max_saves"]:
         engagement += min(row["max_saves"] * 2, 30)  # Max 30 points from saves
 
-    supabase.table("listing_lifecycle").update({
+    return {
         "status": "ENDED",
         "ended_at": datetime.now().isoformat(),
         "outcome": outcome,
         "days_on_market": days_on_market,
         "removal_speed": removal_speed,
         "engagement_score": round(engagement, 2),
-    }).eq("listing_id", listing_id).execute()
+    }
 
 
-def check_repost(supabase: Client, fingerprint: str, listing_id: int) -> Optional[int]:
-    """Check if this is a repost of an existing listing."""
-    result = supabase.table("listing_lifecycle") \
-        .select("listing_id, repost_chain_id") \
-        .eq("fingerprint_hash", fingerprint) \
-        .neq("listing_id", listing_id) \
-        .execute()
+def update_where_in(supabase: Client, table: str, updates: Dict[str, Any], listing_ids: Iterable[int]) -> int:
+    """
+    Apply the same update to many listings with chunked `in_` filters
+    (IN_FILTER_CHUNK ids per request). Returns the number of requests made.
+    """
+    ids = sorted(listing_ids)
+    for start in range(0, len(ids), IN_FILTER_CHUNK):
+        supabase.table(table).update(updates).in_("listing_id", ids[start:start + IN_FILTER_CHUNK]).execute()
+    return -(-len(ids) // IN_FILTER_CHUNK)
 
-    if result.data:
-        return result.data[0]["listing_id"]
-    return None
 
+class RepostIndex:
+    """
+    In-memory repost detection: fingerprint -> listing_id and repost chain ids,
+    loaded once per run from DbState and updated as new listings are ingested,
+    so no per-listing queries are needed.
+    """
+
+    def __init__(self, state: DbState):
+        self.by_fingerprint = state.fingerprints
+        self.chains = state.chains
+        self.urls = state.urls
+        self.ended_ids = state.ended_ids
+
+    def find(self, fingerprint: str, listing_id: int) -> Optional[int]:
+        """Check if this is a repost of an existing listing."""
+        original = self.by_fingerprint.get(fingerprint)
+        return original if original != listing_id else None
+
+    def add(self, fingerprint: str, listing_id: int, url: str) -> None:
+        """Record a newly ingested listing (the first listing with a fingerprint stays the original)."""
+        self.by_fingerprint.setdefault(fingerprint, listing_id)
+        self.urls[listing_id] = url
+
+    def link(self, original_listing_id: int) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Link a repost to original listing, assigning the chain id locally.
+        Returns (repost fields for the new listing's row, upsert row for the
+        original or None if it needs no change).
+        """
+        original_update = {
+            "listing_id": original_listing_id,
+            "url": self.urls[original_listing_id],  # NOT NULL, required by the upsert
+        }
 
-def link_repost(supabase: Client, new_listing_id: int, original_listing_id: int) -> None:
-    """Link a repost to original listing."""
-    # Get or create chain ID
-    result = supabase.table("listing_lifecycle") \
-        .select("repost_chain_id") \
-        .eq("listing_id", original_listing_id) \
-        .execute()
+        # Get or create chain ID
+        chain_id = self.chains.get(original_listing_id)
+        if not chain_id:
+            chain_id = str(uuid.uuid4())
+            self.chains[original_listing_id] = chain_id
+            original_update["repost_chain_id"] = chain_id
 
-    if result.data and result.data[0]["repost_chain_id"]:
-        chain_id = result.data[0]["repost_chain_id"]
-    else:
-        chain_id = str(uuid.uuid4())
-        supabase.table("listing_lifecycle").update({
+        # Mark original as reposted (not rented)
+        if original_listing_id in self.ended_ids:
+            original_update["outcome"] = "REPOSTED"
+
+        # Link new listing
+        repost = {
             "repost_chain_id": chain_id,
-        }).eq("listing_id", original_listing_id).execute()
+            "is_repost": True,
+            "original_listing_id": original_listing_id,
+        }
+        return repost, original_update if len(original_update) > 2 else None
 
-    # Link new listing
-    supabase.table("listing_lifecycle").update({
-        "repost_chain_id": chain_id,
-        "is_repost": True,
-        "original_listing_id": original_listing_id,
-    }).eq("listing_id", new_listing_id).execute()
 
-    # Mark original as reposted (not rented)
-    supabase.table("listing_lifecycle").update({
-        "outcome": "REPOSTED",
-    }).eq("listing_id", original_listing_id).eq("status", "ENDED").execute()
+def buffer_new_listing(writer: "BufferedWriter", reposts: RepostIndex, full: ListingFull, is_multi: bool) -> None:
+    """
+    Buffer a NEW listing's snapshot and lifecycle rows. A repost is detected
+    in memory and linked to its original; the original's chain update is a
+    partial upsert written with the batch.
+    """
+    repost = None
+    if full.fingerprint_hash:
+        original = reposts.find(full.fingerprint_hash, full.listing_id)
+        if original:
+            logger.info(f"  🔄 Detected repost: {full.listing_id} is repost of {original}")
+            repost, original_update = reposts.link(original)
+            if original_update:
+                writer.add("listing_lifecycle", original_update, on_conflict=LIFECYCLE_CONFLICT, partial=True)
+        reposts.add(full.fingerprint_hash, full.listing_id, full.url)
+
+    writer.add("listing_snapshots", snapshot_row(full), on_conflict=SNAPSHOT_CONFLICT)
+    writer.add("listing_lifecycle", lifecycle_row(full, is_multi, repost), on_conflict=LIFECYCLE_CONFLICT)
 
 
 # ============================================================================
@@ -1068,26 +1167,15 @@ def calculate_confidence(
     return round(score, 3), tier, signals
 
 
-def promote_to_verified(supabase: Client, listing_id: int) -> bool:
-    """Check if ended listing qualifies for verified_prices table."""
-    # Get lifecycle data
-    result = supabase.table("listing_lifecycle") \
-        .select("*") \
-        .eq("listing_id", listing_id) \
-        .execute()
-
-    if not result.data:
-        return False
-
-    row = result.data[0]
-
+def verified_price_row(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """verified_prices row for an ended lifecycle row, or None if it does not qualify."""
     # Skip if not ended
     if row["status"] != "ENDED":
-        return False
+        return None
 
     # Skip if outcome is bad
     if row["outcome"] in ["REPOSTED", "EXPIRED"]:
-        return False
+        return None
 
     # Calculate confidence
     price_stable = row["price_changes"] == 0
@@ -1102,7 +1190,7 @@ def promote_to_verified(supabase: Client, listing_id: int) -> bool:
 
     # Skip rejected
     if tier == "REJECTED":
-        return False
+        return None
 
     # Build features
     features = {
@@ -1119,9 +1207,8 @@ def promote_to_verified(supabase: Client, listing_id: int) -> bool:
     if row["last_price"] and row["area_m2"] and row["area_m2"] > 0:
         price_per_m2 = round(row["last_price"] / row["area_m2"], 2)
 
-    # Insert into verified_prices
-    data = {
-        "listing_id": listing_id,
+    return {
+        "listing_id": row["listing_id"],
         "verified_price": row["last_price"],
         "verified_price_per_m2": price_per_m2,
         "confidence_score": score,
@@ -1134,57 +1221,80 @@ def promote_to_verified(supabase: Client, listing_id: int) -> bool:
         "eligible_for_training": tier in ["GOLD", "SILVER"],
     }
 
-    try:
-        supabase.table("verified_prices").upsert(
-            data,
-            on_conflict="listing_id"
-        ).execute()
-        logger.info(f"  ✅ Promoted listing {listing_id} to verified ({tier}, score={score})")
-        return True
-    except Exception as e:
-        logger.error(f"  ❌ Failed to promote listing {listing_id}: {e}")
-        return False
-
 
 # ============================================================================
 # MAIN ORCHESTRATION
 # ============================================================================
 
-def run_daily_collection(test_mode: bool = False, bootstrap: bool = False):
+def run_daily_collection(
+    test_mode: bool = False,
+    bootstrap: bool = False,
+    concurrency: int = CRAWL_CONCURRENCY,
+    rate_per_sec: float = CRAWL_RATE_PER_SEC,
+    resume: bool = False,
+):
+    """
+    Main daily collection job, journaled in collector_runs. With resume=True
+    it continues today's unfinished run of the same mode, if there is one.
     """
-    Main daily collection job.
+    mode = "test" if test_mode else "bootstrap" if bootstrap else "daily"
+    logger.info("=" * 60)
+    logger.info("VERIFIED PRICE COLLECTOR - Daily Run")
+    logger.info(f"Mode: {mode.upper()}{' (resume)' if resume else ''}")
+    logger.info("=" * 60)
+
+    supabase = get_supabase()
+    journal = RunJournal.open(supabase, mode, resume=resume)
+    try:
+        stats = collect(supabase, journal, test_mode, bootstrap, concurrency, rate_per_sec)
+    except BaseException as e:  # Including KeyboardInterrupt: the run stays resumable either way
+        journal.finish("FAILED", error=f"{type(e).__name__}: {e}")
+        raise
+    journal.finish("COMPLETED", stats=stats)
+
+
+def collect(
+    supabase: Client,
+    journal: RunJournal,
+    test_mode: bool = False,
+    bootstrap: bool = False,
+    concurrency: int = CRAWL_CONCURRENCY,
+    rate_per_sec: float = CRAWL_RATE_PER_SEC,
+) -> Dict[str, int]:
+    """
+    One collection run. Work recorded in the journal by an earlier attempt
+    (crawled pages, detail pages, step 5) is not repeated.
 
     Steps:
-    1. Scrape list view to get all current listing IDs
+    1. Scrape list view to get all current listing IDs (detail pages of
+       listings not in the database are scraped concurrently as they appear)
     2. Compare with database: find NEW, MISSING, CHANGED
-    3. For NEW: scrape detail page, create lifecycle
+    3. For NEW: create lifecycle from the scraped detail page
     4. For MISSING: increment counter, maybe mark as ENDED
     5. For CHANGED (price): scrape detail page, update
     6. Promote ended listings to verified_prices
     """
-    logger.info("=" * 60)
-    logger.info("VERIFIED PRICE COLLECTOR - Daily Run")
-    logger.info(f"Mode: {'TEST' if test_mode else 'BOOTSTRAP' if bootstrap else 'DAILY'}")
-    logger.info("=" * 60)
-
-    supabase = get_supabase()
+    # Step 2 is loaded first: the crawl needs db_all_ids to know which detail pages to fetch
+    logger.info("\n🗃️ Step 2: Loading database state")
+    state = load_db_state(supabase)
+    db_all_ids = state.all_ids  # ALL listings ever tracked
 
-    # Step 1: Scrape list view
+    # Step 1: Scrape list view (and NEW listings' detail pages as they are found)
     max_pages = 5 if test_mode else (MAX_PAGES if bootstrap else 70)
-    logger.info(f"\n📋 Step 1: Scraping list view (max {max_pages} pages)")
+    logger.info(f"\n📋 Step 1: Scraping list view (max {max_pages} pages, concurrency {concurrency}, {rate_per_sec} req/s)")
 
-    current_listings = scrape_all_list_pages(max_pages)
+    current_listings, new_details = crawl_listings(
+        max_pages, known_ids=db_all_ids, concurrency=concurrency, rate_per_sec=rate_per_sec, journal=journal
+    )
     current_ids = {l.listing_id for l in current_listings}
     current_by_id = {l.listing_id: l for l in current_listings}
 
     logger.info(f"  Found {len(current_ids)} listings on aruodas")
 
-    # Step 2: Get database state
-    logger.info("\n🗃️ Step 2: Loading database state")
-    db_all_ids = get_all_listing_ids(supabase)  # ALL listings ever tracked
-    db_active_ids = get_active_listing_ids(supabase)  # Only ACTIVE ones
-    db_prices = get_listing_prices(supabase)
-    phone_counts = get_phone_counts(supabase)
+    # Step 2: Database state (loaded before the crawl)
+    db_active_ids = state.active_ids  # Only ACTIVE ones
+    db_prices = state.prices
+    phone_counts = state.phone_counts
 
     logger.info(f"  Total in DB: {len(db_all_ids)}")
     logger.info(f"  Active in DB: {len(db_active_ids)}")
@@ -1223,142 +1333,202 @@ def run_daily_collection(test_mode: bool = False, bootstrap: bool = False):
     new_count = 0
 
     skipped_old = 0
-    for listing_id in new_ids:
-        basic = current_by_id[listing_id]
-
-        # Scrape detail page
-        full = scrape_detail_page(basic.url)
-        if not full:
-            continue
-
-        # Filter out old listings (stale/overpriced)
-        if full.date_posted:
-            age_days = (datetime.now() - full.date_posted).days
-            if age_days > MAX_LISTING_AGE_DAYS:
-                skipped_old += 1
-                logger.debug(f"  ⏭️ Skipping old listing {listing_id}: {age_days} days old")
+    reposts = RepostIndex(state)
+    with BufferedWriter(supabase) as writer:
+        for listing_id in new_ids:
+            basic = current_by_id[listing_id]
+
+            # Detail page was scraped during the crawl
+            full = new_details[listing_id] if listing_id in new_details else scrape_detail_page(basic.url)
+            if not full:
                 continue
 
-        # Check for repost
-        if full.fingerprint_hash:
-            original = check_repost(supabase, full.fingerprint_hash, listing_id)
-            if original:
-                logger.info(f"  🔄 Detected repost: {listing_id} is repost of {original}")
-
-        # Check if multi-listing phone
-        is_multi = False
-        if full.phone_normalized:
-            count = phone_counts.get(full.phone_normalized, 0)
-            is_multi = count >= 3
-            phone_counts[full.phone_normalized] = count + 1
-
-        # Insert snapshot
-        insert_snapshot(supabase, full)
+            # Filter out old listings (stale/overpriced)
+            if full.date_posted:
+                age_days = (datetime.now() - full.date_posted).days
+                if age_days > MAX_LISTING_AGE_DAYS:
+                    skipped_old += 1
+                    logger.debug(f"  ⏭️ Skipping old listing {listing_id}: {age_days} days old")
+                    continue
 
-        # Create lifecycle
-        create_lifecycle(supabase, full, is_multi)
+            # Check if multi-listing phone
+            is_multi = False
+            if full.phone_normalized:
+                count = phone_counts.get(full.phone_normalized, 0)
+                is_multi = count >= 3
+                phone_counts[full.phone_normalized] = count + 1
 
-        # Link repost if detected
-        if full.fingerprint_hash:
-            original = check_repost(supabase, full.fingerprint_hash, listing_id)
-            if original:
-                link_repost(supabase, listing_id, original)
+            # Buffer snapshot and lifecycle (written in chunks of WRITE_CHUNK_SIZE)
+            buffer_new_listing(writer, reposts, full, is_multi)
 
-        new_count += 1
+            new_count += 1
 
-        if new_count % 10 == 0:
-            logger.info(f"  Processed {new_count}/{len(new_ids)} new listings")
+            if new_count % 10 == 0:
+                logger.info(f"  Processed {new_count}/{len(new_ids)} new listings")
 
+    failed_new = len(writer.failed_ids.get("listing_lifecycle", []))
+    logger.info(f"  💾 Writes: {writer.summary()}")
+    new_count -= failed_new
     logger.info(f"  ✅ Added {new_count} new listings (skipped {skipped_old} old listings >40 days)")
+    if failed_new:
+        logger.error(f"  ❌ {failed_new} new listings failed to write: {writer.failed_ids['listing_lifecycle']}")
+
+    # Steps 4b-6 are computed in memory and applied as set-based updates
+    # (`in_` filters) and multi-row upserts. Full lifecycle rows are only read
+    # for the listings that need them: MISSING ones and price changes.
+    now_iso = datetime.now().isoformat()
+    changed_ids = {
+        listing_id for listing_id in existing_ids
+        if current_by_id[listing_id].price is not None
+        and db_prices.get(listing_id) is not None
+        and current_by_id[listing_id].price != db_prices[listing_id]
+    }
+    detail_ids = changed_ids if scrape_failed else changed_ids | missing_ids
+    lifecycle_rows = fetch_lifecycle_rows(supabase, detail_ids)
+    db_requests = -(-len(detail_ids) // IN_FILTER_CHUNK)
 
     # Step 4b: Reactivate REAPPEARED listings
     if reappeared_ids:
         logger.info(f"\n🔄 Step 4b: Reactivating {len(reappeared_ids)} reappeared listings")
         reactivated = 0
-        for listing_id in reappeared_ids:
-            try:
-                supabase.table("listing_lifecycle").update({
-                    "status": "ACTIVE",
-                    "consecutive_missing_days": 0,
-                    "last_seen_at": datetime.now().isoformat(),
-                    "ended_at": None
-                }).eq("listing_id", listing_id).execute()
-                reactivated += 1
-            except Exception as e:
-                logger.warning(f"  Failed to reactivate {listing_id}: {e}")
+        try:
+            db_requests += update_where_in(supabase, "listing_lifecycle", {
+                "status": "ACTIVE",
+                "consecutive_missing_days": 0,
+                "last_seen_at": now_iso,
+                "ended_at": None
+            }, reappeared_ids)
+            reactivated = len(reappeared_ids)
+        except Exception as e:
+            logger.warning(f"  Failed to reactivate {sorted(reappeared_ids)}: {e}")
         logger.info(f"  ✅ Reactivated {reactivated} listings")
 
     # Step 5: Process MISSING listings (using calendar days, not scrape count)
+    # Every write is idempotent, so a resumed run can repeat any step: upserts
+    # and `in_` updates set absolute values, consecutive_missing_days is derived
+    # from last_seen_at rather than incremented, and once a price change is
+    # written its last_price matches the list price, so a resumed run detects
+    # no change. The journal only lets a resumed run skip a step 5 that
+    # completed without failed writes.
     ended_count = 0
     if scrape_failed:
         logger.info(f"\n❓ Step 5: SKIPPED - Scrape failure detected, not marking {len(missing_ids)} listings as missing")
+    elif journal.is_done("5"):
+        logger.info("\n❓ Step 5: SKIPPED - Already applied by an earlier attempt of this run")
     else:
         logger.info(f"\n❓ Step 5: Processing {len(missing_ids)} missing listings")
 
-        for listing_id in missing_ids:
-            # Get last_seen_at and calculate calendar days
-            result = supabase.table("listing_lifecycle") \
-                .select("last_seen_at") \
-                .eq("listing_id", listing_id) \
-                .execute()
+        still_missing: Dict[int, List[int]] = {}  # new consecutive_missing_days -> listing ids
+        with BufferedWriter(supabase) as writer:
+            for listing_id in missing_ids:
+                row = lifecycle_rows.get(listing_id)
+                if not row:
+                    continue
+
+                # Calendar days since last seen
+                last_seen = row["last_seen_at"]
+                if last_seen:
+                    last_seen_dt = datetime.fromisoformat(last_seen.replace("Z", "+00:00")).replace(tzinfo=None)
+                    days_since_seen = (datetime.now() - last_seen_dt).days
+                    # Derived, not incremented: re-running the step on the same day writes the same value
+                    missing_days = max((date.today() - last_seen_dt.date()).days, 1)
+                else:
+                    days_since_seen = 999  # Never seen, treat as very old (ends below, so counted once)
+                    missing_days = (row["consecutive_missing_days"] or 0) + 1
+
+                if days_since_seen < MISSING_DAYS_THRESHOLD:
+                    still_missing.setdefault(missing_days, []).append(listing_id)
+                    continue
 
-            if not result.data:
-                continue
-
-            last_seen = result.data[0]["last_seen_at"]
-            if last_seen:
-                last_seen_dt = datetime.fromisoformat(last_seen.replace("Z", "+00:00")).replace(tzinfo=None)
-                days_since_seen = (datetime.now() - last_seen_dt).days
-            else:
-                days_since_seen = 999  # Never seen, treat as very old
-
-            # Increment the counter for tracking (but decision based on calendar days)
-            mark_lifecycle_missing(supabase, listing_id)
-
-            if days_since_seen >= MISSING_DAYS_THRESHOLD:
                 # Mark as ended
-                end_lifecycle(supabase, listing_id, "RENTED_INFERRED")
+                ended = ended_fields(row, "RENTED_INFERRED")
+                row.update(ended, consecutive_missing_days=missing_days)
+                writer.add("listing_lifecycle", {
+                    "listing_id": listing_id,
+                    "url": row["url"],  # NOT NULL, required by the upsert
+                    "consecutive_missing_days": missing_days,
+                    **ended,
+                }, on_conflict=LIFECYCLE_CONFLICT)
 
                 # Try to promote to verified
-                if promote_to_verified(supabase, listing_id):
+                verified = verified_price_row(row)
+                if verified:
+                    writer.add("verified_prices", verified, on_conflict="listing_id")
                     ended_count += 1
-                    logger.info(f"    📤 Listing {listing_id} ended after {days_since_seen} days")
+                    logger.info(f"    📤 Listing {listing_id} ended after {days_since_seen} days ({verified['confidence_tier']})")
+
+            for missing_days, ids in still_missing.items():
+                db_requests += update_where_in(
+                    supabase, "listing_lifecycle", {"consecutive_missing_days": missing_days}, ids
+                )
 
+        db_requests += writer.requests
+        logger.info(f"  💾 Writes: {writer.summary()}")
+        ended_count -= len(writer.failed_ids.get("verified_prices", []))
         logger.info(f"  ✅ Ended {ended_count} listings, promoted to verified")
+        if writer.failed_ids:
+            logger.warning("  ⚠️ Step 5 had failed writes, a resumed run will repeat it")
+        else:
+            journal.mark_done("5")
 
     # Step 6: Check for price changes in EXISTING
     logger.info(f"\n💰 Step 6: Checking price changes in {len(existing_ids)} existing listings")
     changed_count = 0
     skipped_no_list_price = 0
     skipped_no_db_price = 0
+    seen_ids = []
 
-    for listing_id in existing_ids:
-        basic = current_by_id[listing_id]
-        old_price = db_prices.get(listing_id)
+    with BufferedWriter(supabase) as writer:
+        for listing_id in existing_ids:
+            basic = current_by_id[listing_id]
+            old_price = db_prices.get(listing_id)
 
-        # Skip if no price info
-        if basic.price is None:
-            skipped_no_list_price += 1
-            update_lifecycle_seen(supabase, listing_id)
-            continue
-        if old_price is None:
-            skipped_no_db_price += 1
-            update_lifecycle_seen(supabase, listing_id)
-            continue
+            # Skip if no price info
+            if basic.price is None:
+                skipped_no_list_price += 1
+                seen_ids.append(listing_id)
+                continue
+            if old_price is None:
+                skipped_no_db_price += 1
+                seen_ids.append(listing_id)
+                continue
 
-        # Check for price change
-        if basic.price != old_price:
-            logger.info(f"  💸 Price change: {listing_id} €{old_price} → €{basic.price}")
-            update_lifecycle_price_change(supabase, listing_id, old_price, basic.price)
-            changed_count += 1
-        else:
-            update_lifecycle_seen(supabase, listing_id)
+            # Check for price change
+            row = lifecycle_rows.get(listing_id)
+            if basic.price != old_price and row:
+                logger.info(f"  💸 Price change: {listing_id} €{old_price} → €{basic.price}")
+                history = row["price_history"] or []
+                if isinstance(history, str):
+                    history = json.loads(history)
+                history.append({"date": date.today().isoformat(), "price": basic.price})
+                writer.add("listing_lifecycle", {
+                    "listing_id": listing_id,
+                    "url": row["url"],  # NOT NULL, required by the upsert
+                    "last_price": basic.price,
+                    "price_changes": (row["price_changes"] or 0) + 1,
+                    "price_history": json.dumps(history),
+                    "last_seen_at": now_iso,
+                    "consecutive_missing_days": 0,
+                }, on_conflict=LIFECYCLE_CONFLICT)
+                changed_count += 1
+            else:
+                seen_ids.append(listing_id)
+
+        # Everything else was simply seen today
+        db_requests += update_where_in(
+            supabase, "listing_lifecycle", {"last_seen_at": now_iso, "consecutive_missing_days": 0}, seen_ids
+        )
+
+    db_requests += writer.requests
+    if writer.failed_ids:
+        logger.error(f"  ❌ Price changes failed to write: {writer.summary()}")
 
     logger.info(f"  ✅ Found {changed_count} price changes")
     if skipped_no_list_price > 0:
         logger.warning(f"  ⚠️ Skipped {skipped_no_list_price} listings (no price in list view)")
     if skipped_no_db_price > 0:
         logger.warning(f"  ⚠️ Skipped {skipped_no_db_price} listings (no price in database)")
+    logger.info(f"  💾 Reconciliation (steps 4b-6): {db_requests} database requests")
 
     # Summary
     logger.info("\n" + "=" * 60)
@@ -1376,6 +1546,145 @@ def run_daily_collection(test_mode: bool = False, bootstrap: bool = False):
 
     logger.info(f"  Total verified prices: {result.count or 0}")
 
+    return {
+        "listings": len(current_ids),
+        "new": new_count,
+        "ended": ended_count,
+        "price_changes": changed_count,
+        "verified_total": result.count or 0,
+    }
+
+
+# ============================================================================
+# SELF-CHECKS
+# ============================================================================
+
+class _RecordingClient:
+    """Minimal in-memory stand-in for the Supabase client: applies upserts by their conflict key."""
+
+    def __init__(self, tables: Optional[Dict[str, Dict[Any, Dict[str, Any]]]] = None):
+        self.tables = tables or {}
+
+    def table(self, name: str) -> "_RecordingClient":
+        self._table = name
+        return self
+
+    def upsert(self, rows, on_conflict: str) -> "_RecordingClient":
+        self._pending = (rows if isinstance(rows, list) else [rows], on_conflict.split(","))
+        return self
+
+    def execute(self):
+        rows, keys = self._pending
+        table = self.tables.setdefault(self._table, {})
+        for row in rows:
+            table.setdefault(tuple(row[k] for k in keys), {}).update(row)
+
+
+def check_repost_write_order() -> None:
+    """
+    A repost chain id assigned to an original that is itself new in this run
+    must survive the original's full lifecycle row, for any chunk size and
+    also when the first queued row is a partial update for a DB listing.
+    """
+    def listing(listing_id: int, fingerprint: str) -> ListingFull:
+        return ListingFull(
+            listing_id, f"{BASE_DETAIL_URL}/{listing_id}/", 500, None, 40.0, 2, 1, 5, 2000, None, None,
+            None, None, None, None, None, None, False, 0, None, {}, fingerprint,
+        )
+
+    for chunk_size in (500, 2, 3, 4):
+        # DB: listing 1 is ACTIVE with no chain. Run: 10 reposts 1, 20 is new, 30 reposts 20
+        state = DbState({1}, {1}, {1: 500}, {}, set(), {"fp-a": 1}, {}, {1: f"{BASE_DETAIL_URL}/1/"}, {})
+        client = _RecordingClient({"listing_lifecycle": {(1,): {"listing_id": 1, "repost_chain_id": None}}})
+        reposts = RepostIndex(state)
+        with BufferedWriter(client, chunk_size=chunk_size) as writer:
+            for full in (listing(10, "fp-a"), listing(20, "fp-b"), listing(30, "fp-b")):
+                buffer_new_listing(writer, reposts, full, False)
+
+        rows = client.tables["listing_lifecycle"]
+        for original, repost in ((1, 10), (20, 30)):
+            chain = rows[(repost,)]["repost_chain_id"]
+            assert chain and rows[(original,)]["repost_chain_id"] == chain, (
+                f"chunk_size={chunk_size}: original {original} lost repost chain {chain}"
+            )
+    print("✅ Repost chain ids survive the buffered write order")
+
+
+def _detect_broker_bs4(html: str) -> Tuple[bool, int]:
+    """Reference scoring: the original BeautifulSoup implementation of `detect_broker_from_html`."""
+    soup = BeautifulSoup(html, "html.parser")
+    page_text = soup.get_text(" ", strip=True).lower()
+    score = -30 * sum(bool(re.search(p, page_text, re.IGNORECASE)) for p in BROKER_HTML_PATTERNS)
+    score += 25 * sum(bool(re.search(p, page_text, re.IGNORECASE)) for p in OWNER_HTML_PATTERNS)
+    if soup.select_one(".vip-partner, [class*='vip-partner'], [class*='vip_partner']"):
+        score -= 50
+    for link in soup.find_all("a", href=re.compile(r"https?://(?!www\.aruodas)")):
+        if any(kw in link.get("href", "").lower() for kw in BROKER_LINK_KEYWORDS):
+            score -= 40
+    phone_pattern = re.compile(PHONE_HTML_PATTERN)
+    unique_phones = set()
+    for elem in soup.find_all(string=phone_pattern):
+        for match in phone_pattern.findall(str(elem)):
+            normalized = re.sub(r"\D", "", match)[-8:]
+            if len(normalized) == 8:
+                unique_phones.add(normalized)
+    if len(unique_phones) >= 3:
+        score -= 25
+    return score < 0, score
+
+
+def check_broker_detection_parity(pages: int = 2000, seed: int = 0) -> None:
+    """
+    `detect_broker_from_html` must score like the BeautifulSoup reference on
+    pages whose phrases and phone numbers are spread over, or split across,
+    several text nodes.
+    """
+    import random
+
+    rng = random.Random(seed)
+    phrases = ["TOP brokeris", "VIP partneris", "NT brokeris", "Agentūra", "Savininkas",
+               "be tarpininkų", "nuomoju pats", "Šio brokerio skelbimai", "Nekilnojamojo turto brokeris"]
+    links = ['<a href="https://rebaltic.lt/x">site</a>', '<a href="https://www.aruodas.lt/broker">a</a>',
+             '<a href="https://example.com">e</a>']
+
+    def phone() -> str:
+        digits = f"{rng.choice('56')}{rng.randrange(10 ** 7):07d}"
+        return rng.choice([f"+370 {digits[:3]} {digits[3:]}", f"+370{digits}", f"8{digits}"])
+
+    def split(text: str) -> str:
+        # Cut a phrase or number into inline elements (or blocks) at a random point
+        if len(text) < 2 or rng.random() < 0.4:
+            return text
+        cut = rng.randrange(1, len(text))
+        tag = rng.choice(["b", "span", "p"])
+        return f"{text[:cut]}<{tag}>{text[cut:]}</{tag}>"
+
+    for n in range(pages):
+        parts = []
+        for _ in range(rng.randrange(1, 8)):
+            kind = rng.random()
+            if kind < 0.35:
+                parts.append(split(phone()))
+            elif kind < 0.6:
+                # A multi-word phrase with some words in their own elements
+                words = rng.choice(phrases).split()
+                tags = [rng.choice(["p", "b", "span"]) if rng.random() < 0.3 else None for _ in words]
+                parts.append("".join(f"<{t}>{w}</{t}>" if t else f" {w} " for t, w in zip(tags, words)))
+            elif kind < 0.75:
+                parts.append(split(rng.choice(phrases)))
+            elif kind < 0.85:
+                parts.append(rng.choice(links))
+            elif kind < 0.9:
+                parts.append('<div class="vip-partner">VIP</div>')
+            else:
+                parts.append(f"Tel. {rng.randrange(10 ** 9)}")
+        html = "<html><body>" + "".join(f"<div>{p}</div>" for p in parts) + "</body></html>"
+
+        expected = _detect_broker_bs4(html)
+        is_broker, score, _ = detect_broker_from_html(parse_listing(html, f"{BASE_DETAIL_URL}/{n}/"))
+        assert (is_broker, score) == expected, f"page {n}: {(is_broker, score)} != {expected}\n{html}"
+    print(f"✅ Broker detection matches the BeautifulSoup reference on {pages} mixed-node pages")
+
 
 # ============================================================================
 # CLI ENTRY POINT
@@ -1385,9 +1694,24 @@ def main():
     parser = argparse.ArgumentParser(description="Verified Price Collector")
     parser.add_argument("--test", action="store_true", help="Test mode (5 pages only)")
     parser.add_argument("--bootstrap", action="store_true", help="Bootstrap mode (full initial scrape)")
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY, help="In-flight Zyte requests")
+    parser.add_argument("--rate", type=float, default=CRAWL_RATE_PER_SEC, help="Zyte requests per second (0 = no limit)")
+    parser.add_argument("--resume", action="store_true", help="Continue today's unfinished run (from collector_runs)")
+    parser.add_argument("--self-check", action="store_true", help="Run offline consistency checks and exit")
     args = parser.parse_args()
 
-    run_daily_collection(test_mode=args.test, bootstrap=args.bootstrap)
+    if args.self_check:
+        check_repost_write_order()
+        check_broker_detection_parity()
+        return
+
+    run_daily_collection(
+        test_mode=args.test,
+        bootstrap=args.bootstrap,
+        concurrency=args.concurrency,
+        rate_per_sec=args.rate,
+        resume=args.resume,
+    )
 
 
 if __name__ == "__main__":
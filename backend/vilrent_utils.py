@@ -2,9 +2,10 @@ import requests
 import json, ast, re
 import pandas as pd
 from bs4 import BeautifulSoup
-from base64 import b64decode
 import os
 
+from zyte_client import get_zyte_client
+
 
 ## importing model
 BASE = "https://www.aruodas.lt/butu-nuoma/vilniuje/puslapis/{page}/"
@@ -45,29 +46,6 @@ def make_session():
     return sess
 
 
-def parse_dl_block(dl):
-    """
-    Extract <dt>/<dd> pairs from a <dl> block.
-    Returns a dict of {key: [values]}.
-    """
-    out = {}
-    if not dl:
-        return out
-    for dt in dl.find_all("dt"):
-        key = dt.get_text(strip=True).rstrip(":")
-        dd = dt.find_next_sibling("dd")
-        if not dd:
-            continue
-
-        spans = [s.get_text(strip=True) for s in dd.find_all("span") if s.get_text(strip=True)]
-        if spans:
-            out[key] = spans
-        else:
-            text = dd.get_text(strip=True)
-            out[key] = [text] if text else []
-    return out
-
-
 def add_primary_heating_dummies(df, source_col="Šildymas"):
     """
     From df[source_col] (list or JSON-string list of heating types), extract
@@ -180,8 +158,9 @@ def zyte_fetch_html(url, render=False, api_key=None, timeout=30):
     ------
     RuntimeError
         If the API key is not set.
-    requests.exceptions.RequestException
-        If Zyte’s API call fails (network, 4xx, 5xx errors, etc.).
+    httpx.HTTPError
+        If Zyte’s API call fails (network, 4xx, 5xx errors, etc.)
+        after the shared client's retries.
     ValueError
         If Zyte’s response doesn’t contain a valid HTML body.
 
@@ -191,6 +170,7 @@ def zyte_fetch_html(url, render=False, api_key=None, timeout=30):
     - You’re only charged for successful requests, so small failures
       (e.g. 404 or invalid URLs) won’t cost much.
     - For Aruodas.lt, `render=False` is typically sufficient.
+    - Requests go through the shared pooled client in `zyte_client.py`.
     """
 
     # Prefer the explicitly passed key; fallback to env var
@@ -198,40 +178,9 @@ def zyte_fetch_html(url, render=False, api_key=None, timeout=30):
     if not key:
         raise RuntimeError("ZYTE_API_KEY not set. Export it or pass api_key=...")
 
-    # Build Zyte API request payload
-    payload = {
-        "url": url,
-        "httpResponseBody": True,  # request the raw HTML (base64 encoded)
-        "followRedirect": True,    # follow 301/302 redirects automatically
-        "browserHtml": bool(render)  # enable Chromium rendering if needed
-    }
-
-    # Send POST request to Zyte’s Extract API
-    response = requests.post(
-        "https://api.zyte.com/v1/extract",
-        auth=(key, ""),       # Basic auth: username = API key
-        json=payload,
-        timeout=timeout
-    )
-    response.raise_for_status()  # raises HTTPError on failure
-
-    # Parse JSON response
-    data = response.json()
-
-    # Try multiple possible HTML keys (depends on Zyte mode)
-    body_b64 = (
-        data.get("httpResponseBody")
-        or data.get("browserHtml")
-        or data.get("text")
-        or ""
-    )
-
-    # Decode from Base64 → UTF-8 text
-    if not body_b64:
-        raise ValueError(f"No HTML content returned for {url}")
-
-    html = b64decode(body_b64).decode("utf-8", errors="ignore")
-    return html
+    # Shared pooled client: retries 421/429/5xx with backoff, honoring Retry-After
+    body = get_zyte_client().fetch(url, render=render, api_key=key, timeout=timeout)
+    return body.decode("utf-8", errors="ignore")
 
 def _parsed_looks_complete(soup: BeautifulSoup, verbose: bool = False) -> bool:
     """
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Shared Zyte API Client for TikraKaina
+One client for every Zyte caller: the API's listing scrapes (model_utils),
+the verified price collector and vilrent_utils.
+
+- Pooled keep-alive connections: one httpx.Client (thread-safe, used by the
+  collector's crawl threads) and one httpx.AsyncClient (the API event loop)
+- One retry policy for both: 421, 429 and 5xx responses and transport errors
+  (timeouts, resets) are retried with jittered exponential backoff; a
+  Retry-After header, when present, sets the wait instead
+- Other 4xx responses are raised immediately (httpx.HTTPStatusError)
+- Returns the page body as bytes, decoded straight from the Base64
+  httpResponseBody, ready for listing_parser
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from base64 import b64decode
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+ZYTE_API_ENDPOINT = "https://api.zyte.com/v1/extract"
+ZYTE_TIMEOUT = 30
+ZYTE_MAX_CONNECTIONS = int(os.getenv("ZYTE_MAX_CONNECTIONS", "64"))
+ZYTE_MAX_RETRIES = int(os.getenv("ZYTE_MAX_RETRIES", "3"))  # Retries after the first attempt
+ZYTE_BACKOFF_BASE = 1.0  # Seconds; attempt n waits uniform(0, base * 2**n)
+ZYTE_BACKOFF_MAX = 30.0  # Cap on the exponential backoff
+ZYTE_RETRY_AFTER_MAX = 120.0  # Cap on a server-requested Retry-After
+
+RETRY_STATUS_CODES = frozenset([421, 429])  # Plus every 5xx
+
+
+def _retryable_status(status_code: int) -> bool:
+    return status_code in RETRY_STATUS_CODES or status_code >= 500
+
+
+def _retry_after_seconds(response: Optional[httpx.Response]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), None if absent."""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode_body(data: Dict[str, Any], url: str) -> bytes:
+    """Page bytes from a Zyte response: Base64 httpResponseBody, or browserHtml when rendering."""
+    body_b64 = data.get("httpResponseBody")
+    if body_b64:
+        return b64decode(body_b64)
+    browser_html = data.get("browserHtml")
+    if browser_html:
+        return browser_html.encode("utf-8")
+    raise ValueError(f"Zyte API did not return httpResponseBody for {url}")
+
+
+class ZyteClient:
+    """
+    Pooled, retrying Zyte API client. Use `get_zyte_client()` for the shared
+    instance. Both `fetch` and `fetch_async` return the page body as bytes.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        endpoint: str = ZYTE_API_ENDPOINT,
+        timeout: float = ZYTE_TIMEOUT,
+        max_connections: int = ZYTE_MAX_CONNECTIONS,
+        max_retries: int = ZYTE_MAX_RETRIES,
+    ):
+        self.api_key = api_key or os.getenv("ZYTE_API_KEY")
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    # ------------------------------------------------------------------ clients
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None or self._client.is_closed:
+            with self._lock:
+                if self._client is None or self._client.is_closed:
+                    self._client = httpx.Client(timeout=self.timeout, limits=self._limits)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=self._limits)
+        return self._async_client
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+
+    # ------------------------------------------------------------------ retry policy
+
+    def _request_kwargs(self, url: str, render: bool, api_key: Optional[str], timeout: Optional[float]) -> Dict[str, Any]:
+        key = api_key or self.api_key
+        if not key:
+            raise RuntimeError("ZYTE_API_KEY not set")
+        payload = {"url": url, "httpResponseBody": not render, "followRedirect": True}
+        if render:
+            payload["browserHtml"] = True
+        kwargs = {"json": payload, "auth": (key, "")}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return kwargs
+
+    def _backoff(self, attempt: int, error: Exception) -> Optional[float]:
+        """Seconds to wait before retrying after `error`, or None if it must not be retried."""
+        response = None
+        if isinstance(error, httpx.HTTPStatusError):
+            response = error.response
+            if not _retryable_status(response.status_code):
+                return None
+        elif not isinstance(error, httpx.TransportError):
+            return None
+
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, ZYTE_RETRY_AFTER_MAX) + random.uniform(0, ZYTE_BACKOFF_BASE)
+        return random.uniform(0, min(ZYTE_BACKOFF_MAX, ZYTE_BACKOFF_BASE * 2 ** attempt))
+
+    def _log_retry(self, url: str, error: Exception, delay: float, attempt: int, max_retries: int):
+        self.retries += 1
+        reason = (
+            f"HTTP {error.response.status_code}" if isinstance(error, httpx.HTTPStatusError) else type(error).__name__
+        )
+        logger.warning(f"  ⚠️ Zyte API {reason} for {url}, retrying in {delay:.1f}s (retry {attempt + 1}/{max_retries})")
+
+    # ------------------------------------------------------------------ fetch
+
+    def fetch(
+        self,
+        url: str,
+        render: bool = False,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ) -> bytes:
+        """Fetch a page through Zyte (blocking, thread-safe)."""
+        max_retries = self.max_retries if max_retries is None else max_retries
+        kwargs = self._request_kwargs(url, render, api_key, timeout)
+
+        for attempt in range(max_retries + 1):
+            self.requests += 1
+            try:
+                response = self.client.post(self.endpoint, **kwargs)
+                response.raise_for_status()
+                return _decode_body(response.json(), url)
+            except httpx.HTTPError as e:
+                delay = self._backoff(attempt, e)
+                if delay is None or attempt >= max_retries:
+                    self.failures += 1
+                    raise
+                self._log_retry(url, e, delay, attempt, max_retries)
+                time.sleep(delay)
+
+    async def fetch_async(
+        self,
+        url: str,
+        render: bool = False,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ) -> bytes:
+        """Fetch a page through Zyte on the running event loop."""
+        max_retries = self.max_retries if max_retries is None else max_retries
+        kwargs = self._request_kwargs(url, render, api_key, timeout)
+
+        for attempt in range(max_retries + 1):
+            self.requests += 1
+            try:
+                response = await self.async_client.post(self.endpoint, **kwargs)
+                response.raise_for_status()
+                return _decode_body(response.json(), url)
+            except httpx.HTTPError as e:
+                delay = self._backoff(attempt, e)
+                if delay is None or attempt >= max_retries:
+                    self.failures += 1
+                    raise
+                self._log_retry(url, e, delay, attempt, max_retries)
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "retries": self.retries, "failures": self.failures}
+
+
+# Singleton instance for the process
+_client_instance: Optional[ZyteClient] = None
+_client_lock = threading.Lock()
+
+
+def get_zyte_client() -> ZyteClient:
+    """Get or create the process-wide Zyte client (recreated after a fork)."""
+    global _client_instance
+
+    if _client_instance is None or _client_instance.pid != os.getpid():
+        with _client_lock:
+            if _client_instance is None or _client_instance.pid != os.getpid():
+                _client_instance = ZyteClient()
+    return _client_instance
+
+
+async def close_zyte_client():
+    """Close the shared client's connections (called on application shutdown)."""
+    if _client_instance is not None:
+        await _client_instance.aclose()
+        _client_instance.close()
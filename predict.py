@@ -8,7 +8,6 @@ import requests
 import random
 import re
 import json
-from bs4 import BeautifulSoup
 import pandas as pd
 import pickle
 import numpy as np
@@ -17,6 +16,11 @@ import ast
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 import warnings
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from listing_parser import parse_listing
 
 warnings.filterwarnings("ignore", message="Could not find the number of physical cores")
 
@@ -63,43 +67,6 @@ def make_session():
     return sess
 
 
-def _parse_dl_block(dl):
-    """Extract <dt>/<dd> pairs from a <dl> block. Returns a dict of {key: [values]}."""
-    out = {}
-    if not dl:
-        return out
-    
-    for dt in dl.find_all("dt"):
-        key = dt.get_text(strip=True).rstrip(":")
-        dd = dt.find_next_sibling("dd")
-        if not dd:
-            continue
-
-        spans = [s.get_text(strip=True) for s in dd.find_all("span") if s.get_text(strip=True)]
-        if spans:
-            out[key] = spans
-        else:
-            text = dd.get_text(strip=True)
-            out[key] = [text] if text else []
-    return out
-
-
-def _extract_location_from_title(soup):
-    """Parse <h1 class="obj-header-text"> to extract city, district, street."""
-    h1 = soup.select_one("h1.obj-header-text")
-    if not h1:
-        return None, None, None
-
-    txt = h1.get_text(" ", strip=True)
-    head = re.split(r"\b(buto|būsto)\s+nuoma\b", txt, flags=re.IGNORECASE)[0]
-    parts = [p.strip(" ,") for p in head.split(",") if p.strip(" ,")]
-
-    city = parts[0] if len(parts) >= 1 else None
-    district = parts[1] if len(parts) >= 2 else None
-    street = parts[2] if len(parts) >= 3 else None
-    return city, district, street
-
-
 def scrape_listing(url, session=None):
     """Scrape apartment listing data from aruodas.lt URL."""
     if session is None:
@@ -108,25 +75,9 @@ def scrape_listing(url, session=None):
     session.headers['User-Agent'] = random.choice(USER_AGENTS)
     resp = session.get(url, timeout=10)
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    # Parse apartment details
-    details = _parse_dl_block(soup.find("dl", class_="obj-details"))
-    stats = _parse_dl_block(soup.find("div", class_="obj-stats").find("dl")) if soup.find("div", class_="obj-stats") else {}
-    details.update(stats)
-
-    # Extract location from header
-    city, district, street = _extract_location_from_title(soup)
-    if city:
-        details["city"] = [city]
-    if district:
-        details["district"] = [district]
-    if street:
-        details["street"] = [street]
-
-    result = {"url": url}
-    result.update(details)
-    return result
+
+    # Shared single-pass parser (backend/listing_parser.py)
+    return parse_listing(resp.content, url).raw_dict()
 
 
 def _geocode_addr(addr: str):